@@ -1,15 +1,29 @@
+import math
 import os
 
 import pandas as pd
 
 from pa_analysis.constants import OutputHeader, RankingColumns, SignalColumns
 from pa_analysis.cycle_processor import process_cycles
+from source import debug_artifacts
 from source.constants import (
     PA_ANALYSIS_FOLDER,
     MarketDirection,
 )
-from source.data_reader import load_strategy_data_1
+from source.data_reader import (
+    get_strategy_file_details,
+    load_strategy_data_1,
+    reuse_input_frames,
+)
+from source.parallel.ledger import TaskStatus
+from source.parallel.runner import (
+    Task,
+    get_num_workers,
+    run_tasks,
+    sweep_run_id,
+)
 from source.processors.cycle_trade_processor import (
+    formulate_files_to_read,
     get_base_df,
     include_volatile_volume_tags,
 )
@@ -35,15 +49,44 @@ def flatten_dict(d, parent_key="", sep="_"):
     return dict(items)
 
 
-def process(validated_data):
-    strategy_pairs = validated_data.get("strategy_pairs", [])
-    instruments = validated_data.get("instruments", [])
+def process(validated_data, on_progress=None):
+    """
+    Analyse every instrument x strategy pair on the task runner.
+
+    The pairs of an instrument are split in as few tasks as keep every
+    worker busy, each task reading the instrument's cycle input files once.
+    The results are collected in instrument and strategy pair order and
+    ranked together.
+
+    Args:
+        validated_data (dict): Validated analysis inputs.
+        on_progress (callable): Receives the telemetry collector as worker
+            stage events and task completions arrive.
+
+    Returns:
+        dict: The analytics of every (instrument, strategy_pair).
+    """
+    tasks = get_tasks(validated_data)
+    # the rankings need the results of every pair, nothing is resumed
+    outcomes = run_tasks(
+        tasks,
+        sweep_run_id(process_strategies.__name__, validated_data),
+        resume=False,
+        on_progress=on_progress,
+    )
+
     result, data = {}, []
-    for instrument in instruments:
-        for strategy_pair in strategy_pairs:
-            processed_result = process_strategy(
-                validated_data, strategy_pair, instrument
+    for task, outcome in zip(tasks, outcomes):
+        if outcome.status == TaskStatus.ERROR:
+            print(
+                f"Error encountered during multiprocessing execution: {outcome.error_message}"
             )
+            raise RuntimeError(outcome.error_message)
+
+        _, strategy_pairs, instrument = task.args
+        for strategy_pair, processed_result in zip(
+            strategy_pairs, outcome.result
+        ):
             temp = {"instrument": instrument, "strategy_pair": strategy_pair}
             result[(instrument, strategy_pair)] = processed_result
             temp.update(processed_result)
@@ -54,6 +97,71 @@ def process(validated_data):
     return result
 
 
+def get_tasks(validated_data):
+    strategy_pairs = validated_data.get("strategy_pairs", [])
+    instruments = validated_data.get("instruments", [])
+    total_pairs = len(instruments) * len(strategy_pairs)
+    chunk_size = max(1, math.ceil(total_pairs / get_num_workers(total_pairs)))
+
+    tasks = []
+    for instrument in instruments:
+        for start in range(0, len(strategy_pairs), chunk_size):
+            chunk = strategy_pairs[start : start + chunk_size]
+            tasks.append(
+                Task(
+                    func=process_strategies,
+                    args=(validated_data, chunk, instrument),
+                    params={
+                        "process": process_strategies.__name__,
+                        "instrument": instrument,
+                        "strategy_pairs": chunk,
+                        "inputs": validated_data,
+                    },
+                    task_type=process_strategies.__name__,
+                    inputs=tuple(
+                        get_input_files(validated_data, chunk, instrument)
+                    ),
+                )
+            )
+    return tasks
+
+
+def get_input_files(validated_data, strategy_pairs, instrument):
+    """
+    Strategy files of the pairs and the cycle input files read once for
+    them, for the memory estimate of their task.
+    """
+    input_files = []
+    for strategy_pair in strategy_pairs:
+        portfolio_ids, strategy_ids = zip(*strategy_pair)
+        input_files.extend(
+            get_strategy_file_details(
+                instrument,
+                portfolio_ids,
+                strategy_ids,
+                os.getenv("STRATEGY_DB_PATH"),
+            )
+        )
+    if validated_data.get("calculate_cycles"):
+        files_to_read, *_ = formulate_files_to_read(
+            {**validated_data, "instrument": instrument, "name": ""}
+        )
+        input_files.extend(files_to_read.values())
+    return input_files
+
+
+def process_strategies(validated_data, strategy_pairs, instrument):
+    """
+    Analyse strategy pairs of one instrument, reusing the input files
+    parsed for the first pair.
+    """
+    with reuse_input_frames():
+        return [
+            process_strategy(validated_data, strategy_pair, instrument)
+            for strategy_pair in strategy_pairs
+        ]
+
+
 def format(data):
     flattened_data = []
     for item in data:
@@ -107,6 +215,7 @@ def process_strategy(validated_data, strategy_pair, instrument):
     )
 
     strategy_path = os.getenv("STRATEGY_DB_PATH")
+    debug_artifacts.set_context(instrument, strategy_pair_str)
 
     start_datetime, end_datetime = format_dates(
         validated_data.get("start_date"), validated_data.get("end_date")
@@ -129,9 +238,7 @@ def process_strategy(validated_data, strategy_pair, instrument):
     if strategy_df.empty:
         raise ValueError("strategy df id empty")
 
-    base_df = get_base_df(
-        validated_data, strategy_df, strategy_pair_str, instrument
-    )
+    base_df = get_base_df(validated_data, strategy_df)
 
     # based on base df need to generate output analytic df
     result_base_df = generate_analytics(base_df)
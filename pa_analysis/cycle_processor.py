@@ -1,7 +1,6 @@
-from collections import defaultdict
 from datetime import timedelta
-from functools import partial
-from typing import List
+from typing import List, NamedTuple
+import numpy as np
 import pandas as pd
 from pandas.tseries.offsets import BDay
 
@@ -10,11 +9,9 @@ from pa_analysis.constants import (
 )
 from source.processors.cycle_analysis_processor import (
     adj_close_max_to_min,
-    get_min_max_idx,
-    get_next_cycle_first_row,
-    update_close_to_close,
-    update_cycle_min_max,
-    update_max_to_min,
+    get_cycle_segments,
+    get_min_max_offsets,
+    report_missing_min_max,
 )
 from source.processors.cycle_trade_processor import (
     get_cycle_base_df,
@@ -27,7 +24,6 @@ from source.processors.cycle_trade_processor import (
 )
 from source.utils import (
     format_duration,
-    make_positive,
     make_round,
 )
 from source.constants import (
@@ -80,7 +76,9 @@ def process_cycles(**kwargs):
         start_index = df.index[0]
         df.loc[start_index, "signal_category"] = kwargs["category"]
 
-        results = analyze_cycles(df, time_frame, kwargs)
+        # group boundaries shared by all the cycle analytics of the frame
+        groups = get_cycle_groups(df)
+        results = analyze_cycles(df, time_frame, kwargs, groups=groups)
 
         # max to min percent
         update_max_to_min_percent(df, kwargs)
@@ -147,6 +145,7 @@ def process_cycles(**kwargs):
                     FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value,
                 ],
                 output_file_name=result_file_name,
+                groups=groups,
             )
 
         first_cycle_columns = [col for col in df.columns if "cycle_no_" in col]
@@ -186,6 +185,7 @@ def process_cycles(**kwargs):
                 FirstCycleColumns.CLOSE_TO_CLOSE.value,
             ],
             output_file_name=result_file_name,
+            groups=groups,
         )
 
         # ctc cycle
@@ -210,6 +210,7 @@ def process_cycles(**kwargs):
             ],
             positive_negative_keys=[FirstCycleColumns.CLOSE_TO_CLOSE.value],
             output_file_name=result_file_name,
+            groups=groups,
         )
 
         return result_file_name
@@ -239,11 +240,212 @@ def update_max_to_min_percent(df, kwargs):
     }
 
     for col, val in columns.items():
-        df[col] = "NO"
-        df.loc[
-            df[FirstCycleColumns.MAX_TO_MIN.value] > df["Close"] * (val / 100),
-            col,
-        ] = "YES"
+        df[col] = df[FirstCycleColumns.MAX_TO_MIN.value] > df["Close"] * (
+            val / 100
+        )
+
+
+# columns written for every secondary analytics key
+SECONDARY_ANALYTICS_COLUMNS = {
+    FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value: [
+        FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value
+    ],
+    FirstCycleColumns.CYCLE_DURATION.value: [
+        FirstCycleColumns.CYCLE_DURATION.value
+    ],
+    FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value: [
+        FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value
+    ],
+    FirstCycleColumns.CYCLE_MAX.value: [
+        FirstCycleColumns.CYCLE_MAX.value,
+        FirstCycleColumns.CYCLE_MIN.value,
+    ],
+    FirstCycleColumns.CYCLE_MIN.value: [
+        FirstCycleColumns.CYCLE_MAX.value,
+        FirstCycleColumns.CYCLE_MIN.value,
+    ],
+    FirstCycleColumns.POINTS_FROM_MAX.value: [
+        FirstCycleColumns.POINTS_FROM_MAX.value
+    ],
+    FirstCycleColumns.CLOSE_TO_CLOSE.value: [
+        FirstCycleColumns.CLOSE_TO_CLOSE.value
+    ],
+    FirstCycleColumns.AVERAGE_TILL_MAX.value: [
+        FirstCycleColumns.AVERAGE_TILL_MIN.value,
+        FirstCycleColumns.AVERAGE_TILL_MAX.value,
+    ],
+    FirstCycleColumns.AVERAGE_TILL_MIN.value: [
+        FirstCycleColumns.AVERAGE_TILL_MIN.value,
+        FirstCycleColumns.AVERAGE_TILL_MAX.value,
+    ],
+    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: [
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value
+    ],
+    FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value: [
+        FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value
+    ],
+    FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: [
+        FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value
+    ],
+    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: [
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value
+    ],
+}
+
+DURATION_COLUMNS = (
+    FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value,
+    FirstCycleColumns.CYCLE_DURATION.value,
+    FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value,
+)
+
+
+def get_secondary_cycle_metrics(df, segments, groups, is_last_cycle):
+    """
+    Secondary cycle metrics of every segment, computed column by column.
+
+    In a last cycle only the first extreme is looked up (the min of a LONG
+    cycle, the max of a SHORT one); the other extreme is the average Close
+    before it and the points are counted negative.
+
+    Args:
+        df (pd.DataFrame): Cycle frame with a sorted index.
+        segments (Segments): Cycle id segments, see `get_cycle_segments`.
+        groups (CycleGroups): Groups of the frame.
+        is_last_cycle (np.ndarray): Whether every segment is a last cycle.
+
+    Returns:
+        pd.DataFrame: One row per segment, one column per metric, the
+        durations in seconds.
+    """
+    dt = df["dt"].to_numpy()
+    low, high, close = (
+        df[col].to_numpy(dtype=float) for col in ("Low", "High", "Close")
+    )
+    group_start = groups.start_positions[segments.group_codes]
+    segment_is_long = groups.is_long[segments.group_codes]
+    start_close = close[group_start]
+    first_close = close[segments.first]
+    last_close = close[segments.closing]
+
+    min_offsets, max_offsets = get_min_max_offsets(
+        segments, segment_is_long, low, high
+    )
+    last_min = segments.argmin(low)
+    last_max = segments.argmax(high)
+    last_long = is_last_cycle & segment_is_long
+    last_short = is_last_cycle & ~segment_is_long
+    min_offsets = np.where(
+        is_last_cycle, np.where(segment_is_long, last_min, -1), min_offsets
+    )
+    max_offsets = np.where(
+        is_last_cycle, np.where(segment_is_long, -1, last_max), max_offsets
+    )
+    has_min, has_max = min_offsets >= 0, max_offsets >= 0
+    min_positions = segments.positions(min_offsets)
+    max_positions = segments.positions(max_offsets)
+
+    # average Close before the extreme found in a last cycle
+    close_before_min = segments.mean(close, until=min_offsets - 1)
+    close_before_max = segments.mean(close, until=max_offsets - 1)
+    cycle_min = np.where(
+        has_min,
+        low[min_positions],
+        np.where(last_short, close_before_max, np.nan),
+    )
+    cycle_max = np.where(
+        has_max,
+        high[max_positions],
+        np.where(last_long, close_before_min, np.nan),
+    )
+    has_min_max = (has_min | last_short) & (has_max | last_long)
+    sign = np.where(is_last_cycle, -1, 1)
+
+    all_rows = len(segments.rows)
+    avg_till_min = np.where(
+        segment_is_long,
+        np.round(
+            segments.mean(low, until=np.where(has_min, min_offsets, all_rows)),
+            2,
+        ),
+        np.nan,
+    )
+    avg_till_max = np.where(
+        segment_is_long,
+        np.nan,
+        np.round(
+            segments.mean(
+                high, until=np.where(has_max, max_offsets, all_rows)
+            ),
+            2,
+        ),
+    )
+
+    points_from_max = np.where(
+        has_min_max, np.round(cycle_max - cycle_min, 2) * sign, 0.0
+    )
+    points_frm_avg_till_max_to_min = np.where(
+        has_min_max,
+        np.round(
+            np.where(
+                segment_is_long,
+                cycle_max - avg_till_min,
+                avg_till_max - cycle_min,
+            ),
+            2,
+        )
+        * sign,
+        np.nan,
+    )
+    close_to_close = np.round(
+        np.where(
+            segment_is_long,
+            last_close - first_close,
+            first_close - last_close,
+        ),
+        2,
+    )
+
+    second = np.timedelta64(1, "s")
+    max_to_min_seconds = np.where(
+        has_min & has_max,
+        make_positive_array(
+            np.round((dt[max_positions] - dt[min_positions]) / second, 2)
+        ),
+        np.nan,
+    )
+
+    return pd.DataFrame(
+        {
+            FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value: (
+                np.round((dt[segments.first] - dt[group_start]) / second, 2)
+            ),
+            FirstCycleColumns.CYCLE_DURATION.value: np.round(
+                (dt[segments.closing] - dt[segments.first]) / second, 2
+            ),
+            FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value: (
+                max_to_min_seconds
+            ),
+            FirstCycleColumns.CYCLE_MAX.value: cycle_max,
+            FirstCycleColumns.CYCLE_MIN.value: cycle_min,
+            FirstCycleColumns.POINTS_FROM_MAX.value: points_from_max,
+            FirstCycleColumns.CLOSE_TO_CLOSE.value: close_to_close,
+            FirstCycleColumns.AVERAGE_TILL_MIN.value: avg_till_min,
+            FirstCycleColumns.AVERAGE_TILL_MAX.value: avg_till_max,
+            FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: (
+                points_frm_avg_till_max_to_min
+            ),
+            FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value: np.round(
+                points_from_max / start_close * 100, 2
+            ),
+            FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: np.round(
+                close_to_close / start_close * 100, 2
+            ),
+            FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: np.round(
+                points_frm_avg_till_max_to_min / start_close * 100, 2
+            ),
+            "found": has_min & has_max | is_last_cycle,
+        }
+    )
 
 
 def update_secondary_cycle_analytics(
@@ -255,172 +457,74 @@ def update_secondary_cycle_analytics(
     analytics_needed: List = [],
     positive_negative_keys: List = [],
     output_file_name="result.csv",
+    groups=None,
 ):
-
-    groups = list(df.groupby("group_id"))
+    if groups is None:
+        groups = get_cycle_groups(df)
     cycle_columns = [col for col in df.columns if cycle_count_col in col]
 
-    # todo
-    #  1. use partial to pass the required arguments to the update functions
-    # Define the mapping of keys to their respective update functions
-    update_functions = {
-        FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value: update_signal_start_duration,
-        FirstCycleColumns.CYCLE_DURATION.value: update_cycle_duration,
-        FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value: partial(
-            update_max_to_min_duration,
-            max_to_min_duration_key=f"{prefix}_{FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value}",
-        ),
-        FirstCycleColumns.MOVE.value: update_move,
-        FirstCycleColumns.MOVE_PERCENT.value: update_move_percent,
-        FirstCycleColumns.CYCLE_MAX.value: update_cycle_min_max,
-        FirstCycleColumns.CYCLE_MIN.value: update_cycle_min_max,
-        FirstCycleColumns.POINTS_FROM_MAX.value: update_max_to_min,
-        FirstCycleColumns.CLOSE_TO_CLOSE.value: update_close_to_close,
-        FirstCycleColumns.AVERAGE_TILL_MAX.value: update_avg_till_min_max,
-        FirstCycleColumns.AVERAGE_TILL_MIN.value: update_avg_till_min_max,
-        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: update_pnts_frm_avg_till_max_to_min,
-        FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value: partial(
-            update_percent_with_grp_start_close,
-            percent_col=f"{prefix}_{FirstCycleColumns.POINTS_FROM_MAX.value}",
-            percent_key=f"{prefix}_{FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value}",
-        ),
-        FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: partial(
-            update_percent_with_grp_start_close,
-            percent_col=f"{prefix}_{FirstCycleColumns.CLOSE_TO_CLOSE.value}",
-            percent_key=f"{prefix}_{FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value}",
-        ),
-        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: partial(
-            update_percent_with_grp_start_close,
-            percent_col=f"{prefix}_{FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value}",
-            percent_key=f"{prefix}_{FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value}",
-        ),
+    columns = []
+    for key in analytics_needed:
+        if key not in SECONDARY_ANALYTICS_COLUMNS:
+            raise NotImplementedError(
+                f"Function for key {prefix}_{key} not implemented"
+            )
+        columns.extend(
+            column
+            for column in SECONDARY_ANALYTICS_COLUMNS[key]
+            if column not in columns
+        )
+    positive_negative_columns = {
+        f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{prefix}_{key}": key
+        for key in positive_negative_keys
     }
 
-    analytics_dict = defaultdict(list)
+    metrics = []
     for cycle_col in cycle_columns:
+        segments = get_cycle_segments(
+            df, cycle_col, groups.codes, cycle_start=0, first_cycle=1
+        )
+        # the last cycle of every group of an MTM cycle id
+        is_last_cycle = np.zeros(len(segments), dtype=bool)
+        if cycle_count_col == SecondCycleIDColumns.MTM_CYCLE_ID.value:
+            is_last_cycle[:-1] = (
+                segments.group_codes[1:] != segments.group_codes[:-1]
+            )
+            is_last_cycle[-1:] = True
 
-        for group_idx, (group_id, group_data) in enumerate(groups):
-            group_start_row = group_data.iloc[0]
-            market_direction = group_start_row["market_direction"]
-            unique_cycles = group_data.loc[
-                group_data[cycle_col] > 0, cycle_col
-            ].unique()
-
-            for cycle in unique_cycles:
-                cycle_analysis = {}
-                cycle_data = group_data[group_data[cycle_col] == cycle]
-
-                next_cycle_first_row = get_next_cycle_first_row(
-                    group_data,
-                    cycle,
-                    cycle_col,
-                    groups,
-                    group_idx,
-                    cycle_start=0,
-                    cycle_data=cycle_data,
-                )
-
-                adjusted_cycle_data = (
-                    pd.concat([cycle_data, next_cycle_first_row.to_frame().T])
-                    if not cycle_data.empty
-                    and next_cycle_first_row is not None
-                    else cycle_data
-                )
-
-                is_last_cycle = (
-                    cycle == unique_cycles[-1]
-                    if cycle_count_col
-                    == SecondCycleIDColumns.MTM_CYCLE_ID.value
-                    else False
-                )
+        cycle_metrics = get_secondary_cycle_metrics(
+            df, segments, groups, is_last_cycle
+        )
+        for group_code, cycle in zip(
+            segments.group_codes[~cycle_metrics["found"]],
+            segments.cycles[~cycle_metrics["found"]],
+        ):
+            report_missing_min_max(groups.ids[group_code], cycle)
+        metrics.append(
+            cycle_metrics.assign(index=df.index[segments.last])
+        )
 
-                min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
-                    adjusted_cycle_data,
-                    group_start_row,
-                    group_id,
-                    cycle,
-                    is_last_cycle,
+    if metrics:
+        metrics = pd.concat(metrics, ignore_index=True)
+        for column in DURATION_COLUMNS:
+            if column in columns:
+                durations = metrics[column]
+                metrics[column] = np.where(
+                    durations.isna(),
+                    pd.NA,
+                    format_durations(durations.fillna(0)),
                 )
-
-                analytics_dict["index"].append(cycle_data.index[-1])
-
-                # Dynamically call update functions based on the keys in the updates dictionary
-                for key in analytics_needed:
-                    # keys
-                    key = f"{prefix}_{key}"
-                    cycle_duration_key = (
-                        f"{prefix}_{FirstCycleColumns.CYCLE_DURATION.value}"
-                    )
-                    signal_start_duration_key = f"{prefix}_{FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value}"
-                    min_key = f"{prefix}_{FirstCycleColumns.CYCLE_MIN.value}"
-                    max_key = f"{prefix}_{FirstCycleColumns.CYCLE_MAX.value}"
-                    max_to_min_key = (
-                        f"{prefix}_{FirstCycleColumns.POINTS_FROM_MAX.value}"
-                    )
-                    close_to_close_key = (
-                        f"{prefix}_{FirstCycleColumns.CLOSE_TO_CLOSE.value}"
-                    )
-                    avg_min_key = (
-                        f"{prefix}_{FirstCycleColumns.AVERAGE_TILL_MIN.value}"
-                    )
-                    avg_max_key = (
-                        f"{prefix}_{FirstCycleColumns.AVERAGE_TILL_MAX.value}"
-                    )
-
-                    points_frm_avg_till_max_to_min_key = f"{prefix}_{FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value}"
-
-                    # get the update function
-                    func = update_functions.get(key.split("_")[-1], None)
-
-                    if func:
-                        func(
-                            group_start_row=group_start_row,
-                            cycle_analysis=cycle_analysis,
-                            cycle_data=cycle_data,
-                            signal_start_duration_key=signal_start_duration_key,
-                            key=key,
-                            adjusted_cycle_data=adjusted_cycle_data,
-                            min_idx=min_idx,
-                            max_idx=max_idx,
-                            cycle_min=cycle_min,
-                            cycle_max=cycle_max,
-                            market_direction=market_direction,
-                            min_key=min_key,
-                            max_key=max_key,
-                            max_to_min_key=max_to_min_key,
-                            close_to_close_key=close_to_close_key,
-                            last_close=adjusted_cycle_data.iloc[-1]["Close"],
-                            first_close=adjusted_cycle_data.iloc[0]["Close"],
-                            avg_min_key=avg_min_key,
-                            avg_max_key=avg_max_key,
-                            points_frm_avg_till_max_to_min_key=points_frm_avg_till_max_to_min_key,
-                            is_last_cycle=is_last_cycle,
-                            cycle_duration_key=cycle_duration_key,
-                            group_start_close=group_start_row["Close"],
-                        )
-                    else:
-                        raise NotImplementedError(
-                            f"Function for key {key} not implemented"
-                        )
-
-                for key in positive_negative_keys:
-                    key = f"{prefix}_{key}"
-                    update_positive_negative(
-                        cycle_analysis=cycle_analysis,
-                        columns=[key],
-                    )
-
-                for key, value in cycle_analysis.items():
-                    analytics_dict[key].append(value)
-
-                results.append(cycle_analysis)
-
-        for col, values in analytics_dict.items():
-            if col != "index" and values:
-                try:
-                    df.loc[analytics_dict["index"], col] = values
-                except Exception:
-                    pass
+        analytics = metrics[columns].add_prefix(f"{prefix}_")
+        for column, key in positive_negative_columns.items():
+            values = analytics[f"{prefix}_{key}"]
+            analytics[column] = np.where(values.isna(), np.nan, values > 0)
+        results.extend(analytics.to_dict("records"))
+
+        # a row closing cycles of several columns keeps the last one written
+        if len(analytics):
+            analytics.index = metrics["index"]
+            analytics = analytics[~analytics.index.duplicated(keep="last")]
+            df.loc[analytics.index, analytics.columns] = analytics
 
     if cycle_count_col == SecondCycleIDColumns.CTC_CYCLE_ID.value:
         update_cumulative_avg(
@@ -454,415 +558,220 @@ def remove_cols(df, cols):
     )
 
 
-def update_pnts_frm_avg_till_max_to_min(**kwargs):
-
-    required_keys = [
-        "market_direction",
-        "cycle_analysis",
-        "points_frm_avg_till_max_to_min_key",
-        "is_last_cycle",
-    ]
-
-    if not all(key in kwargs for key in required_keys):
-        raise ValueError(
-            f"Required keys missing. Required keys are {required_keys}"
-        )
-
-    market_direction = kwargs["market_direction"]
-    cycle_analysis = kwargs["cycle_analysis"]
-    min_key = kwargs.get("min_key")
-    max_key = kwargs.get("max_key")
-    avg_min_key = kwargs.get("avg_min_key")
-    avg_max_key = kwargs.get("avg_max_key")
-    points_frm_avg_till_max_to_min_key = kwargs[
-        "points_frm_avg_till_max_to_min_key"
-    ]
-    is_last_cycle = kwargs.get("is_last_cycle", False)
-
-    value = pd.NA
-    if cycle_analysis[max_key] is None or cycle_analysis[min_key] is None:
-        cycle_analysis[points_frm_avg_till_max_to_min_key] = value
-        return
-
-    if market_direction == MarketDirection.LONG:
-        value = make_round(
-            cycle_analysis[max_key] - cycle_analysis[avg_min_key]
-        )
-
-    else:
-        value = make_round(
-            cycle_analysis[avg_max_key] - cycle_analysis[min_key]
-        )
-
-    if is_last_cycle:
-        value *= -1
-    cycle_analysis[points_frm_avg_till_max_to_min_key] = value
-
-
-def update_avg_till_min_max(**kwargs):
-    required_keys = [
-        "market_direction",
-        "avg_min_key",
-        "avg_max_key",
-    ]
-
-    if not all(key in kwargs for key in required_keys):
-        raise ValueError(
-            f"Required keys missing. Required keys are {required_keys}"
-        )
-
-    market_direction = kwargs["market_direction"]
-    adjusted_cycle_data = kwargs["adjusted_cycle_data"]
-    min_idx = kwargs.get("min_idx")
-    max_idx = kwargs.get("max_idx")
-    avg_min_key = kwargs.get("avg_min_key")
-    avg_max_key = kwargs.get("avg_max_key")
-    cycle_analysis = kwargs["cycle_analysis"]
-
-    if market_direction == MarketDirection.LONG:
-        cycle_analysis[avg_min_key] = make_round(
-            adjusted_cycle_data.loc[:min_idx]["Low"].mean()
-        )
-
-        cycle_analysis[avg_max_key] = pd.NA
-
-    else:
-        cycle_analysis[avg_max_key] = make_round(
-            adjusted_cycle_data.loc[:max_idx]["High"].mean()
-        )
-
-        cycle_analysis[avg_min_key] = pd.NA
-
-
-def analyze_cycles(df, time_frame, kwargs):
-    # Group by 'group_id'
-    groups = list(df.groupby("group_id"))
+class CycleGroups(NamedTuple):
+    """
+    Signal groups of a cycle frame, shared by the cycle analytics.
+
+    Attributes:
+        codes (np.ndarray): Code of every row's group_id, in the order of
+            the sorted group ids, -1 for rows without a group.
+        ids (pd.Index): Sorted group ids.
+        start_positions (np.ndarray): First row of every group.
+        is_long (np.ndarray): Whether every group starts LONG.
+    """
 
-    results = []
-    updates = defaultdict(list)
+    codes: np.ndarray
+    ids: pd.Index
+    start_positions: np.ndarray
+    is_long: np.ndarray
 
-    for group_idx, (group_id, group_data) in enumerate(groups):
-        # Identify cycle columns dynamically
 
-        cycle_columns = [
-            col for col in group_data.columns if "cycle_no" in col
-        ]
+def get_cycle_groups(df) -> CycleGroups:
+    codes, ids = pd.factorize(df["group_id"], sort=True)
+    grouped = np.flatnonzero(codes >= 0)
+    start_positions = grouped[np.unique(codes[grouped], return_index=True)[1]]
+    is_long = (
+        df["market_direction"].to_numpy()[start_positions]
+        == MarketDirection.LONG
+    )
+    return CycleGroups(codes, ids, start_positions, is_long)
 
-        group_start_row = group_data.iloc[0]
-        market_direction = group_start_row["market_direction"]
-        for cycle_col in cycle_columns:
-            # Filter the group_data to get only the valid cycles and find unique cycle numbers
-            unique_cycles = group_data.loc[
-                group_data[cycle_col] > 0, cycle_col
-            ].unique()
-
-            if not len(unique_cycles):
-                print(f"No cycles found in group {group_id}")
-
-            for cycle in unique_cycles:
-                cycle_analysis = {
-                    "group_id": group_id,
-                    # "period_band": cycle_col[-4:],
-                    # "cycle_no": cycle,
-                }
-                cycle_data = group_data[group_data[cycle_col] == cycle]
-
-                # real cycle starts from cycle no 2
-                if cycle == 1:
-                    continue
-
-                next_cycle_first_row = get_next_cycle_first_row(
-                    group_data,
-                    cycle,
-                    cycle_col,
-                    groups,
-                    group_idx,
-                    cycle_data=cycle_data,
-                )
 
-                if next_cycle_first_row is not None:
-                    # Create a new DataFrame with the current cycle's data and the next cycle's first row
-                    adjusted_cycle_data = pd.concat(
-                        [cycle_data, next_cycle_first_row.to_frame().T]
-                    )
-                else:
-                    adjusted_cycle_data = cycle_data
+def format_durations(seconds):
+    return [format_duration(value) for value in seconds]
 
-                min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
-                    adjusted_cycle_data, group_start_row, group_id, cycle
-                )
 
-                updates["index"].append(cycle_data.index[-1])
+def make_positive_array(values):
+    # like make_positive, -0.0 stays as it is
+    return np.where(values < 0, -values, values)
 
-                update_signal_start_duration(
-                    group_start_row=group_start_row,
-                    cycle_analysis=cycle_analysis,
-                    cycle_data=cycle_data,
-                    signal_start_duration_key=FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value,
-                )
 
-                update_cycle_duration(
-                    cycle_analysis=cycle_analysis,
-                    adjusted_cycle_data=adjusted_cycle_data,
-                    cycle_duration_key=FirstCycleColumns.CYCLE_DURATION.value,
-                )
-
-                update_move(
-                    group_start_row=group_start_row,
-                    cycle_analysis=cycle_analysis,
-                    cycle_data=cycle_data,
-                    move_key=FirstCycleColumns.MOVE.value,
-                )
+def get_cycle_metrics(df, segments, groups, min_offsets, max_offsets):
+    """
+    Metrics of every cycle segment, computed column by column.
 
-                update_move_percent(
-                    group_start_row=group_start_row,
-                    cycle_analysis=cycle_analysis,
-                    cycle_data=cycle_data,
-                    move_key=FirstCycleColumns.MOVE.value,
-                    move_percent_key=FirstCycleColumns.MOVE_PERCENT.value,
-                )
+    A cycle is read together with the first row of the next cycle; its
+    durations and moves are measured from the first row of its group.
 
-                min_key = FirstCycleColumns.CYCLE_MIN.value
-                max_key = FirstCycleColumns.CYCLE_MAX.value
-                max_to_min_key = FirstCycleColumns.MAX_TO_MIN.value
-                update_cycle_min_max(
-                    cycle_analysis=cycle_analysis,
-                    adjusted_cycle_data=adjusted_cycle_data,
-                    min_idx=min_idx,
-                    max_idx=max_idx,
-                    cycle_min=cycle_min,
-                    cycle_max=cycle_max,
-                    min_key=min_key,
-                    max_key=max_key,
-                )
+    Args:
+        df (pd.DataFrame): Cycle frame with a sorted index.
+        segments (Segments): Cycle segments, see `get_cycle_segments`.
+        groups (CycleGroups): Groups of the frame.
+        min_offsets (np.ndarray): Offset of the min of every segment, see
+            `get_min_max_offsets`.
+        max_offsets (np.ndarray): Offset of the max of every segment.
 
-                update_max_to_min(
-                    cycle_analysis=cycle_analysis,
-                    min_key=min_key,
-                    max_key=max_key,
-                    max_to_min_key=max_to_min_key,
-                    is_last_cycle=False,
-                )
-
-                avg_min_key = FirstCycleColumns.AVERAGE_TILL_MIN.value
-                avg_max_key = FirstCycleColumns.AVERAGE_TILL_MAX.value
-                update_avg_till_min_max(
-                    market_direction=market_direction,
-                    cycle_analysis=cycle_analysis,
-                    adjusted_cycle_data=adjusted_cycle_data,
-                    min_idx=min_idx,
-                    max_idx=max_idx,
-                    avg_min_key=avg_min_key,
-                    avg_max_key=avg_max_key,
-                )
+    Returns:
+        pd.DataFrame: One row per segment, one column per metric.
+    """
+    dt = df["dt"].to_numpy()
+    low, high, close = (
+        df[col].to_numpy(dtype=float) for col in ("Low", "High", "Close")
+    )
+    group_start = groups.start_positions[segments.group_codes]
+    segment_is_long = groups.is_long[segments.group_codes]
+    start_close = close[group_start]
+    first_close = close[segments.first]
+    last_close = close[segments.closing]
+
+    has_min, has_max = min_offsets >= 0, max_offsets >= 0
+    found = has_min & has_max
+    cycle_min = np.where(has_min, low[segments.positions(min_offsets)], np.nan)
+    cycle_max = np.where(
+        has_max, high[segments.positions(max_offsets)], np.nan
+    )
+    max_to_min = np.where(found, np.round(cycle_max - cycle_min, 2), 0.0)
+
+    # average of the Low up to the min of a LONG cycle, of the High up to
+    # the max otherwise, over the whole cycle when there is no such row
+    all_rows = len(segments.rows)
+    avg_till_min = np.where(
+        segment_is_long,
+        np.round(
+            segments.mean(low, until=np.where(has_min, min_offsets, all_rows)),
+            2,
+        ),
+        np.nan,
+    )
+    avg_till_max = np.where(
+        segment_is_long,
+        np.nan,
+        np.round(
+            segments.mean(
+                high, until=np.where(has_max, max_offsets, all_rows)
+            ),
+            2,
+        ),
+    )
+    points_frm_avg_till_max_to_min = np.where(
+        found,
+        np.round(
+            np.where(
+                segment_is_long,
+                cycle_max - avg_till_min,
+                avg_till_max - cycle_min,
+            ),
+            2,
+        ),
+        np.nan,
+    )
 
-                points_frm_avg_till_max_to_min_key = (
-                    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value
-                )
-                update_pnts_frm_avg_till_max_to_min(
-                    market_direction=market_direction,
-                    cycle_analysis=cycle_analysis,
-                    max_key=max_key,
-                    min_key=min_key,
-                    avg_min_key=avg_min_key,
-                    avg_max_key=avg_max_key,
-                    points_frm_avg_till_max_to_min_key=points_frm_avg_till_max_to_min_key,
-                    is_last_cycle=False,
-                )
+    close_to_close = np.round(
+        np.where(
+            segment_is_long,
+            last_close - first_close,
+            first_close - last_close,
+        ),
+        2,
+    )
+    move = make_positive_array(np.round(first_close - start_close, 2))
+
+    second = np.timedelta64(1, "s")
+    signal_start_seconds = (dt[segments.first] - dt[group_start]) / second
+    cycle_seconds = (dt[segments.closing] - dt[segments.first]) / second
+
+    return pd.DataFrame(
+        {
+            FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value: (
+                format_durations(np.round(signal_start_seconds, 2))
+            ),
+            FirstCycleColumns.CYCLE_DURATION.value: format_durations(
+                np.round(cycle_seconds, 2)
+            ),
+            FirstCycleColumns.MOVE.value: move,
+            FirstCycleColumns.MOVE_PERCENT.value: make_positive_array(
+                np.round(move / start_close * 100, 2)
+            ),
+            FirstCycleColumns.CYCLE_MAX.value: cycle_max,
+            FirstCycleColumns.CYCLE_MIN.value: cycle_min,
+            FirstCycleColumns.MAX_TO_MIN.value: max_to_min,
+            FirstCycleColumns.AVERAGE_TILL_MIN.value: avg_till_min,
+            FirstCycleColumns.AVERAGE_TILL_MAX.value: avg_till_max,
+            FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: (
+                points_frm_avg_till_max_to_min
+            ),
+            FirstCycleColumns.CLOSE_TO_CLOSE.value: close_to_close,
+            f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{FirstCycleColumns.CLOSE_TO_CLOSE.value}": np.where(
+                np.isnan(close_to_close), np.nan, close_to_close > 0
+            ),
+            FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: np.round(
+                close_to_close / start_close * 100, 2
+            ),
+            FirstCycleColumns.MAX_TO_MIN_TO_CLOSE_PERCENT.value: np.round(
+                max_to_min / start_close * 100, 2
+            ),
+            FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: np.round(
+                points_frm_avg_till_max_to_min / start_close * 100, 2
+            ),
+        }
+    )
 
-                # close to close
-                update_close_to_close(
-                    market_direction=market_direction,
-                    cycle_analysis=cycle_analysis,
-                    close_to_close_key=FirstCycleColumns.CLOSE_TO_CLOSE.value,
-                    last_close=adjusted_cycle_data.iloc[-1]["Close"],
-                    first_close=adjusted_cycle_data.iloc[0]["Close"],
-                )
 
-                update_positive_negative(
-                    cycle_analysis=cycle_analysis,
-                    columns=[FirstCycleColumns.CLOSE_TO_CLOSE.value],
-                )
+def analyze_cycles(df, time_frame, kwargs, groups=None):
+    if groups is None:
+        groups = get_cycle_groups(df)
+    group_codes, group_ids = groups.codes, groups.ids
+    low, high = (df[col].to_numpy(dtype=float) for col in ("Low", "High"))
 
-                group_start_close = group_start_row["Close"]
-                update_percent_with_grp_start_close(
-                    cycle_analysis=cycle_analysis,
-                    percent_col=FirstCycleColumns.CLOSE_TO_CLOSE.value,
-                    percent_key=FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value,
-                    group_start_close=group_start_close,
-                )
+    # Identify cycle columns dynamically
+    cycle_columns = [col for col in df.columns if "cycle_no" in col]
+    metrics = []
+    for cycle_col in cycle_columns:
+        # real cycle starts from cycle no 2
+        segments = get_cycle_segments(df, cycle_col, group_codes)
+        min_offsets, max_offsets = get_min_max_offsets(
+            segments, groups.is_long[segments.group_codes], low, high
+        )
+        cycle_metrics = get_cycle_metrics(
+            df, segments, groups, min_offsets, max_offsets
+        )
+        metric_columns = list(cycle_metrics.columns)
+        metrics.append(
+            cycle_metrics.assign(
+                group_code=segments.group_codes,
+                cycle=segments.cycles,
+                index=df.index[segments.last],
+                found=(min_offsets >= 0) & (max_offsets >= 0),
+            )
+        )
 
-                update_percent_with_grp_start_close(
-                    cycle_analysis=cycle_analysis,
-                    percent_col=FirstCycleColumns.MAX_TO_MIN.value,
-                    percent_key=FirstCycleColumns.MAX_TO_MIN_TO_CLOSE_PERCENT.value,
-                    group_start_close=group_start_close,
-                )
+        cycles = df[cycle_col].to_numpy()
+        has_cycles = np.zeros(len(group_ids), dtype=bool)
+        has_cycles[group_codes[(group_codes >= 0) & (cycles > 0)]] = True
+        for group_id in group_ids[~has_cycles]:
+            print(f"No cycles found in group {group_id}")
 
-                update_percent_with_grp_start_close(
-                    cycle_analysis=cycle_analysis,
-                    percent_col=FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value,
-                    percent_key=FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value,
-                    group_start_close=group_start_close,
-                )
+    if not metrics:
+        return []
 
-                # cycle_analysis[FirstCycleColumns.DURATION_TO_MAX.value] = (
-                #     format_duration(
-                #         make_positive(
-                #             make_round(
-                #                 (
-                #                     (
-                #                         cycle_data.loc[max_idx, "dt"]
-                #                         - cycle_data["dt"].iloc[0]
-                #                     ).total_seconds()
-                #                     / (3600 * 24)
-                #                 )
-                #             )
-                #         )
-                #     )
-                # )
-
-                # update_duration_above_BB(
-                #     kwargs,
-                #     market_direction,
-                #     cycle_col,
-                #     cycle_analysis,
-                #     cycle_data,
-                # )
-
-                # signal start to max
-                # cycle_analysis[
-                #     FirstCycleColumns.SIGNAL_START_TO_MAX_POINTS.value
-                # ] = make_positive(
-                #     make_round(
-                #         group_start_row["signal_start_price"]
-                #         - cycle_analysis[FirstCycleColumns.CYCLE_MAX.value]
-                #     )
-                # )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.SIGNAL_START_TO_MAX_PERCENT.value
-                # ] = make_round(
-                #     make_positive(
-                #         cycle_analysis[
-                #             FirstCycleColumns.SIGNAL_START_TO_MAX_POINTS.value
-                #         ]
-                #         / group_start_row["signal_start_price"]
-                #         * 100
-                #     )
-                # )
-
-                # move from start of cycle to max
-                # cycle_analysis[
-                #     FirstCycleColumns.MOVE_START_TO_MAX_CYCLE_POINTS.value
-                # ] = make_round(
-                #     cycle_analysis[FirstCycleColumns.CYCLE_MAX.value]
-                #     - group_start_row["Close"]
-                # )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.MOVE_START_TO_MAX_CYCLE_PERCENT.value
-                # ] = make_round(
-                #     make_positive(
-                #         cycle_analysis[
-                #             FirstCycleColumns.MOVE_START_TO_MAX_CYCLE_POINTS.value
-                #         ]
-                #         / group_start_row["Close"]
-                #         * 100
-                #     )
-                # )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.SIGNAL_START_TO_MINIMUM_POINTS.value
-                # ] = make_positive(
-                #     make_round(
-                #         group_start_row["signal_start_price"]
-                #         - cycle_analysis[FirstCycleColumns.CYCLE_MIN.value]
-                #     )
-                # )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.SIGNAL_START_TO_MINIMUM_PERCENT.value
-                # ] = make_round(
-                #     make_positive(
-                #         cycle_analysis[
-                #             FirstCycleColumns.SIGNAL_START_TO_MINIMUM_POINTS.value
-                #         ]
-                #         / group_start_row["signal_start_price"]
-                #         * 100
-                #     )
-                # )
-
-                # if market_direction == MarketDirection.LONG:
-                #     cycle_analysis[
-                #         FirstCycleColumns.AVERAGE_TILL_MIN.value
-                #     ] = make_round(cycle_data.loc[:min_idx]["Low"].mean())
-                # else:
-                #     cycle_analysis[
-                #         FirstCycleColumns.AVERAGE_TILL_MIN.value
-                #     ] = make_round(
-                #         cycle_data.loc[max_idx + 1 : min_idx]["Low"].mean()
-                #     )
-
-                # category
-                # if group_start_row["market_direction"] == MarketDirection.LONG:
-                #     cycle_analysis[FirstCycleColumns.CATEGORY.value] = (
-                #         "Below"
-                #         if cycle_analysis[FirstCycleColumns.CYCLE_MIN.value]
-                #         > group_start_row["signal_start_price"]
-                #         else "Rebound"
-                #     )
-                # else:
-                #     cycle_analysis[FirstCycleColumns.CATEGORY.value] = (
-                #         "Rebound"
-                #         if cycle_analysis[FirstCycleColumns.CYCLE_MAX.value]
-                #         > group_start_row["signal_start_price"]
-                #         else "Below"
-                #     )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value
-                # ] = format_duration(
-                #     make_positive(
-                #         make_round(
-                #             (
-                #                 (
-                #                     cycle_data.loc[max_idx, "dt"]
-                #                     - cycle_data.loc[min_idx, "dt"]
-                #                 ).total_seconds()
-                #             )
-                #         )
-                #     )
-                # )
-
-                # cycle_analysis[
-                #     FirstCycleColumns.AVG_OF_MAX_TO_AVG_OF_MIN.value
-                # ] = make_round(
-                #     make_positive(
-                #         cycle_analysis[
-                #             FirstCycleColumns.AVERAGE_TILL_MAX.value
-                #         ]
-                #         - cycle_analysis[
-                #             FirstCycleColumns.AVERAGE_TILL_MIN.value
-                #         ]
-                #     )
-                # )
-
-                results.append(cycle_analysis)
-
-                for key, value in cycle_analysis.items():
-                    updates[key].append(value)
-
-    # update_running_avg(
-    #     cycle_analysis,
-    #     columns=[FirstCycleColumns.CLOSE_TO_CLOSE.value],
-    # )
-
-    # update running avg of f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{FirstCycleColumns.CLOSE_TO_CLOSE.value}"
-
-    for col, values in updates.items():
-        if col != "index" and values:
-            df.loc[updates["index"], col] = values
+    # cycles are reported group by group
+    metrics = pd.concat(metrics, ignore_index=True).sort_values(
+        "group_code", kind="stable"
+    )
+    for group_code, cycle in metrics.loc[
+        ~metrics["found"], ["group_code", "cycle"]
+    ].itertuples(index=False):
+        report_missing_min_max(group_ids[group_code], cycle)
+
+    metrics["group_id"] = group_ids[metrics["group_code"]]
+    results = metrics[["group_id", *metric_columns]].to_dict("records")
+
+    # a row closing cycles of several columns keeps the last one written
+    if len(metrics):
+        values = metrics.drop_duplicates("index", keep="last").set_index(
+            "index"
+        )
+        df.loc[values.index, metric_columns] = values[metric_columns]
 
     update_cumulative_avg(
         df,
@@ -901,28 +810,6 @@ def analyze_cycles(df, time_frame, kwargs):
     return results
 
 
-def update_percent_with_grp_start_close(**kwargs):
-    required_keys = [
-        "cycle_analysis",
-        "group_start_close",
-        "percent_col",
-        "percent_key",
-    ]
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(
-            f"Required keys missing. Required keys are {required_keys}"
-        )
-
-    cycle_analysis = kwargs["cycle_analysis"]
-    group_start_close = kwargs["group_start_close"]
-    percent_col = kwargs["percent_col"]
-    percent_key = kwargs["percent_key"]
-
-    cycle_analysis[percent_key] = make_round(
-        (cycle_analysis[percent_col] / group_start_close) * 100
-    )
-
-
 def calculate_z_score(df):
     df[FirstCycleColumns.Z_SCORE.value] = make_round(
         (
@@ -959,45 +846,54 @@ def prev_weekday(datetime):
 
 
 def update_trail_date_close(df, time_frame, trail_dates):
-    df_copy = df.copy()
-    df_copy.set_index("dt", inplace=True)
-
-    for key, value in trail_dates.items():
-        update_trailing_date(
-            df_copy, key, value + timedelta(minutes=int(time_frame))
-        )
-
-        df_copy[f"{key}_Close"] = df_copy[key].map(df_copy["Close"])
-
-        # df_copy[f"{key}_Close"].fillna(0, inplace=True)
-
-        df[f"{key}_date"] = df_copy[key].values
+    dates = pd.DatetimeIndex(df["dt"])
+    close = df["Close"].to_numpy()
+    trailing_positions = get_trailing_positions(
+        dates,
+        {
+            key: value + timedelta(minutes=int(time_frame))
+            for key, value in trail_dates.items()
+        },
+    )
 
-        df[f"{key}_Close"] = df_copy[f"{key}_Close"].values
+    for key, positions in trailing_positions.items():
+        found = positions >= 0
 
+        df[f"{key}_date"] = dates[positions].where(found).values
 
-def update_trailing_date(df_copy, col_name, time_delta):
-    # Calculate the new date by subtracting time_delta from the index
-    df_copy[col_name] = df_copy.index - time_delta
+        df[f"{key}_Close"] = np.where(found, close[positions], np.nan)
 
-    # Find the previous index that is present in the DataFrame
-    def find_previous_index(date):
-        # Get all available indices that are before the given date
-        valid_indices = df_copy.index[df_copy.index <= date]
-        if valid_indices.empty:
-            return pd.NaT
-        else:
-            return valid_indices[-1]
 
-    # Apply the function to find the previous present index
-    df_copy[col_name] = df_copy[col_name].apply(find_previous_index)
+def get_trailing_positions(dates, time_deltas):
+    """
+    Position of the last row dated on or before every date minus each time
+    delta, -1 when there is none.
 
-    # Any date that is not in the index will be converted to NaT
-    df_copy[col_name] = df_copy[col_name].where(
-        df_copy[col_name].isin(df_copy.index), pd.NaT
-    )
+    Args:
+        dates (pd.DatetimeIndex): Row dates.
+        time_deltas (dict): Trailing window by key.
 
-    return df_copy
+    Returns:
+        dict: Row positions by key.
+    """
+    values = dates.to_numpy()
+    if dates.is_monotonic_increasing:
+        order = np.arange(len(values))
+    else:
+        # the last row in frame order among the earlier dates
+        order = np.argsort(values, kind="stable")
+    last_position = np.maximum.accumulate(order)
+    sorted_values = values[order]
+
+    trailing_positions = {}
+    for key, time_delta in time_deltas.items():
+        trailing_dates = values - np.timedelta64(time_delta)
+        counts = np.searchsorted(sorted_values, trailing_dates, side="right")
+        found = (counts > 0) & ~np.isnat(trailing_dates)
+        trailing_positions[key] = np.where(
+            found, last_position[np.maximum(counts - 1, 0)], -1
+        )
+    return trailing_positions
 
 
 def update_rolling_averages(df, time_frame, rolling_avg):
@@ -1031,178 +927,30 @@ def update_cumulative_avg(df, cols):
         )
 
 
-def update_positive_negative(**kwargs):
-    required_keys = ["cycle_analysis", "columns"]
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(
-            f"Required keys missing. Required keys are {required_keys}"
-        )
-
-    cycle_analysis = kwargs["cycle_analysis"]
-    columns = kwargs["columns"]
-
-    for col in columns:
-        if pd.isna(cycle_analysis[col]):
-            cycle_analysis[
-                f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{col}"
-            ] = pd.NA
-        else:
-            cycle_analysis[
-                f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{col}"
-            ] = (1 if cycle_analysis[col] > 0 else 0)
-
-
-def update_cycle_duration(**kwargs):
-
-    required_keys = [
-        "cycle_analysis",
-        "adjusted_cycle_data",
-        "cycle_duration_key",
-    ]
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(f"Missing required keys: {required_keys}")
-
-    cycle_analysis = kwargs["cycle_analysis"]
-    adjusted_cycle_data = kwargs["adjusted_cycle_data"]
-    cycle_duration_key = kwargs["cycle_duration_key"]
-
-    cycle_analysis[cycle_duration_key] = format_duration(
-        make_round(
-            (
-                adjusted_cycle_data.iloc[-1]["dt"]
-                - adjusted_cycle_data.iloc[0]["dt"]
-            ).total_seconds()
-        )
-    )
-
-
-def update_max_to_min_duration(**kwargs):
-
-    required_keys = [
-        "cycle_analysis",
-        "adjusted_cycle_data",
-        "max_idx",
-        "min_idx",
-        "max_to_min_duration_key",
-    ]
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(f"Missing required keys: {required_keys}")
-
-    cycle_analysis = kwargs["cycle_analysis"]
-    adjusted_cycle_data = kwargs["adjusted_cycle_data"]
-    max_idx = kwargs["max_idx"]
-    min_idx = kwargs["min_idx"]
-    max_to_min_duration_key = kwargs["max_to_min_duration_key"]
-
-    try:
-        cycle_analysis[max_to_min_duration_key] = format_duration(
-            make_positive(
-                make_round(
-                    (
-                        (
-                            adjusted_cycle_data.loc[max_idx, "dt"]
-                            - adjusted_cycle_data.loc[min_idx, "dt"]
-                        ).total_seconds()
-                    )
-                )
-            )
-        )
-    except KeyError:
-        cycle_analysis[max_to_min_duration_key] = pd.NA
-
-
-def update_signal_start_duration(**kwargs):
-    required_keys = [
-        "group_start_row",
-        "cycle_analysis",
-        "cycle_data",
-        "signal_start_duration_key",
-    ]
-
-    if not all(key in kwargs for key in required_keys):
-        raise ValueError(f"Missing required keys: {required_keys}")
-
-    cycle_analysis = kwargs["cycle_analysis"]
-    cycle_data = kwargs["cycle_data"]
-    group_start_row = kwargs["group_start_row"]
-    key = kwargs["signal_start_duration_key"]
-
-    cycle_analysis[key] = format_duration(
-        make_round(
-            (cycle_data.iloc[0]["dt"] - group_start_row["dt"]).total_seconds()
-        )
-    )
-
-
-def update_move(**kwargs):
-    required_keys = [
-        "group_start_row",
-        "cycle_analysis",
-        "cycle_data",
-        "move_key",
-    ]
-
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(f"Missing required keys: {required_keys}")
-
-    group_start_row = kwargs["group_start_row"]
-    cycle_analysis = kwargs["cycle_analysis"]
-    cycle_data = kwargs["cycle_data"]
-    move_key = kwargs["move_key"]
-
-    cycle_analysis[move_key] = make_positive(
-        make_round(cycle_data.iloc[0]["Close"] - group_start_row["Close"])
-    )
-
-
-def update_move_percent(**kwargs):
-    required_keys = [
-        "group_start_row",
-        "cycle_analysis",
-        "move_percent_key",
-        "move_key",
-    ]
-
-    if not all([key in kwargs for key in required_keys]):
-        raise ValueError(f"Missing required keys: {required_keys}")
-
-    group_start_row = kwargs["group_start_row"]
-    cycle_analysis = kwargs["cycle_analysis"]
-    move_key = kwargs["move_key"]
-    move_percent_key = kwargs["move_percent_key"]
-
-    cycle_analysis[move_percent_key] = make_positive(
-        make_round(cycle_analysis[move_key] / group_start_row["Close"] * 100)
-    )
-
-
 def update_duration_above_BB(
     kwargs, market_direction, cycle_col, cycle_analysis, cycle_data
 ):
     # update duration first yes to first yes to no change
     # Determine the first_yes_index and first_yes_change_condition based on market direction
 
+    close_to = cycle_data[f"close_to_{cycle_col[9:]}"]
     if market_direction == MarketDirection.LONG or not kwargs.get(
         "include_higher_and_lower"
     ):
-        first_yes_index = cycle_data[
-            cycle_data[f"close_to_{cycle_col[9:]}"] == "YES"
-        ]["dt"].iloc[0]
+        first_yes_index = cycle_data[close_to]["dt"].iloc[0]
 
-        first_yes_change_condition = (
-            cycle_data[f"close_to_{cycle_col[9:]}"] == "YES"
-        ) & (cycle_data[f"close_to_{cycle_col[9:]}"].shift(-1) == "NO")
+        first_yes_change_condition = close_to & ~close_to.shift(
+            -1, fill_value=True
+        )
 
     elif market_direction == MarketDirection.SHORT and kwargs.get(
         "include_higher_and_lower"
     ):
-        first_yes_index = cycle_data[
-            cycle_data[f"close_to_{cycle_col[9:]}"] == "NO"
-        ]["dt"].iloc[0]
+        first_yes_index = cycle_data[~close_to]["dt"].iloc[0]
 
-        first_yes_change_condition = (
-            cycle_data[f"close_to_{cycle_col[9:]}"] == "NO"
-        ) & (cycle_data[f"close_to_{cycle_col[9:]}"].shift(-1) == "YES")
+        first_yes_change_condition = ~close_to & close_to.shift(
+            -1, fill_value=False
+        )
 
     try:
         first_yes_change = cycle_data[first_yes_change_condition]["dt"].iloc[0]
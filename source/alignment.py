@@ -0,0 +1,74 @@
+"""
+As-of alignment of several time frames onto one base frame.
+
+The cycle base joins every BB and fractal frame onto the close time frame
+with `pd.merge_asof`, one call per frame, each copying the growing left
+frame. Here the row of every frame matching each base timestamp is found
+with one `searchsorted` per frame, and the requested columns of all the
+frames are gathered and joined to the base frame in a single step. The
+result matches chained `merge_asof` calls: a fresh RangeIndex, and missing
+matches upcast the column like a merge would (int to float, bool to
+object).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def asof_positions(base_times, times, direction="backward") -> np.ndarray:
+    """
+    Row of the sorted `times` matching every base time, -1 for none.
+
+    Args:
+        base_times (np.ndarray): Times to align.
+        times (np.ndarray): Sorted times of the frame joined.
+        direction (str): "backward" takes the last row at or before the base
+            time, "forward" the first row at or after it.
+    """
+    if direction == "backward":
+        return np.searchsorted(times, base_times, side="right") - 1
+    if direction == "forward":
+        positions = np.searchsorted(times, base_times, side="left")
+        return np.where(positions < len(times), positions, -1)
+    raise ValueError(f"Unsupported as-of direction: {direction}")
+
+
+def align_frames(base_df, frames, on="dt", direction="backward"):
+    """
+    Join columns of several frames to `base_df` as of its `on` column.
+
+    Args:
+        base_df (pd.DataFrame): Frame sorted by `on`.
+        frames (iterable): (frame, columns) pairs, every frame indexed by
+            its sorted timestamps.
+        on (str): Timestamp column of `base_df`.
+        direction (str): See `asof_positions`.
+
+    Returns:
+        pd.DataFrame: `base_df` followed by the columns of every frame, in
+        the order given.
+    """
+    base_times = base_df[on].to_numpy()
+    frames = list(frames)
+    columns = {}
+    for frame, frame_columns in frames:
+        positions = asof_positions(
+            base_times, frame.index.to_numpy(), direction
+        )
+        for column in frame_columns:
+            if column in columns or column in base_df.columns:
+                raise ValueError(f"Column {column} is joined twice")
+            columns[column] = frame[column].array.take(
+                positions, allow_fill=True
+            )
+
+    if not frames:
+        return base_df
+    index = pd.RangeIndex(len(base_df))
+    return pd.concat(
+        [
+            base_df.set_axis(index, copy=False),
+            pd.DataFrame(columns, index=index, copy=False),
+        ],
+        axis=1,
+    )
@@ -168,9 +168,56 @@ PORTFOLIO_SUMMARY_OUTPUT_FOLDER = str(
     BASE_OUTPUT_FOLDER / PORTFOLIO_OUTPUT_FOLDER / "summary"
 )
 
+RUN_LEDGER_PATH = str(BASE_OUTPUT_FOLDER / "run_ledger.sqlite")
+TELEMETRY_FOLDER = str(BASE_OUTPUT_FOLDER / "telemetry")
+
+# On-disk cache of the cycle base frames, evicted least recently used first
+# past CYCLE_CACHE_MAX_MB. 0 disables the cache.
+CYCLE_CACHE_FOLDER = os.getenv(
+    "CYCLE_CACHE_FOLDER", str(BASE_OUTPUT_FOLDER / "cycle_cache")
+)
+CYCLE_CACHE_MAX_MB = float(os.getenv("CYCLE_CACHE_MAX_MB") or 2048)
+
+# Parsed copies of the volume and volatile tag outputs. Empty keeps them in
+# memory only.
+TAG_STORE_FOLDER = os.getenv(
+    "TAG_STORE_FOLDER", str(BASE_OUTPUT_FOLDER / "tag_store")
+)
+
+# Debug frames of the cycle processors: "off", "sampled" (head, tail and
+# random rows as CSV) or "full" (the whole frame as Parquet). Defaults to
+# sampled when DEBUG is set.
+DEBUG_ARTIFACTS = os.getenv("DEBUG_ARTIFACTS") or (
+    "sampled" if os.getenv("DEBUG", "").lower() == "true" else "off"
+)
+DEBUG_SAMPLE_ROWS = int(os.getenv("DEBUG_SAMPLE_ROWS") or 20)
+
+# Close time frames of a cycle base built side by side, on a "thread" or
+# "process" pool. 1 builds them one after the other.
+CYCLE_TF_WORKERS = int(os.getenv("CYCLE_TF_WORKERS") or 1)
+CYCLE_TF_POOL = os.getenv("CYCLE_TF_POOL", "thread")
+
 # Define the percentage of available CPU to be used
 cpu_percent_to_use = 0.8  # You can adjust this percentage as needed
 
+# Memory budget (MB) for concurrently running sweep tasks. Defaults to
+# memory_percent_to_use of the physical memory when MEMORY_BUDGET_MB is unset.
+memory_percent_to_use = 0.8
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB") or 0) or None
+# Assumed footprint of a task before anything is known about its type
+DEFAULT_TASK_MEMORY_MB = float(os.getenv("DEFAULT_TASK_MEMORY_MB") or 500)
+# Output payloads a sweep worker holds for the parent's writer; frames past
+# it are written by the worker itself
+WRITER_PENDING_MAX_MB = float(os.getenv("WRITER_PENDING_MAX_MB") or 256)
+
+# Where sweep tasks run: "pool" (local processes), "in_process" (debugging)
+# or "socket" (worker agents started with `python -m source.parallel.agent`)
+EXECUTOR_BACKEND = os.getenv("EXECUTOR_BACKEND", "pool")
+EXECUTOR_ADDRESS = os.getenv("EXECUTOR_ADDRESS", "localhost:6000")
+# Secret shared by the socket coordinator and its agents, required with the
+# socket backend: the tasks and results they exchange are pickled
+EXECUTOR_AUTHKEY = os.getenv("EXECUTOR_AUTHKEY", "")
+
 
 INSTRUMENTS = list(
     map(lambda x: x.strip(), os.getenv("INSTRUMENTS", "").split(","))
@@ -222,6 +269,7 @@ class OutputColumn(Enum):
     ENTRY_PRICE = "SG_Entry Price"
     EXIT_PRICE = "SG_Exit Price"
     NET_POINTS = "SG_Net points"
+    CYCLE = "SG_Cycle"
 
 
 class BB_Band_Columns(Enum):
@@ -296,6 +344,15 @@ class TargetProfitColumns(Enum):
     TP_CLOSE_DIFF_PERCENT = "TP Close Diff Percent"
 
 
+# bool columns (band position, MTM crossed, TP end) the csv outputs write as
+# YES/NO
+YES_NO_COLUMN_PREFIXES = (
+    "close_to_",
+    "IS_MTM Crossed",
+    TargetProfitColumns.TP_END.value,
+)
+
+
 class SecondCycleIDColumns(Enum):
     CTC_CYCLE_ID = "CTC Cycle ID"
     MTM_CYCLE_ID = "MTM Cycle ID"
@@ -0,0 +1,254 @@
+"""
+Persistent cache of the cycle base frames.
+
+`get_cycle_base_df` reads every close and BB time frame of an instrument,
+merges them and numbers the cycles. Signal cycle runs and the PA analysis
+repeat that for every strategy pair and every run, even when the cycle
+configuration did not change. Its output is stored here as one Parquet file
+per close time frame, under a key hashing:
+
+- the kwargs the builder reads (instrument, time frames, periods, sds,
+  parameter ids, the higher/lower and BB 2 flags, fractal settings, ...)
+- the content of `base_df`
+- the manifest (path, size, modification time) of every input file
+
+so a changed input or configuration never hits a stale entry. Entries are
+evicted least recently used first once the cache outgrows
+CYCLE_CACHE_MAX_MB; 0 disables the cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from source.constants import (
+    CYCLE_CACHE_FOLDER,
+    CYCLE_CACHE_MAX_MB,
+    MarketDirection,
+)
+from source.parallel.ledger import normalize_params
+
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# bump when the frames built by get_cycle_base_df change for the same inputs
+CACHE_VERSION = 1
+
+# kwargs read while building the cycle base frames
+CACHE_KEY_PARAMS = (
+    "instrument",
+    "close_time_frames_1",
+    "bb_time_frames_1",
+    "bb_time_frames_2",
+    "periods_1",
+    "periods_2",
+    "sds_1",
+    "sds_2",
+    "parameter_id_1",
+    "parameter_id_2",
+    "include_higher_and_lower",
+    "check_bb_2",
+    "close_percent",
+    "include_volume",
+    "include_volatile",
+    "fractal_cycle",
+    "fractal_tf",
+    "fractal_sd",
+    "fractal_count",
+    "fractal_count_tf",
+    "fractal_count_sd",
+)
+
+# enums stored in the frames, written by name
+ENUM_TYPES = {MarketDirection.__name__: MarketDirection}
+
+MANIFEST = "manifest.json"
+METADATA_KEY = b"cycle_cache"
+
+
+def is_enabled():
+    return CYCLE_CACHE_MAX_MB > 0
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    digest = hashlib.sha1()
+    digest.update(
+        json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode()
+    )
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy())
+    return digest.hexdigest()
+
+
+def get_file_manifest(files_to_read: dict) -> list:
+    """
+    Path, requested columns, size and modification time of every input.
+    """
+    manifest = []
+    for key, details in files_to_read.items():
+        try:
+            stat = os.stat(details["file_path"])
+            version = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            version = None
+        manifest.append(
+            [
+                key,
+                details["file_path"],
+                sorted(details["cols"]),
+                details.get("rename"),
+                version,
+            ]
+        )
+    return sorted(manifest, key=str)
+
+
+def cache_key(kwargs: dict, base_df: pd.DataFrame, files_to_read: dict):
+    params = {param: kwargs.get(param) for param in CACHE_KEY_PARAMS}
+    payload = json.dumps(
+        normalize_params(
+            {
+                "version": CACHE_VERSION,
+                "params": params,
+                "base_df": hash_frame(base_df),
+                "files": get_file_manifest(files_to_read),
+            }
+        ),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Arrow table of a frame, enum columns written by name. The object columns
+    are recorded so they come back as object columns, missing values as NaN.
+    """
+    enums, objects, encoded = {}, [], {}
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        objects.append(column)
+        types = set(df[column].dropna().map(type).unique())
+        value_type = types.pop() if len(types) == 1 else None
+        if value_type and ENUM_TYPES.get(value_type.__name__) is value_type:
+            enums[column] = value_type.__name__
+            encoded[column] = df[column].map(
+                lambda value: value.name, na_action="ignore"
+            )
+    table = pa.Table.from_pandas(df.assign(**encoded), preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(
+        {"enums": enums, "objects": objects}
+    ).encode("utf-8")
+    return table.replace_schema_metadata(metadata)
+
+
+def from_table(table: pa.Table) -> pd.DataFrame:
+    df = table.to_pandas()
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    for column in metadata["objects"]:
+        # Arrow nulls come back as None, the frames held NaN
+        values = df[column].astype(object)
+        df[column] = values.where(values.notna(), np.nan)
+    for column, enum_name in metadata["enums"].items():
+        df[column] = df[column].map(
+            ENUM_TYPES[enum_name].__getitem__, na_action="ignore"
+        )
+    return df
+
+
+def load(key, folder=CYCLE_CACHE_FOLDER):
+    """
+    Cached cycle base frames and result name, None on a miss.
+    """
+    entry = os.path.join(folder, key)
+    try:
+        with open(os.path.join(entry, MANIFEST), "r") as file:
+            manifest = json.load(file)
+        frames = {
+            time_frame: from_table(
+                pq.read_table(os.path.join(entry, file_name))
+            )
+            for time_frame, file_name in manifest["frames"]
+        }
+        # the modification time orders the entries for eviction
+        os.utime(os.path.join(entry, MANIFEST))
+    except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+        if os.path.exists(entry):
+            logger.warning(f"Ignoring unreadable cycle cache entry {key}: {e}")
+        return None
+    return frames, manifest["name"]
+
+
+def store(key, frames: dict, name, folder=CYCLE_CACHE_FOLDER):
+    """
+    Write the cycle base frames, then evict entries over the size limit.
+    Frames Arrow cannot represent are not cached.
+    """
+    entry = os.path.join(folder, key)
+    temp_entry = f"{entry}.tmp-{os.getpid()}"
+    os.makedirs(temp_entry, exist_ok=True)
+    try:
+        manifest = {"name": name, "frames": []}
+        for index, (time_frame, df) in enumerate(frames.items()):
+            file_name = f"frame_{index}.parquet"
+            pq.write_table(
+                to_table(df),
+                os.path.join(temp_entry, file_name),
+                compression="zstd",
+            )
+            manifest["frames"].append([time_frame, file_name])
+        with open(os.path.join(temp_entry, MANIFEST), "w") as file:
+            json.dump(manifest, file)
+        # another worker may have stored the same entry meanwhile
+        os.rename(temp_entry, entry)
+    except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+        if not os.path.exists(entry):
+            logger.warning(f"Could not cache the cycle base frames: {e}")
+        shutil.rmtree(temp_entry, ignore_errors=True)
+        return
+    evict(folder)
+
+
+def get_entry_size(entry):
+    return sum(
+        os.path.getsize(os.path.join(entry, file_name))
+        for file_name in os.listdir(entry)
+    )
+
+
+def evict(folder=CYCLE_CACHE_FOLDER, max_mb=CYCLE_CACHE_MAX_MB):
+    """
+    Remove the least recently used entries until the cache fits max_mb.
+    """
+    entries = []
+    for key in os.listdir(folder):
+        entry = os.path.join(folder, key)
+        try:
+            entries.append(
+                (
+                    os.path.getmtime(os.path.join(entry, MANIFEST)),
+                    get_entry_size(entry),
+                    entry,
+                )
+            )
+        except OSError:
+            # an entry still being written
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_mb * MB:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
@@ -20,6 +20,7 @@ The `data_reader.py` module provided is responsible for reading and merging vari
     - Returns the list of DataFrames.
 """
 
+from contextlib import contextmanager
 from functools import reduce
 import logging
 import os
@@ -242,6 +243,62 @@ def update_entry_fractal_file(
     }
 
 
+# frames parsed by `read_data_file`, kept while `reuse_input_frames` is open
+_input_frames = None
+
+
+@contextmanager
+def reuse_input_frames():
+    """
+    Parse every file read by `read_files` once inside the block.
+
+    The strategy pairs of an instrument read the same close, BB and fractal
+    files, so a task running several of them keeps the parsed frames and
+    only slices their date range per pair.
+    """
+    global _input_frames
+    previous = _input_frames
+    if previous is None:
+        _input_frames = {}
+    try:
+        yield
+    finally:
+        _input_frames = previous
+
+
+def parse_data_file(details):
+    df = pd.read_csv(
+        details.get("file_path"),
+        parse_dates=[details["index_col"]],
+        date_format="%Y-%m-%d %H:%M:%S",
+        usecols=details["cols"],
+        dtype=details.get("dtype", None),
+        index_col=details["index_col"],
+    )
+
+    df.index = pd.to_datetime(df.index, errors="coerce")
+    return df
+
+
+def read_data_file(details):
+    if _input_frames is None:
+        return parse_data_file(details)
+
+    file_path = details.get("file_path")
+    stat = os.stat(file_path)
+    key = (
+        file_path,
+        stat.st_size,
+        stat.st_mtime_ns,
+        tuple(details["cols"]),
+        repr(details.get("dtype", None)),
+        details["index_col"],
+    )
+    if key not in _input_frames:
+        _input_frames[key] = parse_data_file(details)
+    return _input_frames[key]
+
+
 def read_files(
     start_date,
     end_date,
@@ -252,16 +309,7 @@ def read_files(
     for file_name, details in file_details.items():
         if details["read"]:
             # Read the data CSV file into a DataFrame
-            df = pd.read_csv(
-                details.get("file_path"),
-                parse_dates=[details["index_col"]],
-                date_format="%Y-%m-%d %H:%M:%S",
-                usecols=details["cols"],
-                dtype=details.get("dtype", None),
-                index_col=details["index_col"],
-            )
-
-            df.index = pd.to_datetime(df.index, errors="coerce")
+            df = read_data_file(details)
 
             # Function to find the nearest date if KeyError occurs
             def get_nearest_date(df, target_date):
@@ -277,6 +325,10 @@ def read_files(
                 nearest_end = get_nearest_date(df, end_date)
                 df = df.loc[nearest_start:nearest_end]
 
+            if _input_frames is not None:
+                # the parsed frame is shared, callers may change the slice
+                df = df.copy()
+
             # Rename columns if specified
             if "rename" in details:
                 df.rename(columns=details["rename"], inplace=True)
@@ -322,19 +374,15 @@ def load_strategy_data_1(
     return all_dfs
 
 
-def load_strategy_data(
-    instrument,
-    portfolio_ids,
-    strategy_ids,
-    start_date,
-    end_date,
-    base_path,
+def get_strategy_file_details(
+    instrument, portfolio_ids, strategy_ids, base_path
 ):
     """
-    Load strategy data from CSV files for the specified instrument, portfolio, and strategy IDs.
-    """
+    Path and columns of every strategy file read for the instrument.
 
-    is_close_read, strategy_dfs = False, []
+    The Close column is only read from the first strategy file.
+    """
+    file_details = []
     for portfolio_id, strategy_id in zip(portfolio_ids, strategy_ids):
         # Construct the path to the strategy CSV file
         strategy_path = os.path.join(
@@ -345,10 +393,29 @@ def load_strategy_data(
         )
         # Define the columns to be read from the CSV file
         columns = ["dt", f"TAG_{portfolio_id}_{strategy_id}"]
-        if not is_close_read:
+        if not file_details:
             columns.insert(1, "Close")
-            is_close_read = True
+        file_details.append({"file_path": strategy_path, "cols": columns})
+    return file_details
+
+
+def load_strategy_data(
+    instrument,
+    portfolio_ids,
+    strategy_ids,
+    start_date,
+    end_date,
+    base_path,
+):
+    """
+    Load strategy data from CSV files for the specified instrument, portfolio, and strategy IDs.
+    """
 
+    strategy_dfs = []
+    for details in get_strategy_file_details(
+        instrument, portfolio_ids, strategy_ids, base_path
+    ):
+        strategy_path, columns = details["file_path"], details["cols"]
         try:
             # Read the strategy CSV file into a DataFrame
             strategy_df = pd.read_csv(
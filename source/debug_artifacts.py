@@ -0,0 +1,121 @@
+"""
+Debug frames written by the cycle processors.
+
+The cycle runs dump intermediate frames (the signal changes, the target
+profit base, the merged cycle frame) for inspection. Written in full as CSV
+for every task they cost a measurable share of its time, and the ones named
+without the task overwrote each other across workers. The DEBUG_ARTIFACTS
+level decides what is written:
+
+- off: nothing
+- sampled: the first, last and some random rows as CSV
+- full: the whole frame as zstd compressed Parquet
+
+Artifact names carry the task context set with `set_context` and, inside a
+sweep, the task id, so every task writes its own files.
+"""
+
+from enum import Enum
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from source.constants import DEBUG_ARTIFACTS, DEBUG_SAMPLE_ROWS
+from source.cycle_cache import to_table
+from source.parallel import telemetry
+from source.utils import write_dataframe_to_csv
+
+
+logger = logging.getLogger(__name__)
+
+
+class DebugLevel(Enum):
+    OFF = "off"
+    SAMPLED = "sampled"
+    FULL = "full"
+
+
+LEVEL = DebugLevel(DEBUG_ARTIFACTS.lower())
+
+_context = ""
+
+
+def set_context(*parts):
+    """
+    Name the task the next artifacts belong to, like its instrument and
+    strategy pair.
+    """
+    global _context
+    _context = "_".join(str(part) for part in parts if part != "")
+
+
+def is_enabled():
+    return LEVEL != DebugLevel.OFF
+
+
+def get_artifact_name(name):
+    parts = [name, _context, telemetry.get_task()]
+    name = "_".join(str(part) for part in parts if part not in ("", None))
+    return name.replace(":", "-").replace(",", "-")
+
+
+def sample_rows(df: pd.DataFrame, name, rows=DEBUG_SAMPLE_ROWS):
+    """
+    First and last `rows` rows of the frame and `rows` random rows in
+    between, in frame order. The random rows only depend on the name, so
+    the sample is repeatable.
+    """
+    if len(df) <= 3 * rows:
+        return df
+    seed = int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16)
+    middle = np.random.default_rng(seed).choice(
+        np.arange(rows, len(df) - rows), size=rows, replace=False
+    )
+    positions = np.concatenate(
+        [np.arange(rows), np.sort(middle), np.arange(len(df) - rows, len(df))]
+    )
+    return df.iloc[positions]
+
+
+def write_full(df: pd.DataFrame, folder_name, name):
+    os.makedirs(folder_name, exist_ok=True)
+    try:
+        path = os.path.join(folder_name, f"{name}.parquet")
+        pq.write_table(to_table(df), path, compression="zstd")
+    except (pa.ArrowException, TypeError, ValueError):
+        # frames Arrow cannot represent
+        path = os.path.join(folder_name, f"{name}.pkl.gz")
+        df.to_pickle(path)
+    return path
+
+
+def write_artifact(df: pd.DataFrame, folder_name, name):
+    """
+    Write a debug frame at the DEBUG_ARTIFACTS level.
+
+    Args:
+        df (pd.DataFrame): Frame to inspect.
+        folder_name (str): Output folder.
+        name (str): Artifact name, completed with the task context.
+
+    Returns:
+        str: Path written, None when debug artifacts are off.
+    """
+    if LEVEL == DebugLevel.OFF:
+        return None
+    name = get_artifact_name(name)
+    try:
+        if LEVEL == DebugLevel.FULL:
+            return write_full(df, folder_name, name)
+        return write_dataframe_to_csv(
+            sample_rows(df, name), folder_name, f"{name}.csv"
+        )
+    except OSError as e:
+        # a debug dump must never fail the task
+        logger.warning(f"Could not write the debug frame {name}: {e}")
+        return None
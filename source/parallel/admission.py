@@ -0,0 +1,204 @@
+"""
+Memory aware admission control for the sweep pools.
+
+A cycle task with many BB timeframes can need several GB while a volume task
+needs very little, so a worker count derived from the CPUs alone either runs
+out of memory or leaves the machine idle. Before starting a task the runner
+asks the `AdmissionController`, which only admits it while the memory
+reserved by the running tasks plus the task's own estimate stays under the
+budget.
+
+A task is first estimated from its inputs: the size of every file it reads,
+scaled by the share of the columns it requests. Once tasks of the same type
+have finished, the memory they reported takes over: the peak resident memory
+of the worker while the task ran, less its resident memory when the task
+started. A forked pool worker starts out counting the pages it shares with
+the parent, which the task did not allocate. It is measured from /proc, so
+elsewhere the input based estimate is kept.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+import logging
+import os
+
+from source.constants import (
+    DEFAULT_TASK_MEMORY_MB,
+    MEMORY_BUDGET_MB,
+    memory_percent_to_use,
+)
+
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# in-memory size of a parsed CSV column relative to its size on disk,
+# including the working copies made while merging and building cycles
+IN_MEMORY_FACTOR = 3
+
+
+def get_total_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / MB
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def get_memory_budget_mb():
+    """
+    Configured budget, else a share of the physical memory. None when
+    neither is known, which disables admission control.
+    """
+    if MEMORY_BUDGET_MB:
+        return MEMORY_BUDGET_MB
+    total = get_total_memory_mb()
+    return total * memory_percent_to_use if total else None
+
+
+def get_rss_mb():
+    """
+    Current resident memory of the process, None without /proc.
+    """
+    try:
+        with open("/proc/self/statm", "r") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+def get_peak_rss_mb():
+    """
+    Peak resident memory of the process since the last `reset_peak_rss`,
+    None without /proc.
+    """
+    try:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_peak_rss():
+    try:
+        # lowers the peak to the current resident memory
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def start_task_memory():
+    """
+    Start measuring the memory of a task in this worker.
+
+    Returns:
+        float: Resident memory the task starts from, None when unknown.
+    """
+    reset_peak_rss()
+    return get_rss_mb()
+
+
+def get_task_memory_mb(baseline_mb):
+    """
+    Memory (MB) the task added to the worker at its peak, None when unknown.
+    """
+    peak = get_peak_rss_mb()
+    if peak is None or baseline_mb is None:
+        return None
+    return max(peak - baseline_mb, 0.0)
+
+
+@lru_cache(maxsize=None)
+def get_column_count(file_path):
+    with open(file_path, "r") as file:
+        return len(file.readline().split(","))
+
+
+def estimate_input_memory(file_details) -> float:
+    """
+    Estimate the memory (MB) needed to hold the requested columns of files.
+
+    Args:
+        file_details (iterable): Dicts with a "file_path" and optionally the
+            "cols" read from it, as built for `read_files`.
+
+    Returns:
+        float: Estimated MB, 0 when none of the files can be found.
+    """
+    total = 0.0
+    for details in file_details:
+        file_path = details["file_path"]
+        try:
+            size = os.path.getsize(file_path) / MB
+            share = 1.0
+            if details.get("cols"):
+                share = min(
+                    len(details["cols"]) / get_column_count(file_path), 1.0
+                )
+        except (OSError, TypeError, ZeroDivisionError):
+            continue
+        total += size * share * IN_MEMORY_FACTOR
+    return total
+
+
+class AdmissionController:
+    """
+    Tracks the memory reserved by running tasks and the memory observed per
+    task type.
+    """
+
+    def __init__(self, budget_mb=None, default_task_mb=DEFAULT_TASK_MEMORY_MB):
+        self.budget_mb = budget_mb or get_memory_budget_mb()
+        self.default_task_mb = default_task_mb
+        self.running = {}
+        # task type -> [(input MB, task memory MB)]
+        self.observed = defaultdict(list)
+
+    @property
+    def reserved_mb(self):
+        return sum(self.running.values())
+
+    def estimate(self, task_type, input_mb=0.0):
+        """
+        Projected memory of a task.
+
+        The heaviest finished task of the same type, its memory scaled up
+        when this task reads more input than it did. Without observations the
+        input based estimate, never less than the default footprint of a task.
+        """
+        observed = self.observed.get(task_type)
+        if not observed:
+            return max(input_mb, self.default_task_mb)
+        return max(
+            (
+                task_mb * max(1.0, input_mb / observed_input)
+                if observed_input
+                else task_mb
+            )
+            for observed_input, task_mb in observed
+        )
+
+    def can_admit(self, estimate_mb):
+        # always admit a task into an empty pool, otherwise a task larger
+        # than the budget would never run
+        if self.budget_mb is None or not self.running:
+            return True
+        return self.reserved_mb + estimate_mb <= self.budget_mb
+
+    def admit(self, key, estimate_mb):
+        if self.budget_mb and estimate_mb > self.budget_mb:
+            logger.warning(
+                f"Task estimated at {estimate_mb:.0f} MB exceeds the memory "
+                f"budget of {self.budget_mb:.0f} MB, running it alone"
+            )
+        self.running[key] = estimate_mb
+
+    def release(self, key, task_type=None, input_mb=0.0, task_mb=None):
+        self.running.pop(key, None)
+        if task_type and task_mb is not None:
+            self.observed[task_type].append((input_mb, task_mb))
@@ -0,0 +1,104 @@
+"""
+Worker agent for the socket executor backend.
+
+Run one agent per task slot on every machine taking part in a sweep:
+
+    python -m source.parallel.agent --address <coordinator host>:6000
+
+The agent connects to the coordinator started by a sweep with
+EXECUTOR_BACKEND=socket, runs the tasks it is sent one at a time and streams
+their stage events back. When the sweep ends the agent waits for the next
+one, unless started with --once. The repository, the .env data paths and the
+EXECUTOR_AUTHKEY must match the coordinator's; the agent refuses to start
+without a key.
+"""
+
+import argparse
+import logging
+from multiprocessing.connection import Client
+import time
+
+from source.constants import EXECUTOR_ADDRESS, EXECUTOR_AUTHKEY
+from source.parallel import telemetry
+from source.parallel.executors import encode_authkey, parse_address
+
+
+logger = logging.getLogger(__name__)
+
+# seconds between attempts to reach the coordinator
+RETRY_INTERVAL = 5
+
+
+class ConnectionEvents:
+    """
+    Queue-like adapter sending telemetry events over the connection.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def put_nowait(self, event):
+        self.connection.send(("event", event))
+
+
+def serve(connection):
+    telemetry.init_worker(ConnectionEvents(connection))
+    while True:
+        item = connection.recv()
+        if item is None:
+            return
+        func, args = item
+        try:
+            message = ("result", func(*args))
+        except Exception as e:
+            message = ("error", e)
+        try:
+            connection.send(message)
+        except Exception as e:
+            # the result or exception could not be pickled
+            connection.send(("error", RuntimeError(str(e))))
+
+
+def run_agent(address=EXECUTOR_ADDRESS, authkey=EXECUTOR_AUTHKEY, once=False):
+    address = parse_address(address)
+    authkey = encode_authkey(authkey)
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+        except OSError:
+            time.sleep(RETRY_INTERVAL)
+            continue
+        logger.info(f"Connected to coordinator at {address[0]}:{address[1]}")
+        try:
+            with connection:
+                serve(connection)
+        except (OSError, EOFError) as e:
+            logger.warning(f"Lost the coordinator: {e}")
+        if once:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", default=EXECUTOR_ADDRESS)
+    parser.add_argument(
+        "--authkey",
+        default=EXECUTOR_AUTHKEY,
+        help="Defaults to EXECUTOR_AUTHKEY, which keeps the key out of the "
+        "process list",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit after the first sweep instead of waiting for the next",
+    )
+    args = parser.parse_args()
+    try:
+        encode_authkey(args.authkey)
+    except ValueError as e:
+        parser.error(str(e))
+    run_agent(args.address, args.authkey, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Executor backends for the sweep runner.
+
+`run_tasks` only needs to submit a call and later poll its result, so the
+place where the tasks actually run is pluggable:
+
+- in_process: runs every task in the calling process, for debugging
+- pool: a local multiprocessing pool (the default)
+- socket: a coordinator that hands tasks to worker agents connecting over
+  TCP, started with `python -m source.parallel.agent` on any machine that
+  has the repository and the data paths. Several agents on localhost stand
+  in for several machines.
+
+The backend is chosen with the EXECUTOR_BACKEND environment variable, so a
+sweep scales past one box without changes to the processors.
+"""
+
+from enum import Enum
+import logging
+from multiprocessing.connection import Client, Listener
+import multiprocessing
+import queue
+import threading
+
+from source.constants import (
+    EXECUTOR_ADDRESS,
+    EXECUTOR_AUTHKEY,
+    EXECUTOR_BACKEND,
+)
+from source.parallel import telemetry
+
+
+logger = logging.getLogger(__name__)
+
+
+def encode_authkey(authkey):
+    """
+    Authkey of the socket backend. Tasks and results are unpickled on
+    receipt, so a connection is only accepted with a secret key.
+    """
+    if not authkey:
+        raise ValueError(
+            "EXECUTOR_AUTHKEY must be set to a secret shared by the "
+            "coordinator and the worker agents to use the socket executor"
+        )
+    return authkey.encode("utf-8")
+
+
+class ExecutorBackend(Enum):
+    IN_PROCESS = "in_process"
+    POOL = "pool"
+    SOCKET = "socket"
+
+
+def parse_address(address: str):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class TaskHandle:
+    """
+    Result of a submitted call, polled like `multiprocessing` AsyncResult.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def set_result(self, value):
+        self.value = value
+        self.event.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.event.set()
+
+    def ready(self):
+        return self.event.is_set()
+
+    def wait(self, timeout=None):
+        self.event.wait(timeout)
+
+    def get(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Executor:
+    """
+    Base executor.
+
+    Attributes:
+        capacity (int): Tasks that can usefully run at the same time.
+        local (bool): Whether the tasks share this machine's memory, which
+            is what the admission control budgets for.
+    """
+
+    local = True
+
+    def __init__(self, num_workers, event_queue=None):
+        self.num_workers = num_workers
+        self.event_queue = event_queue
+
+    @property
+    def capacity(self):
+        return self.num_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, func, args):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InProcessExecutor(Executor):
+    def __init__(self, num_workers, event_queue=None):
+        super().__init__(1, event_queue)
+        telemetry.init_worker(event_queue)
+
+    def submit(self, func, args):
+        handle = TaskHandle()
+        try:
+            handle.set_result(func(*args))
+        except Exception as e:
+            handle.set_error(e)
+        return handle
+
+    def close(self):
+        telemetry.init_worker(None)
+
+
+class PoolExecutor(Executor):
+    def __init__(self, num_workers, event_queue=None):
+        super().__init__(num_workers, event_queue)
+        # a fresh worker per task, so its memory goes back to the OS when the
+        # task finishes. The forked worker still counts the pages it shares
+        # with the parent, so tasks report memory relative to their start.
+        self.pool = multiprocessing.Pool(
+            num_workers,
+            initializer=telemetry.init_worker,
+            initargs=(event_queue,),
+            maxtasksperchild=1,
+        )
+
+    def submit(self, func, args):
+        return self.pool.apply_async(func, args=args)
+
+    def close(self):
+        self.pool.terminate()
+
+
+class SocketExecutor(Executor):
+    """
+    Coordinator for worker agents connecting over TCP.
+
+    Every connected agent runs one task at a time; its capacity is the
+    number of agents connected, which may grow while the sweep runs. Stage
+    events sent by the agents are put on the event queue. A task whose agent
+    disconnects fails and is picked up again by a resumed run.
+    """
+
+    local = False
+
+    def __init__(
+        self,
+        num_workers,
+        event_queue=None,
+        address=EXECUTOR_ADDRESS,
+        authkey=EXECUTOR_AUTHKEY,
+    ):
+        self.authkey = encode_authkey(authkey)
+        super().__init__(num_workers, event_queue)
+        self.address = parse_address(address)
+        self.listener = Listener(self.address, authkey=self.authkey)
+        self.pending = queue.Queue()
+        self.agents = []
+        self.closed = False
+        self.lock = threading.Lock()
+        threading.Thread(target=self.accept, daemon=True).start()
+        logger.info(f"Waiting for worker agents on {address}")
+
+    @property
+    def capacity(self):
+        with self.lock:
+            return max(len(self.agents), 1)
+
+    def accept(self):
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                # closed listener or an agent failing authentication
+                continue
+            if self.closed:
+                connection.close()
+                break
+            with self.lock:
+                self.agents.append(connection)
+            logger.info(f"Worker agent connected ({len(self.agents)} total)")
+            threading.Thread(
+                target=self.serve, args=(connection,), daemon=True
+            ).start()
+
+    def serve(self, connection):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                break
+            handle, func, args = item
+            try:
+                connection.send((func, args))
+                while True:
+                    kind, payload = connection.recv()
+                    if kind == "event":
+                        if self.event_queue is not None:
+                            self.event_queue.put(payload)
+                    elif kind == "result":
+                        handle.set_result(payload)
+                        break
+                    else:
+                        handle.set_error(payload)
+                        break
+            except (OSError, EOFError) as e:
+                handle.set_error(
+                    ConnectionError(f"Worker agent disconnected: {e}")
+                )
+                break
+        with self.lock:
+            self.agents.remove(connection)
+        connection.close()
+
+    def submit(self, func, args):
+        handle = TaskHandle()
+        self.pending.put((handle, func, args))
+        return handle
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            agents = len(self.agents)
+        for _ in range(agents):
+            self.pending.put(None)
+        # wake the accept thread so it sees the executor is closed
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.listener.close()
+
+
+EXECUTORS = {
+    ExecutorBackend.IN_PROCESS: InProcessExecutor,
+    ExecutorBackend.POOL: PoolExecutor,
+    ExecutorBackend.SOCKET: SocketExecutor,
+}
+
+
+def create_executor(backend=None, num_workers=1, event_queue=None):
+    """
+    Build the executor of a sweep.
+
+    Args:
+        backend (ExecutorBackend | str): Backend, EXECUTOR_BACKEND if None.
+        num_workers (int): Worker processes of the local pool.
+        event_queue: Queue receiving the workers' telemetry events.
+
+    Returns:
+        Executor: Context manager with `submit(func, args)`.
+    """
+    backend = ExecutorBackend(backend or EXECUTOR_BACKEND)
+    return EXECUTORS[backend](num_workers, event_queue)
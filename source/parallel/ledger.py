@@ -0,0 +1,197 @@
+"""
+Append-only run ledger for long parameter sweeps.
+
+Every task attempt of a sweep (signal/cycle `multiple_process`, volatile and
+volume `process_multiple`) is recorded in a SQLite table keyed by the run id
+and a stable hash of the task parameters and input file versions (see
+`runner.get_task_hash`). A run started with resume asks the ledger which
+tasks already succeeded and only resubmits the failed or missing ones. Rows
+are never updated: the latest attempt of a task is its current status.
+"""
+
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from enum import Enum
+
+import pandas as pd
+
+from source.constants import RUN_LEDGER_PATH
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStatus(Enum):
+    SUCCESS = "SUCCESS"
+    ERROR = "ERROR"
+
+
+def normalize_params(value):
+    """
+    Convert task parameters into a JSON friendly structure.
+
+    Dict keys are stringified (volatile inputs use tuple keys) and enums,
+    dates and other objects fall back to their string representation so the
+    same parameters always produce the same hash.
+    """
+    if isinstance(value, dict):
+        return {
+            str(normalize_params(key)): normalize_params(val)
+            for key, val in value.items()
+        }
+    if isinstance(value, (list, tuple, set)):
+        items = [normalize_params(item) for item in value]
+        return sorted(items, key=str) if isinstance(value, set) else items
+    if isinstance(value, Enum):
+        return value.value
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def task_hash(params: dict) -> str:
+    """
+    Stable hash of the parameters that define a task.
+    """
+    payload = json.dumps(
+        normalize_params(params), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class RunLedger:
+    """
+    SQLite backed ledger of task attempts.
+
+    The ledger is only written from the parent process, so a single
+    connection per sweep is enough.
+    """
+
+    def __init__(self, path=RUN_LEDGER_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                task_hash TEXT NOT NULL,
+                task_type TEXT,
+                status TEXT NOT NULL,
+                output_path TEXT,
+                duration REAL,
+                error_message TEXT,
+                params TEXT,
+                recorded_at TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_runs_run "
+            "ON task_runs (run_id, task_hash)"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def record(
+        self,
+        run_id,
+        hash_,
+        status: TaskStatus,
+        task_type=None,
+        output_path=None,
+        duration=None,
+        error_message="",
+        params=None,
+    ):
+        """
+        Append one task attempt to the ledger.
+        """
+        self.connection.execute(
+            """
+            INSERT INTO task_runs (
+                run_id, task_hash, task_type, status, output_path,
+                duration, error_message, params, recorded_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                run_id,
+                hash_,
+                task_type,
+                status.value,
+                output_path,
+                duration,
+                error_message,
+                json.dumps(normalize_params(params), sort_keys=True)
+                if params is not None
+                else None,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+        self.connection.commit()
+
+    def latest(self, run_id) -> pd.DataFrame:
+        """
+        Latest attempt of every task of the run, one row per task hash.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT t.task_hash, t.task_type, t.status, t.output_path,
+                   t.duration, t.error_message, t.recorded_at
+            FROM task_runs t
+            JOIN (
+                SELECT task_hash, MAX(id) AS id
+                FROM task_runs
+                WHERE run_id = ?
+                GROUP BY task_hash
+            ) last ON last.id = t.id
+            """,
+            self.connection,
+            params=(run_id,),
+        )
+
+    def completed(self, run_id) -> set:
+        """
+        Task hashes whose latest attempt in the run succeeded.
+        """
+        latest = self.latest(run_id)
+        return set(
+            latest.loc[
+                latest["status"] == TaskStatus.SUCCESS.value, "task_hash"
+            ]
+        )
+
+    def status_frame(self, run_id, task_params: list, task_hashes: list):
+        """
+        Build the sweep status table from the ledger.
+
+        Args:
+            run_id (str): Run to report on.
+            task_params (list): Parameters of every task of the sweep.
+            task_hashes (list): Hash of every task, aligned with task_params.
+
+        Returns:
+            DataFrame: Task parameters joined with their latest status.
+        """
+        status_df = pd.DataFrame(task_params)
+        status_df["task_hash"] = task_hashes
+        latest = self.latest(run_id).drop(columns=["task_type"])
+        status_df = status_df.merge(latest, on="task_hash", how="left")
+        status_df["status"] = status_df["status"].fillna("MISSING")
+        status_df["error_message"] = status_df["error_message"].fillna("")
+        return status_df
@@ -0,0 +1,314 @@
+"""
+Shared task runner for the parameter sweeps.
+
+`multiple_process` (signal/cycle) and the volatile/volume
+`execute_data_processing` helpers all fan a list of independent tasks out to
+an executor (see `executors`). This module owns that loop so that every sweep gets the same
+bookkeeping: each task is hashed, checked against the run ledger, timed in
+the worker and its outcome appended to the ledger by the parent, while the
+workers' stage events are drained into a telemetry collector. Tasks are
+started one at a time as the admission controller finds room for them in the
+memory budget, and the frames they write are saved by a background writer.
+"""
+
+from collections import deque
+import logging
+import math
+import multiprocessing
+import os
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from source.constants import (
+    RUN_LEDGER_PATH,
+    TELEMETRY_FOLDER,
+    cpu_percent_to_use,
+)
+from source.parallel import telemetry, writer
+from source.parallel.admission import (
+    AdmissionController,
+    estimate_input_memory,
+    get_task_memory_mb,
+    start_task_memory,
+)
+from source.parallel.executors import create_executor
+from source.parallel.ledger import RunLedger, TaskStatus, task_hash
+from source.utils import write_dataframe_to_csv
+
+
+logger = logging.getLogger(__name__)
+
+# seconds between checks for finished tasks and new telemetry events
+POLL_INTERVAL = 0.5
+
+
+class Task(NamedTuple):
+    func: Callable
+    args: tuple
+    params: dict
+    task_type: str
+    # file details ({"file_path", "cols"}) read by the task, used to
+    # estimate its memory before it runs
+    inputs: tuple = ()
+
+
+class TaskOutcome(NamedTuple):
+    task_hash: str
+    status: TaskStatus
+    output_path: Optional[str]
+    duration: Optional[float]
+    error_message: str
+    skipped: bool
+    # value returned by the task, None when it was skipped or failed
+    result: Any = None
+
+
+def sweep_run_id(name, inputs) -> str:
+    """
+    Deterministic run id for a sweep: submitting the same sweep again
+    resolves to the same run, which is what makes resuming possible.
+    """
+    return task_hash({"sweep": name, "inputs": inputs})
+
+
+def get_input_manifest(inputs) -> list:
+    """
+    Path, size and modification time of the files a task reads.
+    """
+    manifest = []
+    for details in inputs:
+        try:
+            stat = os.stat(details["file_path"])
+            version = [stat.st_size, stat.st_mtime_ns]
+        except (OSError, TypeError):
+            version = None
+        manifest.append([str(details["file_path"]), version])
+    return sorted(manifest, key=str)
+
+
+def get_task_hash(task: Task) -> str:
+    """
+    Ledger hash of a task: its parameters and the version of its input
+    files, so a refreshed input file is not skipped as already done.
+    """
+    return task_hash(
+        {"params": task.params, "inputs": get_input_manifest(task.inputs)}
+    )
+
+
+def get_num_workers(total_tasks):
+    return max(
+        1,
+        min(
+            int(multiprocessing.cpu_count() * cpu_percent_to_use),
+            total_tasks,
+        ),
+    )
+
+
+def execute_task(func, args, task_id=None):
+    """
+    Worker side wrapper: run the task and report how long it took, the memory
+    it added to the worker at its peak and the outputs it wrote, for the
+    parent to save.
+    """
+    baseline_mb = start_task_memory()
+    telemetry.set_task(task_id)
+    writer.start_collecting()
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception as e:
+        raise writer.TaskFailed(str(e), writer.stop_collecting())
+    outputs = writer.stop_collecting()
+    duration = time.perf_counter() - start
+    return result, duration, get_task_memory_mb(baseline_mb), outputs
+
+
+def run_tasks(
+    tasks: list,
+    run_id: str,
+    resume: bool = False,
+    memory_budget_mb: Optional[float] = None,
+    ledger_path: str = RUN_LEDGER_PATH,
+    on_progress: Optional[Callable] = None,
+    telemetry_folder: str = TELEMETRY_FOLDER,
+    executor: Optional[str] = None,
+) -> list:
+    """
+    Run tasks on an executor, skipping the ones the ledger marks done.
+
+    Args:
+        tasks (list): Tasks of the sweep.
+        run_id (str): Ledger run id.
+        resume (bool): Skip tasks that already succeeded in this run with
+            the same input files.
+        memory_budget_mb (float): Memory the running tasks may use together.
+            None uses the configured budget.
+        ledger_path (str): Location of the ledger database.
+        on_progress (callable): Called with the TelemetryCollector whenever
+            new worker events or task completions arrive.
+        telemetry_folder (str): Where the stage events of the run are saved.
+        executor (str): Executor backend, EXECUTOR_BACKEND if None.
+
+    Returns:
+        list: One TaskOutcome per task, in task order.
+    """
+    hashes = [get_task_hash(task) for task in tasks]
+    outcomes = [None] * len(tasks)
+
+    with RunLedger(ledger_path) as ledger:
+        done = ledger.completed(run_id) if resume else set()
+        pending = []
+        for position, (task, hash_) in enumerate(zip(tasks, hashes)):
+            if hash_ in done:
+                outcomes[position] = TaskOutcome(
+                    hash_, TaskStatus.SUCCESS, None, None, "", True
+                )
+            else:
+                pending.append(position)
+
+        if done and resume:
+            logger.info(
+                f"Resuming run {run_id}: {len(tasks) - len(pending)} of "
+                f"{len(tasks)} tasks already completed"
+            )
+
+        if not pending:
+            return outcomes
+
+        event_queue = multiprocessing.Queue()
+        collector = telemetry.TelemetryCollector(event_queue, len(pending))
+
+        def record(position, result):
+            task, hash_ = tasks[position], hashes[position]
+            task_mb = None
+            try:
+                output, duration, task_mb, outputs = result.get()
+                background_writer.submit(outputs, position)
+                outcome = TaskOutcome(
+                    hash_,
+                    TaskStatus.SUCCESS,
+                    output if isinstance(output, str) else None,
+                    duration,
+                    "",
+                    False,
+                    output,
+                )
+            except Exception as e:
+                if isinstance(e, writer.TaskFailed):
+                    background_writer.submit(e.outputs, position)
+                logger.error(f"Error processing {task.task_type}: {e}")
+                outcome = TaskOutcome(
+                    hash_, TaskStatus.ERROR, None, None, str(e), False
+                )
+            admission.release(
+                position, task.task_type, input_mb[position], task_mb
+            )
+            save(position, outcome)
+            collector.task_finished(
+                get_task_id(task, hash_),
+                outcome.status.value,
+                outcome.duration,
+            )
+
+        def save(position, outcome):
+            task = tasks[position]
+            ledger.record(
+                run_id,
+                outcome.task_hash,
+                outcome.status,
+                task_type=task.task_type,
+                output_path=outcome.output_path,
+                duration=outcome.duration,
+                error_message=outcome.error_message,
+                params=task.params,
+            )
+            outcomes[position] = outcome
+
+        task_executor = create_executor(
+            executor, get_num_workers(len(pending)), event_queue
+        )
+        # the memory budget covers this machine only
+        admission = AdmissionController(
+            memory_budget_mb if task_executor.local else math.inf
+        )
+        input_mb = {
+            position: estimate_input_memory(tasks[position].inputs)
+            for position in pending
+        }
+        waiting, running = deque(pending), {}
+        background_writer = writer.BackgroundWriter()
+        with background_writer, task_executor:
+            while waiting or running:
+                while waiting and len(running) < task_executor.capacity:
+                    position = waiting[0]
+                    task = tasks[position]
+                    estimate = admission.estimate(
+                        task.task_type, input_mb[position]
+                    )
+                    if not admission.can_admit(estimate):
+                        break
+                    waiting.popleft()
+                    admission.admit(position, estimate)
+                    running[position] = task_executor.submit(
+                        execute_task,
+                        (
+                            task.func,
+                            task.args,
+                            get_task_id(task, hashes[position]),
+                        ),
+                    )
+                finished = [
+                    position
+                    for position, result in running.items()
+                    if result.ready()
+                ]
+                for position in finished:
+                    record(position, running.pop(position))
+                collector.drain()
+                if on_progress:
+                    on_progress(collector)
+                if running and not finished:
+                    next(iter(running.values())).wait(POLL_INTERVAL)
+
+        # a task whose outputs could not be written has not succeeded
+        for position, error_message in dict(background_writer.errors).items():
+            if outcomes[position].status == TaskStatus.SUCCESS:
+                save(
+                    position,
+                    outcomes[position]._replace(
+                        status=TaskStatus.ERROR, error_message=error_message
+                    ),
+                )
+
+        collector.drain()
+        if on_progress:
+            on_progress(collector)
+        collector.persist(
+            telemetry_folder,
+            f"{run_id}_{time.strftime('%Y-%m-%d %H-%M-%S')}.csv",
+        )
+
+    return outcomes
+
+
+def get_task_id(task, hash_):
+    return f"{task.task_type}-{hash_[:10]}"
+
+
+def write_status(
+    run_id, tasks, status_folder, file_name, ledger_path=RUN_LEDGER_PATH
+):
+    """
+    Write the sweep status CSV from the ledger.
+    """
+    with RunLedger(ledger_path) as ledger:
+        status_df = ledger.status_frame(
+            run_id,
+            [task.params for task in tasks],
+            [get_task_hash(task) for task in tasks],
+        )
+    status_df.insert(0, "run_id", run_id)
+    write_dataframe_to_csv(status_df, status_folder, file_name)
+    return status_df
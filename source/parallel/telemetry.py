@@ -0,0 +1,200 @@
+"""
+Stage level telemetry from sweep workers.
+
+Workers wrap the expensive parts of a task in `stage(...)`; each stage emits
+an event (task, stage, rows, duration) on a multiprocessing queue that the
+parent drains while it waits for results. The parent keeps the events in a
+`TelemetryCollector`, which feeds the live progress shown in Streamlit and is
+persisted next to the outputs for later performance analysis.
+
+Outside of a sweep (single runs, tests) no queue is installed and events are
+simply dropped.
+"""
+
+from contextlib import contextmanager
+import os
+import queue
+import time
+
+import pandas as pd
+
+from source.utils import write_dataframe_to_csv
+
+
+class Stage:
+    READ = "read"
+    MERGE = "merge"
+    CYCLE_BUILD = "cycle build"
+    TRADE_LOOP = "trade loop"
+    TRADE_MANAGEMENT = "trade management"
+    WRITE = "write"
+
+
+_queue = None
+_task_id = None
+
+
+def init_worker(event_queue):
+    """
+    Pool initializer: route this worker's events to the parent's queue.
+    """
+    global _queue
+    _queue = event_queue
+
+
+def set_task(task_id):
+    global _task_id
+    _task_id = task_id
+
+
+def get_task():
+    return _task_id
+
+
+def emit(event: dict):
+    if _queue is None:
+        return
+    event.setdefault("task_id", _task_id)
+    event.setdefault("pid", os.getpid())
+    event.setdefault("time", time.time())
+    try:
+        _queue.put_nowait(event)
+    except Exception:
+        # telemetry must never fail the task
+        pass
+
+
+class StageEvent:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Time a block of work and emit it as a stage event.
+
+    Usage:
+        with stage(Stage.READ) as event:
+            df = read(...)
+            event.rows = len(df)
+    """
+    event = StageEvent(name, rows)
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        emit(
+            {
+                "event": "stage",
+                "stage": event.name,
+                "rows": event.rows,
+                "duration": time.perf_counter() - start,
+            }
+        )
+
+
+class TelemetryCollector:
+    """
+    Parent side store of the events emitted by the workers.
+    """
+
+    def __init__(self, event_queue=None, total_tasks=0):
+        self.queue = event_queue
+        self.total_tasks = total_tasks
+        self.completed_tasks = 0
+        self.failed_tasks = 0
+        self.events = []
+        self.started_at = time.time()
+
+    def drain(self):
+        if self.queue is None:
+            return
+        while True:
+            try:
+                self.events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return
+            except (EOFError, OSError):
+                return
+
+    def task_finished(self, task_id, status, duration=None):
+        if status == "SUCCESS":
+            self.completed_tasks += 1
+        else:
+            self.failed_tasks += 1
+        self.events.append(
+            {
+                "event": "task",
+                "task_id": task_id,
+                "stage": None,
+                "status": status,
+                "rows": None,
+                "duration": duration,
+                "time": time.time(),
+            }
+        )
+
+    @property
+    def finished_tasks(self):
+        return self.completed_tasks + self.failed_tasks
+
+    @property
+    def progress(self):
+        if not self.total_tasks:
+            return 1.0
+        return min(self.finished_tasks / self.total_tasks, 1.0)
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started_at
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.events,
+            columns=[
+                "event",
+                "task_id",
+                "stage",
+                "status",
+                "rows",
+                "duration",
+                "pid",
+                "time",
+            ],
+        )
+
+    def stage_frame(self) -> pd.DataFrame:
+        df = self.to_frame()
+        return df[df["event"] == "stage"]
+
+    def rows_per_second(self):
+        stages = self.stage_frame()
+        rows = stages.loc[stages["stage"] == Stage.READ, "rows"].sum()
+        return rows / self.elapsed if self.elapsed else 0.0
+
+    def slowest_stages(self, limit=5) -> pd.DataFrame:
+        """
+        Stages ordered by total time spent, across all tasks so far.
+        """
+        stages = self.stage_frame()
+        if stages.empty:
+            return pd.DataFrame(
+                columns=["stage", "count", "total_seconds", "max_seconds"]
+            )
+        summary = (
+            stages.groupby("stage")
+            .agg(
+                count=("duration", "size"),
+                total_seconds=("duration", "sum"),
+                max_seconds=("duration", "max"),
+                rows=("rows", "sum"),
+            )
+            .sort_values("total_seconds", ascending=False)
+            .reset_index()
+        )
+        return summary.head(limit)
+
+    def persist(self, folder, file_name):
+        return write_dataframe_to_csv(self.to_frame(), folder, file_name)
@@ -0,0 +1,186 @@
+"""
+Deferred output writes for sweep workers.
+
+Inside a sweep worker `write_dataframe_to_csv` does not touch the disk: the
+frame is serialized to a compressed Arrow payload (pickle for frames Arrow
+cannot represent) and handed back to the parent with the task result. The
+parent feeds the payloads to a `BackgroundWriter`, a dedicated thread behind
+a bounded queue that turns them into CSV files, so the CPU bound work in the
+workers no longer waits on CSV formatting and disk. Frames written more than
+once to the same path within a task (the debug frames) are only sent once,
+with their last content.
+
+The payloads stay in the worker until its task ends, so they count towards
+its peak memory. Once WRITER_PENDING_MAX_MB of them are held, further frames
+are written synchronously by the worker.
+
+Outside of a sweep (single runs) writes stay synchronous.
+"""
+
+import logging
+import os
+import queue
+import threading
+from typing import Any, NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+
+from source.constants import WRITER_PENDING_MAX_MB
+
+
+logger = logging.getLogger(__name__)
+
+# payloads waiting for the writer thread before task results are held back
+WRITER_QUEUE_SIZE = 32
+
+COMPRESSION = next(
+    (codec for codec in ("zstd", "lz4") if pa.Codec.is_available(codec)),
+    None,
+)
+
+MB = 1024 * 1024
+
+_pending = None
+_pending_bytes = 0
+
+
+class OutputFrame(NamedTuple):
+    folder_name: str
+    file_name: str
+    payload: Any
+    is_arrow: bool
+    size: int
+
+
+class TaskFailed(Exception):
+    """
+    Raised from a worker when its task fails, carrying the outputs it wrote
+    before failing so the debug frames still reach the disk.
+    """
+
+    def __init__(self, message, outputs=()):
+        super().__init__(message, outputs)
+        self.message = message
+        self.outputs = outputs
+
+    def __str__(self):
+        return self.message
+
+
+def start_collecting():
+    global _pending, _pending_bytes
+    _pending, _pending_bytes = {}, 0
+
+
+def stop_collecting() -> list:
+    global _pending, _pending_bytes
+    pending, _pending, _pending_bytes = _pending or {}, None, 0
+    return list(pending.values())
+
+
+def to_payload(dataframe: pd.DataFrame):
+    try:
+        table = pa.Table.from_pandas(dataframe, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        return dataframe.copy(), False
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+    with pa.ipc.new_stream(sink, table.schema, options=options) as stream:
+        stream.write_table(table)
+    return sink.getvalue(), True
+
+
+def from_payload(output: OutputFrame) -> pd.DataFrame:
+    if not output.is_arrow:
+        return output.payload
+    return pa.ipc.open_stream(output.payload).read_all().to_pandas()
+
+
+def get_payload_size(dataframe, payload, is_arrow):
+    if is_arrow:
+        return payload.size
+    return int(dataframe.memory_usage(index=True, deep=True).sum())
+
+
+def defer(dataframe, folder_name, file_name, max_mb=None) -> bool:
+    """
+    Queue the frame for the parent when running inside a sweep worker.
+
+    Args:
+        max_mb (float): Payloads the worker may hold, WRITER_PENDING_MAX_MB
+            if None.
+
+    Returns:
+        bool: False when the caller has to write the frame itself, outside a
+        sweep or when the frame would take the held payloads past the cap.
+    """
+    global _pending_bytes
+    if _pending is None:
+        return False
+    max_mb = WRITER_PENDING_MAX_MB if max_mb is None else max_mb
+    path = os.path.join(folder_name, file_name)
+    # a newer write of the path replaces the payload held for it
+    previous = _pending.pop(path, None)
+    if previous is not None:
+        _pending_bytes -= previous.size
+
+    payload, is_arrow = to_payload(dataframe)
+    size = get_payload_size(dataframe, payload, is_arrow)
+    if _pending_bytes + size > max_mb * MB:
+        return False
+    _pending[path] = OutputFrame(
+        folder_name, file_name, payload, is_arrow, size
+    )
+    _pending_bytes += size
+    return True
+
+
+def write_output(output: OutputFrame):
+    os.makedirs(output.folder_name, exist_ok=True)
+    path = os.path.join(output.folder_name, output.file_name)
+    from_payload(output).to_csv(path, index=True)
+    return path
+
+
+class BackgroundWriter:
+    """
+    Writes the outputs returned by the workers on a dedicated thread.
+
+    `submit` blocks once WRITER_QUEUE_SIZE outputs are waiting, which holds
+    the parent back instead of buffering an unbounded amount of results.
+    Failed writes are kept in `errors` as (key, message).
+    """
+
+    def __init__(self, maxsize=WRITER_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.errors = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, outputs, key=None):
+        for output in outputs:
+            self.queue.put((key, output))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            key, output = item
+            try:
+                write_output(output)
+            except Exception as e:
+                path = os.path.join(output.folder_name, output.file_name)
+                logger.error(f"Error writing {path}: {e}")
+                self.errors.append((key, str(e)))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
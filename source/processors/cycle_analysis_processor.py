@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from source.constants import (
     TARGET_PROFIT_FOLDER,
@@ -5,7 +6,15 @@ from source.constants import (
     MarketDirection,
     TargetProfitColumns,
 )
-from source.utils import make_round, write_dataframe_to_csv
+from source.debug_artifacts import write_artifact
+from source.segmentation import Segments, group_first_values, group_order
+from source.utils import make_round
+
+
+def report_missing_min_max(group_id, cycle):
+    print(
+        f"can't find data for min and max while following subsequent calculation rule... for grp: {group_id} cycle no: {cycle}"
+    )
 
 
 def get_min_max_idx(
@@ -41,67 +50,128 @@ def get_min_max_idx(
                 ].idxmin()
 
     except ValueError:
-        print(
-            f"can't find data for min and max while following subsequent calculation rule... for grp: {group_id} cycle no: {cycle}"
-        )
+        report_missing_min_max(group_id, cycle)
 
     return min_idx, max_idx, cycle_min, cycle_max
 
 
-def get_next_cycle_first_row(
-    group_data,
-    cycle,
-    cycle_col,
-    groups,
-    group_idx,
-    cycle_start=1,
-    cycle_data=None,
+def first_position_in_group(mask, group_codes, num_groups):
+    """
+    Frame position of the first row of every group meeting `mask`, -1 for
+    the groups without one.
+    """
+    first = np.full(num_groups, -1, dtype=np.int64)
+    rows = np.flatnonzero(mask & (group_codes >= 0))
+    codes, index = np.unique(group_codes[rows], return_index=True)
+    first[codes] = rows[index]
+    return first
+
+
+def get_next_cycle_first_positions(
+    cycles, group_codes, segments, cycle_start=1
 ):
     """
-    Retrieves the first row of the next cycle considering both the current group and the next group.
+    Position of the first row of the next cycle of every cycle segment,
+    looked up in tables built once for the cycle column.
+
+    The next cycle starts on the row following the cycle in its group when
+    that row is in the following cycle or outside any cycle (0). Otherwise
+    it is the first row of the next group in cycle `cycle_start` or 0, and
+    failing that the first one in cycle `cycle_start + 1`.
 
-    Parameters:
-    group_data (DataFrame): Data of the current group.
-    cycle (int): Current cycle number.
-    cycle_col (str): The column name representing the cycle in the data.
-    groups (list of tuples): List of groups where each group is a tuple containing group_id and group_data.
-    group_idx (int): Index of the current group in the groups list.
+    Args:
+        cycles (np.ndarray): Cycle number of every row.
+        group_codes (np.ndarray): Code of every row's group_id, in the
+            order of the sorted group ids, -1 for rows without a group.
+        segments (Segments): Cycle segments.
+        cycle_start (int): First cycle number of a group.
 
     Returns:
-    Series: The first row of the next cycle, or None if it doesn't exist.
+        np.ndarray: Frame position per segment, -1 when there is none.
     """
-    # Check if cycle_data is provided
-    if cycle_data is not None:
-        last_index_position = group_data.index.get_loc(cycle_data.index[-1])
-    else:
-        last_index_position = -1  # Start before the first row
-
-    # Check if there is a next row in the current group
-    if last_index_position + 1 < len(group_data):
-        next_row = group_data.iloc[last_index_position + 1]
-        if next_row[cycle_col] == cycle + 1 or next_row[cycle_col] == 0:
-            return next_row
-
-    # If the next cycle is not found in the current group, check the next group
-    if group_idx + 1 < len(groups):
-        next_group_id, next_group_data = groups[group_idx + 1]
-        next_cycle_data = next_group_data[
-            (next_group_data[cycle_col] == cycle_start)
-            | (next_group_data[cycle_col] == 0)
-        ]
-        if not next_cycle_data.empty:
-            return next_cycle_data.iloc[0]
-
-        # If next cycle in the next group is not found, try the second cycle
-        next_next_cycle_data = next_group_data[
-            (next_group_data[cycle_col] == cycle_start + 1)
-            | (next_group_data[cycle_col] == 0)
-        ]
-        if not next_next_cycle_data.empty:
-            return next_next_cycle_data.iloc[0]
-
-    # Return None if no next cycle data is found
-    return None
+    num_groups = group_codes.max() + 1 if len(group_codes) else 0
+
+    # row following every row in its group
+    order, group_first = group_order(group_codes)
+    following = np.full(len(cycles), -1, dtype=np.int64)
+    same_group = ~group_first[1:]
+    following[order[:-1][same_group]] = order[1:][same_group]
+
+    # first row of the next cycle of every group, with one more slot for
+    # the cycles of the last group
+    group_start = first_position_in_group(
+        (cycles == cycle_start) | (cycles == 0), group_codes, num_groups + 1
+    )
+    second_cycle = first_position_in_group(
+        cycles == cycle_start + 1, group_codes, num_groups + 1
+    )
+    group_start = np.where(group_start >= 0, group_start, second_cycle)
+
+    next_row = following[segments.last]
+    next_cycle = cycles[np.maximum(next_row, 0)]
+    in_group = (next_row >= 0) & (
+        (next_cycle == segments.cycles + 1) | (next_cycle == 0)
+    )
+    return np.where(
+        in_group, next_row, group_start[segments.group_codes + 1]
+    )
+
+
+def get_cycle_segments(
+    df, cycle_col, group_codes, cycle_start=1, first_cycle=2
+):
+    """
+    Segments of the cycles of `cycle_col` in every group, each extended with
+    the first row of the next cycle.
+
+    Args:
+        df (pd.DataFrame): Frame with a sorted index.
+        cycle_col (str): Cycle number column.
+        group_codes (np.ndarray): Code of every row's group_id, in the
+            order of the sorted group ids, -1 for rows without a group.
+        cycle_start (int): First cycle number of a group.
+        first_cycle (int): Smallest cycle number to analyse.
+
+    Returns:
+        Segments: One segment per (group, cycle).
+    """
+    cycles = df[cycle_col].to_numpy()
+    segments = Segments(
+        group_codes, cycles, (group_codes >= 0) & (cycles >= first_cycle)
+    )
+    return segments.include_next(
+        get_next_cycle_first_positions(
+            cycles, group_codes, segments, cycle_start
+        )
+    )
+
+
+def get_min_max_offsets(segments, is_long, low, high):
+    """
+    Segment version of `get_min_max_idx`.
+
+    For a LONG cycle the min is the lowest Low and the max the highest High
+    after it, the other way round for a SHORT cycle. Ties resolve to the
+    first row.
+
+    Args:
+        segments (Segments): Cycle segments.
+        is_long (np.ndarray): Whether every segment is in a LONG group.
+        low (np.ndarray): Low column in frame order.
+        high (np.ndarray): High column in frame order.
+
+    Returns:
+        tuple: (min_offsets, max_offsets) into `segments.rows`, -1 when the
+        second extreme has no row after the first.
+    """
+    long_min = segments.argmin(low)
+    long_max = segments.argmax(high, after=long_min)
+    short_max = segments.argmax(high)
+    short_min = segments.argmin(low, after=short_max)
+    return (
+        np.where(is_long, long_min, short_min),
+        np.where(is_long, long_max, short_max),
+    )
 
 
 def update_max_to_min(**kwargs):
@@ -210,111 +280,75 @@ def update_MTM_CTC_cols(df, validated_data):
     # need adjusted_close_for_max_to_min column
     adj_close_max_to_min(df, validated_data)
 
-    # Group by 'group_id'
-    groups = list(df.groupby("group_id"))
-
-    results = []
-    updates = {col.value: [] for col in FirstCycleColumns}
-    updates.update(
-        {
-            "index": [],
-            "group_id": [],
-            f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{FirstCycleColumns.CLOSE_TO_CLOSE.value}": [],
-            # "period_band": [], "cycle_no": []
-        }
+    group_codes, group_ids = pd.factorize(df["group_id"], sort=True)
+    is_long = (
+        group_first_values(df["market_direction"], group_codes)
+        == MarketDirection.LONG
     )
-    for group_idx, (group_id, group_data) in enumerate(groups):
-        # Identify cycle columns dynamically
-
-        cycle_columns = [
-            col for col in group_data.columns if "cycle_no" in col
-        ]
-
-        group_start_row = group_data.iloc[0]
-        market_direction = group_start_row["market_direction"]
-        for cycle_col in cycle_columns:
-            # Filter the group_data to get only the valid cycles and find unique cycle numbers
-            unique_cycles = group_data.loc[
-                group_data[cycle_col] > 0, cycle_col
-            ].unique()
-
-            for cycle in unique_cycles:
-                cycle_analysis = {
-                    "group_id": group_id,
+    low, high, close = (
+        df[col].to_numpy(dtype=float) for col in ("Low", "High", "Close")
+    )
+
+    min_key = FirstCycleColumns.CYCLE_MIN.value
+    max_key = FirstCycleColumns.CYCLE_MAX.value
+    max_to_min_key = FirstCycleColumns.MAX_TO_MIN.value
+    close_to_close_key = FirstCycleColumns.CLOSE_TO_CLOSE.value
+
+    cycle_columns = [col for col in df.columns if "cycle_no" in col]
+    analyses = []
+    for cycle_col in cycle_columns:
+        segments = get_cycle_segments(df, cycle_col, group_codes)
+        segment_is_long = is_long[segments.first]
+        min_offsets, max_offsets = get_min_max_offsets(
+            segments, segment_is_long, low, high
+        )
+        cycle_max = high[segments.positions(max_offsets)]
+        cycle_min = low[segments.positions(min_offsets)]
+        first_close = close[segments.first]
+        last_close = close[segments.closing]
+        analyses.append(
+            pd.DataFrame(
+                {
+                    "group_code": segments.group_codes,
+                    "cycle": segments.cycles.astype(object),
+                    "index": df.index[segments.last],
+                    "found": (min_offsets >= 0) & (max_offsets >= 0),
+                    max_key: cycle_max,
+                    min_key: cycle_min,
+                    max_to_min_key: np.round(cycle_max - cycle_min, 2),
+                    close_to_close_key: np.round(
+                        np.where(
+                            segment_is_long,
+                            last_close - first_close,
+                            first_close - last_close,
+                        ),
+                        2,
+                    ),
                 }
-                cycle_data = group_data[group_data[cycle_col] == cycle]
-
-                # real cycle starts from cycle no 2
-                if cycle == 1:
-                    continue
-
-                next_cycle_first_row = get_next_cycle_first_row(
-                    group_data,
-                    cycle,
-                    cycle_col,
-                    groups,
-                    group_idx,
-                    cycle_data=cycle_data,
-                )
-
-                if next_cycle_first_row is not None:
-                    # Create a new DataFrame with the current cycle's data and the next cycle's first row
-                    adjusted_cycle_data = pd.concat(
-                        [cycle_data, next_cycle_first_row.to_frame().T]
-                    )
-                else:
-                    adjusted_cycle_data = cycle_data
-
-                min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
-                    adjusted_cycle_data, group_start_row, group_id, cycle
-                )
-
-                if not min_idx or not max_idx:
-                    continue
-
-                updates["index"].append(cycle_data.index[-1])
-
-                min_key = FirstCycleColumns.CYCLE_MIN.value
-                max_key = FirstCycleColumns.CYCLE_MAX.value
-                max_to_min_key = FirstCycleColumns.MAX_TO_MIN.value
-                update_cycle_min_max(
-                    cycle_analysis=cycle_analysis,
-                    adjusted_cycle_data=adjusted_cycle_data,
-                    min_idx=min_idx,
-                    max_idx=max_idx,
-                    cycle_min=cycle_min,
-                    cycle_max=cycle_max,
-                    min_key=min_key,
-                    max_key=max_key,
-                )
-
-                update_max_to_min(
-                    cycle_analysis=cycle_analysis,
-                    min_key=min_key,
-                    max_key=max_key,
-                    max_to_min_key=max_to_min_key,
-                    is_last_cycle=False,
-                )
-
-                # close to close
-                update_close_to_close(
-                    market_direction=market_direction,
-                    cycle_analysis=cycle_analysis,
-                    close_to_close_key=FirstCycleColumns.CLOSE_TO_CLOSE.value,
-                    last_close=adjusted_cycle_data.iloc[-1]["Close"],
-                    first_close=adjusted_cycle_data.iloc[0]["Close"],
-                )
-
-                results.append(cycle_analysis)
-
-                for key, value in cycle_analysis.items():
-                    updates[key].append(value)
-
-    for col, values in updates.items():
-        if col != "index" and values:
-            df.loc[updates["index"], col] = values
-
-    return results
+            )
+        )
+
+    if not analyses:
+        return []
+
+    # cycles are reported group by group
+    analysis = pd.concat(analyses, ignore_index=True).sort_values(
+        "group_code", kind="stable"
+    )
+    for group_code, cycle in analysis.loc[
+        ~analysis["found"], ["group_code", "cycle"]
+    ].itertuples(index=False):
+        report_missing_min_max(group_ids[group_code], cycle)
+
+    analysis = analysis[analysis["found"]]
+    for col in (max_key, min_key, max_to_min_key, close_to_close_key):
+        if len(analysis):
+            df.loc[analysis["index"], col] = analysis[col].to_numpy()
+
+    analysis.insert(0, "group_id", group_ids[analysis["group_code"]])
+    return analysis[
+        ["group_id", max_key, min_key, max_to_min_key, close_to_close_key]
+    ].to_dict("records")
 
 
 def tp_method_1(df, tp_percent, cycle_col_name, close_col_name):
@@ -327,7 +361,7 @@ def tp_method_1(df, tp_percent, cycle_col_name, close_col_name):
     # for group_id, group_data in groups:
 
     df[TargetProfitColumns.TP_CLOSE.value] = df.loc[
-        (df[cycle_col_name] > 1) & (df[close_col_name] == "YES"), "Close"
+        (df[cycle_col_name] > 1) & (df[close_col_name] == True), "Close"
     ]
     # cum avg tp_close
     df[TargetProfitColumns.TP_CUM_AVG_CLOSE.value] = (
@@ -350,91 +384,70 @@ def tp_method_1(df, tp_percent, cycle_col_name, close_col_name):
     )
 
     # tp_end(yes/no) (depends on market direction)
-    df[TargetProfitColumns.TP_END.value] = "NO"
-    df.loc[
+    df[TargetProfitColumns.TP_END.value] = (
         (df["market_direction"] == MarketDirection.LONG)
         & (
             df["High"] > df[TargetProfitColumns.TP_CUM_AVG_CLOSE_PERCENT.value]
-        ),
-        TargetProfitColumns.TP_END.value,
-    ] = "YES"
-
-    df.loc[
+        )
+    ) | (
         (df["market_direction"] == MarketDirection.SHORT)
-        & (df["Low"] < df[TargetProfitColumns.TP_CUM_AVG_CLOSE_PERCENT.value]),
-        TargetProfitColumns.TP_END.value,
-    ] = "YES"
+        & (df["Low"] < df[TargetProfitColumns.TP_CUM_AVG_CLOSE_PERCENT.value])
+    )
 
 
 def tp_method_2(df, tp_percent, cycle_col_name, close_col_name):
-    df[TargetProfitColumns.TP_CUMMAX.value] = 0.0
-    df[TargetProfitColumns.TP_CUMMIN.value] = 0.0
-    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value] = 0.0
-    df[TargetProfitColumns.TP_END.value] = "NO"
-
-    groups = df.groupby("group_id")
-    for group_id, group_data in groups:
-        group_start_row = group_data.iloc[0]
-        # for market direction long find cummax
-        min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
-            group_data, group_start_row, group_id
+    group_codes, group_ids = pd.factorize(df["group_id"], sort=True)
+    direction = group_first_values(df["market_direction"], group_codes)
+    low, high = (df[col].to_numpy(dtype=float) for col in ("Low", "High"))
+
+    # one segment per group, anchored on its min Low for market direction
+    # long and on its max High otherwise
+    groups = Segments(group_codes, np.zeros(len(df)), group_codes >= 0)
+    group_is_long = direction[groups.first] == MarketDirection.LONG
+    anchors = np.where(
+        group_is_long, groups.argmin(low), groups.argmax(high)
+    )
+    anchor_positions = groups.positions(anchors)
+    for group in np.flatnonzero(anchor_positions == groups.last):
+        report_missing_min_max(group_ids[groups.group_codes[group]], None)
+
+    anchor = np.full(len(df), np.nan)
+    anchor[groups.rows] = np.where(
+        group_is_long, low[anchor_positions], high[anchor_positions]
+    )[groups.segment_of]
+    after_anchor = np.zeros(len(df), dtype=bool)
+    after_anchor[groups.rows] = (
+        np.arange(len(groups.rows)) > anchors[groups.segment_of]
+    )
+    long_rows = after_anchor & (direction == MarketDirection.LONG)
+    short_rows = after_anchor & (direction == MarketDirection.SHORT)
+
+    # for market direction long find cummax of Low from min_idx, for short
+    # cummin of High from max_idx
+    df[TargetProfitColumns.TP_CUMMAX.value] = np.where(
+        long_rows,
+        df["Low"].where(long_rows).groupby(group_codes).cummax(),
+        0.0,
+    )
+    df[TargetProfitColumns.TP_CUMMIN.value] = np.where(
+        short_rows,
+        df["High"].where(short_rows).groupby(group_codes).cummin(),
+        0.0,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        close_diff_percent = np.where(
+            long_rows,
+            (df[TargetProfitColumns.TP_CUMMAX.value] / anchor - 1) * 100,
+            (df[TargetProfitColumns.TP_CUMMIN.value] / anchor - 1) * 100,
         )
+    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value] = np.where(
+        long_rows | short_rows, close_diff_percent, 0.0
+    )
 
-        if group_start_row["market_direction"] == MarketDirection.LONG:
-
-            df.loc[
-                (df["group_id"] == group_id) & (df.index > min_idx),
-                TargetProfitColumns.TP_CUMMAX.value,
-            ] = df.loc[
-                (df["group_id"] == group_id) & (df.index > min_idx), "Low"
-            ].cummax()
-
-            df.loc[
-                (df["group_id"] == group_id) & (df.index > min_idx),
-                TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value,
-            ] = (
-                df[TargetProfitColumns.TP_CUMMAX.value]
-                / group_data.loc[min_idx]["Low"]
-                - 1
-            ) * 100
-
-            # tp_end(yes/no) (depends on market direction)
-            df.loc[
-                (df["group_id"] == group_id)
-                & (df.index > min_idx)
-                & (
-                    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value]
-                    > tp_percent
-                ),
-                TargetProfitColumns.TP_END.value,
-            ] = "YES"
-
-        elif group_start_row["market_direction"] == MarketDirection.SHORT:
-            # find cummax from max_idx
-            df.loc[
-                (df["group_id"] == group_id) & (df.index > max_idx),
-                TargetProfitColumns.TP_CUMMIN.value,
-            ] = df.loc[df.index > max_idx, "High"].cummin()
-
-            df.loc[
-                (df["group_id"] == group_id) & (df.index > max_idx),
-                TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value,
-            ] = (
-                df[TargetProfitColumns.TP_CUMMIN.value]
-                / group_data.loc[max_idx]["High"]
-                - 1
-            ) * 100
-
-            # tp_end(yes/no) (depends on market direction)
-            df.loc[
-                (df["group_id"] == group_id)
-                & (df.index > max_idx)
-                & (
-                    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value]
-                    > tp_percent
-                ),
-                TargetProfitColumns.TP_END.value,
-            ] = "YES"
+    # tp_end(yes/no) (depends on market direction)
+    df[TargetProfitColumns.TP_END.value] = (long_rows | short_rows) & (
+        df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value] > tp_percent
+    )
 
 
 def update_target_profit_analysis(
@@ -442,4 +455,4 @@ def update_target_profit_analysis(
 ):
     methods = {"1": tp_method_1, "2": tp_method_2}
     methods[tp_method](df, tp_percent, cycle_col_name, close_col_name)
-    write_dataframe_to_csv(df, TARGET_PROFIT_FOLDER, "base_df.csv")
+    write_artifact(df, TARGET_PROFIT_FOLDER, "base_df")
@@ -1,12 +1,19 @@
-from collections import defaultdict, deque
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from itertools import chain
+import logging
+import multiprocessing
 import os
+from typing import NamedTuple
 
 import numpy as np
 import pandas as pd
 
 
 from source.constants import (
+    CYCLE_TF_POOL,
+    CYCLE_TF_WORKERS,
     SG_CYCLE_OUTPUT_FOLDER,
     VOLATILE_OUTPUT_FOLDER,
     VOLUME_OUTPUT_FOLDER,
@@ -15,6 +22,7 @@ from source.constants import (
     FirstCycleColumns,
     GroupAnalytics,
     MarketDirection,
+    OutputColumn,
     SecondCycleIDColumns,
     TargetProfitColumns,
     TradeExitType,
@@ -22,6 +30,8 @@ from source.constants import (
     fractal_column_dict,
     confirm_fractal_column_dict,
 )
+from source import cycle_cache, debug_artifacts
+from source.alignment import align_frames
 from source.data_reader import (
     load_strategy_data,
     merge_all_df,
@@ -29,24 +39,35 @@ from source.data_reader import (
     update_entry_fractal_file,
     update_exit_fractal_file,
 )
+from source.segmentation import (
+    count_hits_in_group,
+    group_first_values,
+    number_segments,
+)
 from source.processors.cycle_analysis_processor import (
     update_MTM_CTC_cols,
     update_target_profit_analysis,
 )
 from source.processors.signal_trade_processor import (
+    close_trades,
+    formulate_trade_outputs,
     get_market_direction,
+    get_strategy_input_files,
     is_trade_end_time_reached,
     is_trade_start_time_crossed,
-    process_trade,
 )
+from source.parallel.telemetry import Stage, stage
+from source.tag_store import get_tag_columns, get_tag_store
 from source.trade import Trade, initialize
 from source.utils import format_dates, make_round, write_dataframe_to_csv
 
 
 DEBUG = os.getenv("DEBUG", False).lower() == "true"
 
+logger = logging.getLogger(__name__)
+
 
-def get_base_df(validated_data, strategy_df, strategy_pair_str, instrument):
+def get_base_df(validated_data, strategy_df):
     """
     Get the base DataFrame for the strategy.
 
@@ -163,10 +184,8 @@ def get_base_df(validated_data, strategy_df, strategy_pair_str, instrument):
 
     # filtered_df = filtered_df[:-1]
 
-    write_dataframe_to_csv(
-        filtered_df,
-        SG_CYCLE_OUTPUT_FOLDER,
-        f"filtered_df_{instrument}_{strategy_pair_str}.csv".replace(":", "-"),
+    debug_artifacts.write_artifact(
+        filtered_df, SG_CYCLE_OUTPUT_FOLDER, "filtered_df"
     )
 
     return filtered_df
@@ -430,20 +449,13 @@ def merge_dataframes(
     index_reset=True,
     direction="backward",
 ):
+    frames = []
     for key, df in time_frame_2_dfs.items():
-        if index_reset:
-            df = df.reset_index().rename(columns={"index": "dt"})
-        cols = ["dt"]
-        cols.extend([col for col in tf_bb_cols[key].values()])
-        base_df = pd.merge_asof(
-            base_df,
-            df[cols],
-            left_on="dt",
-            right_on="dt",
-            direction=direction,
-        )
+        if not index_reset:
+            df = df.set_index("dt")
+        frames.append((df, list(tf_bb_cols[key].values())))
 
-    return base_df
+    return align_frames(base_df, frames, on="dt", direction=direction)
 
 
 def updated_yes_no_columns(bb_cols, merged_df):
@@ -456,78 +468,146 @@ def updated_yes_no_columns(bb_cols, merged_df):
             merged_df["market_direction"] == MarketDirection.LONG
         ) & (merged_df["Close"] < merged_df[col])
 
-        merged_df[f"close_to_{col}"] = "NO"
-        merged_df.loc[short_condition | long_condition, f"close_to_{col}"] = (
-            "YES"
-        )
+        merged_df[f"close_to_{col}"] = short_condition | long_condition
 
 
-def is_cycle_end(merged_df, bb_2_cols, idx):
-    if bb_2_cols:
-        return any(
-            merged_df[bb_2_col].iloc[idx] == "YES" for bb_2_col in bb_2_cols
-        )
-    return False
+def get_close_to_flags(df, cols):
+    """
+    Block of the close_to flags of `cols`, one column per band column.
+    """
+    return df[[f"close_to_{col}" for col in cols]].to_numpy(dtype=bool)
 
 
-def confirm_start_condition(merged_df, col, idx):
-    return (merged_df[f"close_to_{col}"].iloc[idx] == "YES") & (
-        merged_df[f"close_to_{col}"].shift(1).iloc[idx] == "NO"
-    )
+def shift_rows(flags, fill_value):
+    """
+    Flags of the previous row, `fill_value` on the first row.
+    """
+    shifted = np.empty_like(flags)
+    shifted[:1] = fill_value
+    shifted[1:] = flags[:-1]
+    return shifted
+
+
+def is_cycle_end(merged_df, bb_2_cols):
+    if bb_2_cols:
+        return merged_df[bb_2_cols].any(axis=1).to_numpy()
+    return np.zeros(len(merged_df), dtype=bool)
 
 
-def is_cycle_start(merged_df, col, bb_2_cols, idx):
-    start_condition = confirm_start_condition(merged_df, col, idx)
+def confirm_start_condition(merged_df, cols):
+    close_to = get_close_to_flags(merged_df, cols)
+    return close_to & ~shift_rows(close_to, True)
 
+
+def is_cycle_start(merged_df, cols, bb_2_cols):
     if bb_2_cols:
-        bb_2_start_condition = (
-            merged_df[bb_col].iloc[idx] == "NO" for bb_col in bb_2_cols
-        )
-        start_condition = (
-            (merged_df[f"close_to_{col}"].iloc[idx] == "YES")
-        ) & all(bb_2_start_condition)
-    return start_condition
+        return get_close_to_flags(merged_df, cols) & ~is_cycle_end(
+            merged_df, bb_2_cols
+        )[:, None]
+    return confirm_start_condition(merged_df, cols)
 
 
-def update_cycle_count_2(merged_df, col, bb_2_cols=None):
+def update_cycle_count_2(merged_df, cols, bb_2_cols=None):
+    """
+    Number the cycles of every column of `cols` within each run of
+    consecutive group ids.
+
+    A cycle starts on a start row when no cycle is open, or on a confirmed
+    start (close crossing to YES), and is closed by any BB 2 column turning
+    YES. Rows inside a cycle get the cycle number, counted from 2 in every
+    group, the others 0; the first row is never part of a cycle. The
+    columns are numbered together, as one (rows x columns) block.
+    """
     if bb_2_cols is None:
         # starts with colse_to_2*
         bb_2_cols = [col for col in merged_df.columns if "close_to_2" in col]
 
-    # Initialize the cycle number column with zeros
-    merged_df[f"cycle_no_{col}"] = 0
-
-    # Initialize cycle counter
-    cycle_counter = 1
-    in_cycle = False
-
-    for idx in range(1, len(merged_df)):
-        # Reset cycle counter for group changes
-        if (
-            idx > 0
-            and merged_df["group_id"].iloc[idx]
-            != merged_df["group_id"].iloc[idx - 1]
-        ):
-            cycle_counter = 1
-            in_cycle = False
-
-        # Start condition
-        start_condition = is_cycle_start(merged_df, col, bb_2_cols, idx)
+    group_ids = merged_df["group_id"]
+    group_change = (group_ids != group_ids.shift(1)).to_numpy()
+    group_change[0] = True
+    start = is_cycle_start(merged_df, cols, bb_2_cols)
+    end = is_cycle_end(merged_df, bb_2_cols)
+    confirm = confirm_start_condition(merged_df, cols)
+    start[0] = end[0] = False
+
+    # cycle state after each row: an end closes the cycle, a start opens it,
+    # a group change resets it, otherwise it carries over
+    state = np.full(start.shape, np.nan)
+    state[group_change] = 0
+    state[start] = 1
+    state[end] = 0
+    in_cycle = pd.DataFrame(state).ffill().to_numpy() == 1
+
+    was_in_cycle = shift_rows(in_cycle, False)
+    was_in_cycle[group_change] = False
+    new_cycle = start & (~was_in_cycle | confirm)
+
+    runs = np.cumsum(group_change)
+    cycle_counter = (
+        pd.DataFrame(new_cycle.astype(np.int64)).groupby(runs).cumsum() + 1
+    )
+    merged_df[[f"cycle_no_{col}" for col in cols]] = np.where(
+        in_cycle, cycle_counter.to_numpy(), 0
+    )
 
-        # End conditions
-        end_condition = is_cycle_end(merged_df, bb_2_cols, idx)
 
-        if (start_condition and not in_cycle) or (
-            start_condition and confirm_start_condition(merged_df, col, idx)
-        ):
-            cycle_counter += 1
-            in_cycle = True
+def get_cycle_numbers_by_condition(
+    df,
+    cycle_start_condition,
+    cycle_end_condition,
+    counter_starter=1,
+    group_by_col="group_id",
+    group_start=0,
+):
+    """
+    Number the cycles of every group from their start and end conditions.
 
-        if end_condition:
-            in_cycle = False
+    The conditions map a market direction to a row mask, or to a (rows x
+    columns) block of masks to number several columns in one pass: every
+    column is numbered as groups of its own, with a single
+    `number_segments` call. They are picked per group from the market
+    direction of its first row; groups before `group_start` or with an
+    unknown direction are left out. See `number_segments` for how starts and
+    ends pair up.
 
-        if in_cycle:
-            merged_df[f"cycle_no_{col}"].iloc[idx] = cycle_counter
+    Returns:
+        tuple: (active, numbers, num_groups) with the rows numbered and the
+        (rows x columns) cycle numbers, None when no row is numbered.
+    """
+    group_codes, groups = pd.factorize(df[group_by_col], sort=True)
+    if not len(groups):
+        return None
+    group_values = np.asarray(groups)[np.maximum(group_codes, 0)]
+    direction = group_first_values(df["market_direction"], group_codes)
+
+    active = (group_codes >= 0) & (group_values >= group_start)
+    active &= direction != MarketDirection.UNKNOWN
+    if not active.any():
+        return None
+
+    def as_block(condition):
+        return np.asarray(condition, dtype=bool).reshape(len(df), -1)
+
+    first_condition = next(iter(cycle_start_condition.values()))
+    num_columns = as_block(first_condition).shape[1]
+    start = np.zeros((len(df), num_columns), dtype=bool)
+    end = np.zeros((len(df), num_columns), dtype=bool)
+    for market_direction in pd.unique(direction[active]):
+        rows = active & (direction == market_direction)
+        start[rows] = as_block(cycle_start_condition[market_direction])[rows]
+        end[rows] = as_block(cycle_end_condition[market_direction])[rows]
+
+    codes = np.where(active, group_codes, -1)[:, None]
+    column_codes = np.where(
+        codes >= 0, codes + len(groups) * np.arange(num_columns), -1
+    )
+    numbers = number_segments(
+        column_codes.ravel(order="F"),
+        start.ravel(order="F"),
+        end.ravel(order="F"),
+        counter_starter,
+    ).reshape(start.shape, order="F")
+    return active, numbers, len(groups)
 
 
 def update_cycle_number_by_condition(
@@ -540,191 +620,155 @@ def update_cycle_number_by_condition(
     group_by_col="group_id",
     group_start=0,
 ):
-    for group, group_df in df.groupby(group_by_col):
-        # Initialize
-        if group < group_start:
-            continue
-        current_cycle = counter_starter
-        group_indices = group_df.index
-        cycle_counter = pd.Series(0, index=group_indices)
-        in_cycle = pd.Series(False, index=group_indices)
-        market_direction = group_df["market_direction"].iloc[0]
-
-        if market_direction == MarketDirection.UNKNOWN:
-            continue
-
-        start_indices = group_indices[
-            cycle_start_condition[market_direction][group_indices]
-        ]
-        end_indices = group_indices[
-            cycle_end_condition[market_direction][group_indices]
-        ]
+    """
+    Number the cycles of every group from their start and end conditions,
+    see `get_cycle_numbers_by_condition`.
+    """
+    result = get_cycle_numbers_by_condition(
+        df,
+        cycle_start_condition,
+        cycle_end_condition,
+        counter_starter,
+        group_by_col,
+        group_start,
+    )
+    if result is None:
+        return
+    active, numbers, num_groups = result
+
+    column = id_column_name or f"cycle_no_{col}"
+    # a new column is created by the first group written, as NaN elsewhere
+    if column not in df.columns and (not active.all() or num_groups > 1):
+        df[column] = np.nan
+    df.loc[active, column] = numbers[active, 0]
 
-        for start_idx in start_indices:
-            if not in_cycle[start_idx]:
-                current_cycle += 1
-                end_idx = end_indices[end_indices > start_idx].min()
-                if not pd.isna(end_idx):
-                    in_cycle.loc[start_idx : end_idx - 1] = True
-                    cycle_counter.loc[start_idx:end_idx] = current_cycle
-                else:
-                    in_cycle.loc[start_idx:] = True
-                    cycle_counter.loc[start_idx:] = current_cycle
-
-        if id_column_name:
-            df.loc[group_indices, id_column_name] = cycle_counter
-        else:
-            df.loc[group_indices, f"cycle_no_{col}"] = cycle_counter
 
+def update_cycle_numbers_by_condition(
+    df, cols, cycle_start_condition, cycle_end_condition
+):
+    """
+    Number the cycles of several band columns at once, from (rows x columns)
+    blocks of conditions. Rows outside the numbered groups are 0.
+    """
+    result = get_cycle_numbers_by_condition(
+        df, cycle_start_condition, cycle_end_condition
+    )
+    block = np.zeros((len(df), len(cols)), dtype=np.int64)
+    if result is not None:
+        active, numbers, _ = result
+        block[active] = numbers[active]
+    df[[f"cycle_no_{col}" for col in cols]] = block
 
-def update_cycle_count_2_L_H(df, col, bb_2_cols=None):
-    upper_col, lower_col = col.replace("M", "U"), col.replace("M", "L")
+
+def update_cycle_count_2_L_H(df, cols, bb_2_cols=None):
+    upper_flags = get_close_to_flags(
+        df, [col.replace("M", "U") for col in cols]
+    )
+    lower_flags = get_close_to_flags(
+        df, [col.replace("M", "L") for col in cols]
+    )
 
     if bb_2_cols is None:
         # starts with colse_to_2*
         bb_2_cols = [col for col in df.columns if "close_to_2" in col]
 
-    bb_2_start_condition = True
-    for bb_col in bb_2_cols:
-        bb_2_start_condition &= df[bb_col] == "NO"
-    bb_2_end_condition = False
-    for bb_col in bb_2_cols:
-        bb_2_end_condition |= df[bb_col] == "YES"
+    bb_2_end_condition = is_cycle_end(df, bb_2_cols)[:, None]
+    bb_2_start_condition = ~bb_2_end_condition
+    is_long = (df["market_direction"] == MarketDirection.LONG).to_numpy()
+    is_short = (df["market_direction"] == MarketDirection.SHORT).to_numpy()
 
     cycle_start_condition = {
         MarketDirection.LONG: (
-            # (df[f"close_to_{col}"] == "YES")
-            (df["market_direction"] == MarketDirection.LONG)
-            & (df[f"close_to_{lower_col}"] == "YES")
-            & bb_2_start_condition
+            is_long[:, None] & lower_flags & bb_2_start_condition
         ),
         MarketDirection.SHORT: (
-            # (df[f"close_to_{col}"] == "NO")
-            (df["market_direction"] == MarketDirection.SHORT)
-            & (df[f"close_to_{upper_col}"] == "YES")
-            & bb_2_start_condition
+            is_short[:, None] & upper_flags & bb_2_start_condition
         ),
     }
 
     cycle_end_condition = {
         MarketDirection.LONG: (
             (
-                (df["market_direction"] == MarketDirection.LONG)
-                & (df[f"close_to_{lower_col}"] == "YES")
-                & (df[f"close_to_{lower_col}"].shift(1) == "NO")
+                is_long[:, None]
+                & lower_flags
+                & ~shift_rows(lower_flags, True)
             )
             | bb_2_end_condition
         ),
         MarketDirection.SHORT: (
             (
-                (df["market_direction"] == MarketDirection.SHORT)
-                & (df[f"close_to_{upper_col}"] == "NO")
-                & (df[f"close_to_{upper_col}"].shift(1) == "YES")
+                is_short[:, None]
+                & ~upper_flags
+                & shift_rows(upper_flags, False)
             )
             | bb_2_end_condition
         ),
     }
 
-    # Initialize the cycle number column
-    df[f"cycle_no_{col}"] = 0
-
-    update_cycle_number_by_condition(
-        df, col, cycle_start_condition, cycle_end_condition
+    update_cycle_numbers_by_condition(
+        df, cols, cycle_start_condition, cycle_end_condition
     )
 
 
-def update_cycle_count_1_L_H(df, col):
-    upper_col, lower_col = col.replace("M", "U"), col.replace("M", "L")
+def update_cycle_count_1_L_H(df, cols):
+    upper_flags = get_close_to_flags(
+        df, [col.replace("M", "U") for col in cols]
+    )
+    lower_flags = get_close_to_flags(
+        df, [col.replace("M", "L") for col in cols]
+    )
+    is_long = (df["market_direction"] == MarketDirection.LONG).to_numpy()
+    is_short = (df["market_direction"] == MarketDirection.SHORT).to_numpy()
 
     cycle_start_condition = {
-        MarketDirection.LONG: (
-            # (df[f"close_to_{col}"] == "YES")
-            (df["market_direction"] == MarketDirection.LONG)
-            & (df[f"close_to_{lower_col}"] == "YES")
-        ),
-        MarketDirection.SHORT: (
-            # (df[f"close_to_{col}"] == "NO")
-            (df["market_direction"] == MarketDirection.SHORT)
-            & (df[f"close_to_{upper_col}"] == "YES")
-        ),
+        MarketDirection.LONG: is_long[:, None] & lower_flags,
+        MarketDirection.SHORT: is_short[:, None] & upper_flags,
     }
 
     cycle_end_condition = {
         MarketDirection.LONG: (
-            (df["market_direction"] == MarketDirection.LONG)
-            & (df[f"close_to_{lower_col}"] == "YES")
-            & (df[f"close_to_{lower_col}"].shift(1) == "NO")
+            is_long[:, None] & lower_flags & ~shift_rows(lower_flags, True)
         ),
         MarketDirection.SHORT: (
-            (df["market_direction"] == MarketDirection.SHORT)
-            & (df[f"close_to_{upper_col}"] == "NO")
-            & (df[f"close_to_{upper_col}"].shift(1) == "YES")
+            is_short[:, None] & ~upper_flags & shift_rows(upper_flags, False)
         ),
     }
 
-    # Initialize the cycle number column
-    df[f"cycle_no_{col}"] = 0
-
-    update_cycle_number_by_condition(
-        df, col, cycle_start_condition, cycle_end_condition
+    update_cycle_numbers_by_condition(
+        df, cols, cycle_start_condition, cycle_end_condition
     )
 
 
-def update_cycle_count_1(merged_df, col):
-    # Create the cycle condition column
-    cycle_condition = (merged_df[f"close_to_{col}"] == "YES") & (
-        merged_df[f"close_to_{col}"].shift(1) == "NO"
-    )
-
-    # Initialize thef cycle_no_{col} with zeros
-    merged_df[f"cycle_no_{col}"] = 0
-
-    # Define a function to calculate the cycle number within each group
-    def calculate_cycle_no(group):
-        cycle_no = group.cumsum() + 1
-        return cycle_no
-
-    # Apply the function to each group
-    merged_df[f"cycle_no_{col}"] = (
-        cycle_condition.groupby(merged_df["group_id"])
-        .apply(calculate_cycle_no)
-        .reset_index(level=0, drop=True)
+def update_cycle_count_1(merged_df, cols):
+    """
+    Count the confirmed starts (close crossing to YES) of every column of
+    `cols` within each group, from 1, plus 1 when the first row is YES.
+    """
+    close_to = get_close_to_flags(merged_df, cols)
+    cycle_condition = close_to & ~shift_rows(close_to, True)
+
+    cycle_no = (
+        pd.DataFrame(cycle_condition.astype(np.int64), index=merged_df.index)
+        .groupby(merged_df["group_id"].to_numpy())
+        .cumsum()
+        + 1
     )
 
     # Adjust the initial counter
-    initial_counter = 1 if merged_df[f"close_to_{col}"].iloc[0] == "YES" else 0
-    merged_df[f"cycle_no_{col}"] += initial_counter
+    initial_counter = close_to[:1].astype(np.int64)
+    merged_df[[f"cycle_no_{col}" for col in cols]] = (
+        cycle_no.to_numpy() + initial_counter
+    )
 
 
 def merge_fractal_data(base_df, fractal_df, fractal_count_df):
-
-    # Reset index and rename for merging
-    if fractal_df is not None:
-        fractal_df = fractal_df.reset_index().rename(columns={"index": "dt"})
-        # Merge fractal cycle data
-        base_df = pd.merge_asof(
-            base_df,
-            fractal_df,
-            left_on="dt",
-            right_on="dt",
-            direction="backward",
-        )
-
-    if fractal_count_df is not None:
-        fractal_count_df = fractal_count_df.reset_index().rename(
-            columns={"index": "dt"}
-        )
-
-        # Merge fractal count data
-        base_df = pd.merge_asof(
-            base_df,
-            fractal_count_df,
-            left_on="dt",
-            right_on="dt",
-            direction="backward",
-        )
-
-    return base_df
+    # merge fractal cycle and fractal count data
+    frames = [
+        (df, list(df.columns))
+        for df in (fractal_df, fractal_count_df)
+        if df is not None
+    ]
+    return align_frames(base_df, frames, on="dt")
 
 
 def get_cycle_base_df(**kwargs):
@@ -746,6 +790,14 @@ def get_cycle_base_df(**kwargs):
     kwargs["fractal_cycle_columns"] = fractal_cycle_columns
     kwargs["fractal_count_columns"] = fractal_count_columns
 
+    cache_key = None
+    if cycle_cache.is_enabled():
+        cache_key = cycle_cache.cache_key(kwargs, base_df, files_to_read)
+        cached = cycle_cache.load(cache_key)
+        if cached is not None:
+            logger.info(f"Cycle base frames for {kwargs['name']} from cache")
+            return cached
+
     max_tf = max(tf_bb_cols.keys())
     adjusted_start_datetime = start_datetime - pd.Timedelta(minutes=max_tf[0])
     dfs = read_files(
@@ -778,111 +830,169 @@ def get_cycle_base_df(**kwargs):
         if type == "fractal_count":
             fractal_count_df = df
 
-    # merge bb1 the dataframes
-    for key, df in close_time_frames_1_dfs.items():
-        df = update_cycle_columns(df, base_df, start_datetime, kwargs)
-        df = merge_fractal_data(df, fractal_df, fractal_count_df)
-        update_signal_start_price(df)
-        update_group_analytics(df)
-        merged_df = merge_dataframes(df, bb_time_frames_1_dfs, tf_bb_cols)
-        close_time_frames_1_dfs[key] = merged_df
+    # the close time frames only share the frames read above, so their
+    # pipelines can run side by side
+    build = partial(
+        build_cycle_frame,
+        base_df=base_df,
+        start_datetime=start_datetime,
+        kwargs=kwargs,
+        fractal_dfs=(fractal_df, fractal_count_df),
+        bb_time_frames_1_dfs=bb_time_frames_1_dfs,
+        bb_time_frames_2_dfs=bb_time_frames_2_dfs,
+        tf_bb_cols=tf_bb_cols,
+    )
+    df_to_analyze = dict(
+        zip(
+            [tf for tf, _ in close_time_frames_1_dfs],
+            map_time_frames(build, close_time_frames_1_dfs.values()),
+        )
+    )
+
+    if cache_key is not None:
+        cycle_cache.store(cache_key, df_to_analyze, kwargs["name"])
+
+    return df_to_analyze, kwargs["name"]
+
+
+def build_cycle_frame(
+    df,
+    base_df,
+    start_datetime,
+    kwargs,
+    fractal_dfs,
+    bb_time_frames_1_dfs,
+    bb_time_frames_2_dfs,
+    tf_bb_cols,
+):
+    """
+    Merge one close time frame with the signal, fractal and BB frames and
+    number its cycles.
+    """
+    df = update_cycle_columns(df, base_df, start_datetime, kwargs)
+    df = merge_fractal_data(df, *fractal_dfs)
+    update_signal_start_price(df)
+    update_group_analytics(df)
 
     # update cycle count
-    df_to_analyze = {}
     if kwargs.get("check_bb_2"):
-        for key, df in close_time_frames_1_dfs.items():
-            # merge bb2 the dataframes
-            tf, origin = key
-            merged_df = merge_dataframes(
-                df, bb_time_frames_2_dfs, tf_bb_cols, direction="backward"
-            )
-            bb_cols = []
-            for bb_key in chain(bb_time_frames_1_dfs, bb_time_frames_2_dfs):
-                bb_cols.extend(tf_bb_cols[bb_key].values())
-            updated_yes_no_columns(
-                bb_cols,
-                merged_df,
-            )
-
-            # updated the cycle count
-            if kwargs.get("include_higher_and_lower"):
-                mean_columns = [
-                    col
-                    for bb_key in bb_time_frames_1_dfs
-                    for col in tf_bb_cols[bb_key].values()
-                    if "M" in col
-                ]
-                for col in mean_columns:
-                    update_cycle_count_2_L_H(merged_df, col)
-            else:
-                for col in bb_cols:
-                    update_cycle_count_2(merged_df, col)
-
-            df_to_analyze[tf] = merged_df
-
-            # write_dataframe_to_csv(
-            #     merged_df,
-            #     "pa_analysis_output/cycle_outpts/base_df",
-            #     f"base_df_tf_{tf}.csv",
-            # )
+        # merge bb1 and bb2 the dataframes
+        df = merge_dataframes(
+            df, {**bb_time_frames_1_dfs, **bb_time_frames_2_dfs}, tf_bb_cols
+        )
+        bb_cols = []
+        for bb_key in chain(bb_time_frames_1_dfs, bb_time_frames_2_dfs):
+            bb_cols.extend(tf_bb_cols[bb_key].values())
+        updated_yes_no_columns(bb_cols, df)
+
+        if kwargs.get("include_higher_and_lower"):
+            mean_columns = [
+                col
+                for bb_key in bb_time_frames_1_dfs
+                for col in tf_bb_cols[bb_key].values()
+                if "M" in col
+            ]
+            update_cycle_count_2_L_H(df, mean_columns)
+        else:
+            update_cycle_count_2(df, bb_cols)
     else:
-        for key, df in close_time_frames_1_dfs.items():
-            bb_cols = []
-            for bb_key in bb_time_frames_1_dfs:
-                bb_cols.extend(tf_bb_cols[bb_key].values())
-            updated_yes_no_columns(bb_cols, df)
-            if kwargs.get("include_higher_and_lower"):
-                mean_columns = [col for col in bb_cols if "M" in col]
-                for col in mean_columns:
-                    update_cycle_count_1_L_H(df, col)
-            else:
-                for col in bb_cols:
-                    update_cycle_count_1(df, col)
-            df_to_analyze[tf] = df
+        # merge bb1 the dataframes
+        df = merge_dataframes(df, bb_time_frames_1_dfs, tf_bb_cols)
+        bb_cols = []
+        for bb_key in bb_time_frames_1_dfs:
+            bb_cols.extend(tf_bb_cols[bb_key].values())
+        updated_yes_no_columns(bb_cols, df)
+        if kwargs.get("include_higher_and_lower"):
+            mean_columns = [col for col in bb_cols if "M" in col]
+            update_cycle_count_1_L_H(df, mean_columns)
+        else:
+            update_cycle_count_1(df, bb_cols)
+    return df
 
-    return df_to_analyze, kwargs["name"]
+
+def map_time_frames(func, frames, workers=None, pool=None):
+    """
+    Apply func to every close time frame, in order.
+
+    With more than one worker (CYCLE_TF_WORKERS) the frames run on a thread
+    pool, or on a process pool with CYCLE_TF_POOL=process. A daemonic
+    process, like a sweep pool worker, cannot start processes and uses
+    threads instead.
+    """
+    frames = list(frames)
+    workers = min(workers or CYCLE_TF_WORKERS, len(frames))
+    if workers <= 1:
+        return [func(frame) for frame in frames]
+
+    pool = pool or CYCLE_TF_POOL
+    if pool == "process" and multiprocessing.current_process().daemon:
+        logger.info("Daemonic process, running the time frames on threads")
+        pool = "thread"
+    executor_type = (
+        ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    )
+    with executor_type(max_workers=workers) as executor:
+        return list(executor.map(func, frames))
 
 
 def update_group_analytics(df):
-    for key, group in df.groupby("group_id"):
-        direction = group["market_direction"].iloc[0]
-
-        if direction == MarketDirection.UNKNOWN:
-            continue
-
-        # Prepare the initial values
-        if direction == MarketDirection.LONG:
-            min_max_idx = group["High"].idxmax()
-            min_max = group.loc[min_max_idx, "High"]
-        elif direction == MarketDirection.SHORT:
-            min_max_idx = group["Low"].idxmin()
-            min_max = group.loc[min_max_idx, "Low"]
-        else:
-            continue
-
-        # Validate the next index and compute next_close
-        next_idx = group.index[-1] + 1
-        if next_idx in df.index:
-            if direction == MarketDirection.LONG:
-                close = df.loc[next_idx, "High"]
-            elif direction == MarketDirection.SHORT:
-                close = df.loc[next_idx, "Low"]
-        else:
-            print("close not found for group id:", key)
-            continue
-
-        # Calculate values
-        df.loc[group.index[-1], GroupAnalytics.MIN_MAX.value] = min_max
-        df.loc[group.index[-1], GroupAnalytics.CLOSE.value] = close
-        df.loc[
-            group.index[-1], GroupAnalytics.CLOSE_TO_MIN_MAX_PERCENT.value
-        ] = (close / min_max - 1) * 100
-        df.loc[
-            group.index[-1], GroupAnalytics.CLOSE_TO_MIN_MAX_POINTS.value
-        ] = make_round(close - min_max)
-        df.loc[group.index[-1], GroupAnalytics.DURATION.value] = (
-            df.loc[next_idx, "dt"] - group.loc[min_max_idx, "dt"]
-        )
+    """
+    Write the group min/max, the close after the group and their distance on
+    the last row of every LONG/SHORT group.
+
+    LONG groups use the highest High, SHORT groups the lowest Low; the close
+    is the same column on the row following the group.
+    """
+    grouped = df.groupby("group_id")
+    labels = df.index.to_series().groupby(df["group_id"])
+    groups = pd.DataFrame(
+        {
+            "first_idx": labels.first(),
+            "last_idx": labels.last(),
+            "max_idx": grouped["High"].idxmax(),
+            "min_idx": grouped["Low"].idxmin(),
+        }
+    )
+    groups["direction"] = df.loc[
+        groups["first_idx"], "market_direction"
+    ].to_numpy()
+
+    is_long = (groups["direction"] == MarketDirection.LONG).to_numpy()
+    is_short = (groups["direction"] == MarketDirection.SHORT).to_numpy()
+    groups = groups[is_long | is_short]
+    is_long = is_long[is_long | is_short]
+
+    # the row following each group
+    next_positions = df.index.get_indexer(groups["last_idx"] + 1)
+    for key in groups.index[next_positions < 0]:
+        print("close not found for group id:", key)
+    is_long = is_long[next_positions >= 0]
+    groups = groups[next_positions >= 0]
+    next_positions = next_positions[next_positions >= 0]
+    if groups.empty:
+        return
+
+    min_max_idx = np.where(is_long, groups["max_idx"], groups["min_idx"])
+    min_max_positions = df.index.get_indexer(min_max_idx)
+    high, low = df["High"].to_numpy(), df["Low"].to_numpy()
+    min_max = np.where(
+        is_long, high[min_max_positions], low[min_max_positions]
+    )
+    close = np.where(is_long, high[next_positions], low[next_positions])
+    dt = df["dt"].to_numpy()
+
+    rows = groups["last_idx"].to_numpy()
+    df.loc[rows, GroupAnalytics.MIN_MAX.value] = min_max
+    df.loc[rows, GroupAnalytics.CLOSE.value] = close
+    df.loc[rows, GroupAnalytics.CLOSE_TO_MIN_MAX_PERCENT.value] = (
+        close / min_max - 1
+    ) * 100
+    df.loc[rows, GroupAnalytics.CLOSE_TO_MIN_MAX_POINTS.value] = np.round(
+        close - min_max, 2
+    )
+    df.loc[rows, GroupAnalytics.DURATION.value] = (
+        dt[next_positions] - dt[min_max_positions]
+    )
 
 
 def update_fractal_counter(
@@ -892,36 +1002,23 @@ def update_fractal_counter(
     condition=None,
     skip_count=0,
 ):
+    group_keys = base_df[group_by_col]
     for col in fractal_cycle_columns:
-        # Initialize the count column
         count_col = f"count_{col}"
-        base_df[count_col] = 0
-
-        # Iterate over each group
-        for group_id, group in base_df.groupby(group_by_col):
-
-            if group_id < 2:
-                continue
-
-            # Calculate cumulative sum for True values in the column
-            # Apply condition if provided, otherwise default to the column being True
-            if condition is not None:
-                cumulative_sum = (
-                    (group[col] == True) & (condition.loc[group.index])
-                ).cumsum()
-            else:
-                cumulative_sum = (group[col] == True).cumsum()
-
-            # Update the base_df with the cumulative sum for the group
-            base_df.loc[base_df[group_by_col] == group_id, count_col] = (
-                cumulative_sum
-            )
 
-            # Reset count to 0 where the column value is False
-            base_df.loc[
-                (base_df[col] == False) & (base_df[group_by_col] == group_id),
-                count_col,
-            ] = 0
+        # Calculate cumulative sum for True values in the column
+        # Apply condition if provided, otherwise default to the column being True
+        if condition is not None:
+            hits = (base_df[col] == True) & condition
+        else:
+            hits = base_df[col] == True
+
+        # Groups below 2 are not counted, reset count to 0 where the column
+        # value is False
+        counted = (group_keys >= 2) & (base_df[col] != False)
+        base_df[count_col] = np.where(
+            counted, count_hits_in_group(hits, group_keys), 0
+        )
 
 
 def update_fractal_counter_1(
@@ -931,47 +1028,27 @@ def update_fractal_counter_1(
     condition=None,
     skip_count=0,
 ):
+    group_keys = [base_df[col] for col in group_by_col]
+    grp_id, bb_cycle, fractal_cycle = group_keys
     for col in fractal_cycle_columns:
-        # Initialize the count column
         count_col = f"count_{col}"
-        base_df[count_col] = 0
-
-        # Iterate over each group
-        for group_id, group in base_df.groupby(group_by_col):
-            grp_id, bb_cycle, fractal_cycle = group_id
-            if bb_cycle < 1 or fractal_cycle < 1:
-                continue
-
-            # Calculate the boolean mask for the condition
-            if condition is not None:
-                mask = (group[col] == True) & (condition.loc[group.index])
-            else:
-                mask = group[col] == True
-
-            # Find the indices where the condition is True
-            true_indices = np.where(mask)[0]
-
-            # Skip the first `skip_count` occurrences
-            if len(true_indices) > skip_count:
-                true_indices = true_indices[skip_count:]
 
-            # Initialize a zero array for the cumulative sum
-            cumsum_array = np.zeros(len(group), dtype=int)
-
-            # Set the positions of remaining True values to 1
-            cumsum_array[true_indices] = 1
-
-            # Calculate the cumulative sum
-            cumulative_sum = np.cumsum(cumsum_array)
-
-            # Update the base_df with the cumulative sum for the group
-            base_df.loc[group.index, count_col] = cumulative_sum
+        # Calculate the boolean mask for the condition
+        if condition is not None:
+            hits = (base_df[col] == True) & condition
+        else:
+            hits = base_df[col] == True
 
-        # Reset count to 0 where the column value is False
-        base_df.loc[
-            base_df[col] == False,
-            count_col,
-        ] = 0
+        # Skip the first `skip_count` occurrences of every group, reset the
+        # count where the column value is False
+        counted = (
+            (bb_cycle >= 1) & (fractal_cycle >= 1) & (base_df[col] != False)
+        )
+        base_df[count_col] = np.where(
+            counted,
+            count_hits_in_group(hits, group_keys, skip_count=skip_count),
+            0,
+        )
 
     return base_df
 
@@ -1225,6 +1302,23 @@ def is_cycle_exit_fractal(row, market_direction, exit_state):
     return False
 
 
+def get_previous_cycle_column(cycle_col):
+    return f"previous_{cycle_col}"
+
+
+def update_previous_cycle_ids(df, cycle_columns):
+    """
+    Add the cycle id of the previous row for every cycle column, read by
+    the entry and exit checks of `Trade.current_cycle`.
+    """
+    for cycle_col in cycle_columns:
+        df[get_previous_cycle_column(cycle_col)] = df[cycle_col].shift(1)
+
+
+def get_previous_cycle_id(row):
+    return row[get_previous_cycle_column(Trade.current_cycle)]
+
+
 def check_cycle_entry_condition(row: pd.Series, state: dict) -> bool:
     """
     Check if the entry condition is met.
@@ -1275,7 +1369,7 @@ def check_cycle_entry_condition(row: pd.Series, state: dict) -> bool:
         )
 
     is_cycle_change_entry = False
-    if row[Trade.current_cycle] != row["previous_cycle_id"]:
+    if row[Trade.current_cycle] != get_previous_cycle_id(row):
         is_cycle_change_entry = True
 
     # clear the state if the cycle changes
@@ -1295,13 +1389,14 @@ def check_cycle_entry_condition(row: pd.Series, state: dict) -> bool:
 
 
 def clear_state(row, state):
-    if row[Trade.current_cycle] != row["previous_cycle_id"]:
-        state[row["previous_cycle_id"]].clear()
+    previous_cycle_id = get_previous_cycle_id(row)
+    if row[Trade.current_cycle] != previous_cycle_id:
+        state[previous_cycle_id].clear()
 
 
 def is_tp_exit(row, exit_state):
     is_tp_exit = False
-    if row[TargetProfitColumns.TP_END.value] == "YES":
+    if row[TargetProfitColumns.TP_END.value] == True:
         is_tp_exit = True
 
     return is_tp_exit
@@ -1337,10 +1432,11 @@ def check_cycle_exit_signals(row, exit_state, entry_state):
     #         return True, TradeExitType.SIGNAL
 
     # clear the state if the cycle changes
+    previous_cycle_id = get_previous_cycle_id(row)
     if (
         not pd.isna(row[Trade.current_cycle])
-        and not pd.isna(row["previous_cycle_id"])
-        and row[Trade.current_cycle] != row["previous_cycle_id"]
+        and not pd.isna(previous_cycle_id)
+        and row[Trade.current_cycle] != previous_cycle_id
     ):
         Trade.reset_trade_entry_id_counter()
         return True, TradeExitType.CYCLE_CHANGE
@@ -1362,62 +1458,162 @@ def check_cycle_exit_signals(row, exit_state, entry_state):
     return False, None
 
 
+FIRST_CYCLE_IDS = {
+    CycleType.FIRST_CYCLE: 2,
+    CycleType.MTM_CYCLE: 1,
+    CycleType.CTC_CYCLE: 1,
+}
+
+
+class CycleSignals(NamedTuple):
+    """
+    Entry and exit decisions of every row for one cycle column.
+    """
+
+    is_entry: np.ndarray
+    entry_direction: np.ndarray
+    entry_type: np.ndarray
+    is_exit: np.ndarray
+    exit_type: np.ndarray
+
+
+def get_row_directions(values):
+    """
+    Market directions of the rows, None for NaN and UNKNOWN.
+    """
+    directions = np.asarray(values, dtype=object).copy()
+    directions[
+        pd.isna(directions) | (directions == MarketDirection.UNKNOWN)
+    ] = None
+    return directions
+
+
+def get_confirmed_fractals(merged_df, key, directions):
+    """
+    Confirmed fractal of every row in its own direction, truthy like the
+    row by row checks (NaN counts as a fractal).
+    """
+    fractals = np.zeros(len(merged_df), dtype=bool)
+    for direction, column in confirm_fractal_column_dict[key].items():
+        rows = directions == direction
+        if rows.any():
+            fractals[rows] = merged_df[column].to_numpy().astype(bool)[rows]
+    return fractals
+
+
+def precompute_cycle_signals(merged_df, cycle_col) -> CycleSignals:
+    """
+    Evaluate `check_cycle_entry_condition` and `check_cycle_exit_signals`
+    for every row of a cycle column at once.
+
+    The checks only read the row and the `Trade` settings: the exit state
+    they are given is never updated on cycle runs. An exit of type
+    CYCLE_CHANGE also resets the entry id counter.
+    """
+    num_rows = len(merged_df)
+    cycle_ids = merged_df[cycle_col].to_numpy(dtype=float)
+    previous_cycle_ids = merged_df[
+        get_previous_cycle_column(cycle_col)
+    ].to_numpy(dtype=float)
+    cycle_change = cycle_ids != previous_cycle_ids
+
+    before_start = np.zeros(num_rows, dtype=bool)
+    end_reached = np.zeros(num_rows, dtype=bool)
+    if Trade.type == TradeType.INTRADAY:
+        times = np.asarray(merged_df.index.time)
+        before_start = times < Trade.trade_start_time
+        end_reached = times >= Trade.trade_end_time
+
+    # entry
+    directions = get_row_directions(merged_df["market_direction"])
+    # real cycle starts from 1 for secondary cycles and 2 for first cycle
+    first_cycle_id = FIRST_CYCLE_IDS.get(Trade.cycle_to_consider, -np.inf)
+    initial_cycles = np.isnan(cycle_ids) | (cycle_ids < first_cycle_id)
+    eligible = ~before_start & ~initial_cycles & ~end_reached
+    if Trade.allowed_direction != MarketDirection.ALL:
+        eligible &= directions == Trade.allowed_direction
+
+    entry_type = np.full(num_rows, None, dtype=object)
+    is_entry = eligible & cycle_change
+    entry_type[is_entry] = TradeExitType.CYCLE_CHANGE
+    if Trade.check_entry_fractal:
+        fractal_entry = (
+            eligible
+            & ~cycle_change
+            & get_confirmed_fractals(merged_df, "entry", directions)
+        )
+        entry_type[fractal_entry] = TradeExitType.FRACTAL
+        is_entry |= fractal_entry
+    entry_direction = np.where(is_entry, directions, None)
+
+    # exit, in the order of precedence of the row by row check
+    exit_type = np.full(num_rows, None, dtype=object)
+    if Trade.check_exit_fractal:
+        exit_directions = get_row_directions(
+            merged_df["exit_market_direction"]
+        )
+        exit_type[
+            get_confirmed_fractals(merged_df, "exit", exit_directions)
+        ] = TradeExitType.FRACTAL
+    if Trade.calculate_tp:
+        exit_type[
+            (merged_df[TargetProfitColumns.TP_END.value] == True).to_numpy()
+        ] = TradeExitType.TP
+    exit_type[
+        ~np.isnan(cycle_ids) & ~np.isnan(previous_cycle_ids) & cycle_change
+    ] = TradeExitType.CYCLE_CHANGE
+    exit_type[end_reached] = TradeExitType.END
+
+    return CycleSignals(
+        is_entry=is_entry,
+        entry_direction=entry_direction,
+        entry_type=entry_type,
+        is_exit=pd.notna(exit_type),
+        exit_type=exit_type,
+    )
+
+
+def tag_from_first_occurrence(strategy_df, store, columns, tag):
+    """
+    Tag the rows of strategy_df found in the store and keep them from the
+    first one where all the columns hold the tag, None when there is none.
+    """
+    strategy_df, positions = store.join(strategy_df, columns)
+    first_occurrence = store.first_occurrence(positions, tag, columns)
+    if first_occurrence is None:
+        return None
+    return strategy_df.iloc[first_occurrence:]
+
+
 def include_volatile_volume_tags(validated_data, strategy_df):
     if validated_data.get("include_volume"):
-        volume_df = pd.read_csv(
+        store = get_tag_store(
             f"{VOLUME_OUTPUT_FOLDER}/{validated_data['volume_file']}",
-            usecols=["dt", "category"],
-            index_col="dt",
-            parse_dates=True,
+            ["category"],
         )
-        strategy_df = pd.merge(
-            strategy_df, volume_df, left_index=True, right_index=True
+        strategy_df = tag_from_first_occurrence(
+            strategy_df,
+            store,
+            ["category"],
+            validated_data["volume_tag_to_process"],
         )
-
-        if not strategy_df.loc[
-            strategy_df["category"] == validated_data["volume_tag_to_process"],
-        ].empty:
-            first_occurrence = (
-                strategy_df.loc[
-                    strategy_df["category"]
-                    == validated_data["volume_tag_to_process"],
-                ]
-                .iloc[0]
-                .name
-            )
-            strategy_df = strategy_df.loc[first_occurrence:]
-        else:
+        if strategy_df is None:
             raise ValueError(
                 "No data found for the given volume tag condition"
             )
 
     if validated_data.get("include_volatile"):
-        volatile_df = pd.read_csv(
-            f"{VOLATILE_OUTPUT_FOLDER}/{validated_data['volatile_file']}",
-            index_col="dt",
-            parse_dates=True,
+        volatile_file = (
+            f"{VOLATILE_OUTPUT_FOLDER}/{validated_data['volatile_file']}"
         )
-        volatile_tags = [
-            col for col in volatile_df.columns if "volatile_tag" in col
-        ]
-
-        strategy_df = pd.merge(
+        volatile_tags = get_tag_columns(volatile_file, "volatile_tag")
+        strategy_df = tag_from_first_occurrence(
             strategy_df,
-            volatile_df[volatile_tags],
-            left_index=True,
-            right_index=True,
+            get_tag_store(volatile_file, volatile_tags),
+            volatile_tags,
+            validated_data["volatile_tag_to_process"],
         )
-
-        condition = True
-        for tag in volatile_tags:
-            condition &= (
-                strategy_df[tag] == validated_data["volatile_tag_to_process"]
-            )
-
-        if not strategy_df[condition].empty:
-            first_occurrence = strategy_df[condition].iloc[0].name
-            strategy_df = strategy_df.loc[first_occurrence:]
-        else:
+        if strategy_df is None:
             raise ValueError(
                 "No data found for the given volatile tag condition"
             )
@@ -1425,38 +1621,145 @@ def include_volatile_volume_tags(validated_data, strategy_df):
     return strategy_df
 
 
+def get_cycle_input_files(validated_data, strategy_pair, instrument):
+    """
+    Strategy, BB/close timeframe and fractal cycle files read by
+    `process_cycle` for a pair, for the memory estimate of its task.
+    """
+    files_to_read, *_ = formulate_files_to_read(
+        {**validated_data, "instrument": instrument, "name": ""}
+    )
+    return [
+        *get_strategy_input_files(validated_data, strategy_pair, instrument),
+        *files_to_read.values(),
+    ]
+
+
+def process_cycle_trades(
+    instrument,
+    portfolio_ids_str,
+    strategy_pair_str,
+    merged_df,
+    cycle_columns,
+):
+    """
+    Simulate the trades of every cycle column in a single pass over the rows.
+
+    Every cycle column keeps its own open trades and entry id counter, so
+    the trades are the ones a separate `process_trade` run per cycle column
+    would give, each run starting from entry id 0. The entries and exits of
+    every row come from `precompute_cycle_signals`.
+
+    Parameters:
+        merged_df (DataFrame): Rows to trade, with the previous cycle ids
+            added by `update_previous_cycle_ids`.
+        cycle_columns (list): Cycle columns to trade.
+
+    Returns:
+        DataFrame: The trades of all the cycle columns, tagged with their
+        cycle column.
+    """
+    simulations = {
+        cycle: {
+            "exit_state": {
+                MarketDirection.PREVIOUS: None,
+                "signal_count": 1,
+            },
+            "active_trades": [],
+            "completed_trades": [],
+            "entry_id_counter": 0,
+        }
+        for cycle in cycle_columns
+    }
+
+    # the entry and exit checks do not depend on the open trades, only the
+    # trades themselves are tracked row by row
+    signals = {
+        cycle: precompute_cycle_signals(merged_df, cycle)
+        for cycle in cycle_columns
+    }
+    rows = zip(merged_df.index, merged_df["Close"].to_numpy())
+    for position, (row_datetime, close) in enumerate(rows):
+        for cycle, simulation in simulations.items():
+            cycle_signals = signals[cycle]
+            if cycle_signals.is_exit[position]:
+                exit_type = cycle_signals.exit_type[position]
+                if exit_type == TradeExitType.CYCLE_CHANGE:
+                    simulation["entry_id_counter"] = 0
+                close_trades(
+                    simulation["active_trades"],
+                    simulation["completed_trades"],
+                    row_datetime,
+                    close,
+                    exit_type,
+                )
+            if cycle_signals.is_entry[position]:
+                Trade.current_cycle = cycle
+                Trade.entry_id_counter = simulation["entry_id_counter"]
+                simulation["active_trades"].append(
+                    Trade(
+                        entry_signal=cycle_signals.entry_direction[position],
+                        entry_datetime=row_datetime,
+                        entry_type=cycle_signals.entry_type[position],
+                        entry_price=close,
+                        signal_count=simulation["exit_state"]["signal_count"],
+                    )
+                )
+                simulation["entry_id_counter"] = Trade.entry_id_counter
+
+    trade_outputs = []
+    for cycle, simulation in simulations.items():
+        trade_outputs.extend(
+            {OutputColumn.CYCLE.value: cycle, **output}
+            for output in formulate_trade_outputs(
+                chain(
+                    simulation["completed_trades"],
+                    simulation["active_trades"],
+                ),
+                instrument,
+                portfolio_ids_str,
+                strategy_pair_str,
+            )
+        )
+
+    return pd.DataFrame(trade_outputs)
+
+
 def process_cycle(validated_data, strategy_pair, instrument):
     strategy_pair_str = "_".join(map(lambda x: str(x), strategy_pair))
     portfolio_ids_str = " - ".join(validated_data.get("portfolio_ids"))
 
     base_path = os.getenv("STRATEGY_DB_PATH")
+    debug_artifacts.set_context(instrument, strategy_pair_str)
 
     start_datetime, end_datetime = format_dates(
         validated_data.get("start_date"), validated_data.get("end_date")
     )
 
-    strategy_df = load_strategy_data(
-        instrument,
-        validated_data.get("portfolio_ids"),
-        strategy_pair,
-        start_datetime,
-        end_datetime,
-        base_path,
-    )[0]
+    with stage(Stage.READ) as event:
+        strategy_df = load_strategy_data(
+            instrument,
+            validated_data.get("portfolio_ids"),
+            strategy_pair,
+            start_datetime,
+            end_datetime,
+            base_path,
+        )[0]
 
-    strategy_df = include_volatile_volume_tags(validated_data, strategy_df)
+        strategy_df = include_volatile_volume_tags(validated_data, strategy_df)
+        event.rows = len(strategy_df)
 
-    base_df = get_base_df(
-        validated_data, strategy_df, strategy_pair_str, instrument
-    )
+    with stage(Stage.CYCLE_BUILD, rows=len(strategy_df)) as event:
+        base_df = get_base_df(validated_data, strategy_df)
 
-    cycle_base_dfs, _ = get_cycle_base_df(
-        **validated_data, base_df=base_df, instrument=instrument
-    )
+        cycle_base_dfs, _ = get_cycle_base_df(
+            **validated_data, base_df=base_df, instrument=instrument
+        )
 
-    cycle_base_df = cycle_base_dfs[
-        validated_data.get("close_time_frames_1")[0]
-    ]
+        cycle_base_df = cycle_base_dfs[
+            validated_data.get("close_time_frames_1")[0]
+        ]
+        event.rows = len(cycle_base_df)
 
     initialize(validated_data)
 
@@ -1472,106 +1775,101 @@ def process_cycle(validated_data, strategy_pair, instrument):
             return market_direction
         return MarketDirection.UNKNOWN
 
-    cycle_base_df["exit_market_direction"] = cycle_base_df.apply(
-        get_exit_market_direction, axis=1
-    )
+    with stage(Stage.CYCLE_BUILD, rows=len(cycle_base_df)):
+        cycle_base_df["exit_market_direction"] = cycle_base_df.apply(
+            get_exit_market_direction, axis=1
+        )
 
-    # need to update MTM and CTC cycle id
-    cycle_cols = defaultdict(list)
+        # need to update MTM and CTC cycle id
+        cycle_cols = defaultdict(list)
 
-    cycle_cols[CycleType.FIRST_CYCLE] = [
-        col for col in cycle_base_df.columns if "cycle_no_" in col
-    ]
+        cycle_cols[CycleType.FIRST_CYCLE] = [
+            col for col in cycle_base_df.columns if "cycle_no_" in col
+        ]
 
-    update_secondary_cycle_ids(
-        cycle_base_df,
-        validated_data=validated_data,
-        cycle_cols=cycle_cols,
-    )
+        update_secondary_cycle_ids(
+            cycle_base_df,
+            validated_data=validated_data,
+            cycle_cols=cycle_cols,
+        )
 
-    update_target_profit_analysis(
-        cycle_base_df,
-        validated_data.get("tp_percentage"),
-        validated_data.get("tp_method"),
-        cycle_col_name=cycle_cols[CycleType.MTM_CYCLE][0],
-        close_col_name=cycle_cols[CycleType.FIRST_CYCLE][0].replace(
-            "cycle_no", "close_to"
-        ),
-    )
+        update_target_profit_analysis(
+            cycle_base_df,
+            validated_data.get("tp_percentage"),
+            validated_data.get("tp_method"),
+            cycle_col_name=cycle_cols[CycleType.MTM_CYCLE][0],
+            close_col_name=cycle_cols[CycleType.FIRST_CYCLE][0].replace(
+                "cycle_no", "close_to"
+            ),
+        )
 
     # update trade cycle columns
     Trade.cycle_columns = cycle_cols
 
-    fractal_files = get_fractal_dataframes(
-        validated_data, instrument, base_path, start_datetime, end_datetime
-    )
+    with stage(Stage.READ) as event:
+        fractal_files = get_fractal_dataframes(
+            validated_data, instrument, base_path, start_datetime, end_datetime
+        )
+        event.rows = sum(len(df) for df in fractal_files.values())
 
-    # merge all dataframes
-    merged_fractal_df = merge_all_df(fractal_files.values())
+    with stage(Stage.MERGE) as event:
+        # merge all dataframes
+        merged_fractal_df = merge_all_df(fractal_files.values())
 
-    merged_fractal_df.reset_index(inplace=True)
+        merged_fractal_df.reset_index(inplace=True)
 
-    signal_columns = [
-        f"TAG_{id}" for id in validated_data.get("portfolio_ids")
-    ]
+        signal_columns = [
+            f"TAG_{id}" for id in validated_data.get("portfolio_ids")
+        ]
 
-    cols = [
-        "dt",
-        "Open",
-        "High",
-        "Low",
-        "Close",
-        "market_direction",
-        "exit_market_direction",
-        "group_id",
-        *signal_columns,
-        *cycle_cols[Trade.cycle_to_consider],
-        TargetProfitColumns.TP_END.value,
-    ]
+        cols = [
+            "dt",
+            "Open",
+            "High",
+            "Low",
+            "Close",
+            "market_direction",
+            "exit_market_direction",
+            "group_id",
+            *signal_columns,
+            *cycle_cols[Trade.cycle_to_consider],
+            TargetProfitColumns.TP_END.value,
+        ]
 
-    merged_df = pd.merge_asof(
-        merged_fractal_df,
-        cycle_base_df[cols],
-        left_on="TIMESTAMP",
-        right_on="dt",
-        direction="backward",
-    )
-    # make TIMESTAMP as index
-    merged_df.set_index("TIMESTAMP", inplace=True)
-    if DEBUG:
-        write_dataframe_to_csv(
-            merged_df,
-            SG_CYCLE_OUTPUT_FOLDER,
-            f"merged_df_{instrument}_{strategy_pair_str}.csv",
+        merged_df = pd.merge_asof(
+            merged_fractal_df,
+            cycle_base_df[cols],
+            left_on="TIMESTAMP",
+            right_on="dt",
+            direction="backward",
         )
+        # make TIMESTAMP as index
+        merged_df.set_index("TIMESTAMP", inplace=True)
+        event.rows = len(merged_df)
+
+    if debug_artifacts.is_enabled():
+        with stage(Stage.WRITE, rows=len(merged_df)):
+            debug_artifacts.write_artifact(
+                merged_df, SG_CYCLE_OUTPUT_FOLDER, "merged_df"
+            )
 
-    # process trade
-    for cycle in Trade.cycle_columns[Trade.cycle_to_consider]:
-        Trade.current_cycle = cycle
-
-        # update previous cycle id
-        merged_df["previous_cycle_id"] = merged_df[cycle].shift(1)
-
-        file_name = f"df_{instrument}_{strategy_pair_str}_{cycle}.csv"
-
-        entry_state = defaultdict(deque)
+    # process trade for all the cycle columns in one pass
+    cycle_columns = Trade.cycle_columns[Trade.cycle_to_consider]
+    update_previous_cycle_ids(merged_df, cycle_columns)
 
-        exit_state = {
-            MarketDirection.PREVIOUS: None,
-            "signal_count": 1,
-        }
-        output_df = process_trade(
+    with stage(Stage.TRADE_LOOP, rows=len(merged_df)):
+        output_df = process_cycle_trades(
             instrument,
             portfolio_ids_str,
             strategy_pair_str,
             merged_df,
-            entry_state,
-            exit_state,
-            entry_func=check_cycle_entry_condition,
-            exit_func=check_cycle_exit_signals,
+            cycle_columns,
         )
 
-        if DEBUG:
+    if DEBUG:
+        with stage(Stage.WRITE, rows=len(output_df)):
             write_dataframe_to_csv(
-                output_df, SG_CYCLE_OUTPUT_FOLDER, file_name
+                output_df,
+                SG_CYCLE_OUTPUT_FOLDER,
+                f"df_{instrument}_{strategy_pair_str}.csv",
             )
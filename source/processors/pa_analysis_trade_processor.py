@@ -16,6 +16,7 @@ from source.constants import (
     SecondCycleIDColumns,
     TargetProfitColumns,
 )
+from source import debug_artifacts
 from source.data_reader import (
     merge_all_df,
     read_csv_file,
@@ -29,12 +30,13 @@ from source.processors.cycle_analysis_processor import (
 from source.processors.cycle_trade_processor import (
     check_cycle_entry_condition,
     check_cycle_exit_signals,
+    update_previous_cycle_ids,
 )
 from source.processors.signal_trade_processor import (
     process_trade,
 )
 from source.trade import Trade, initialize
-from source.utils import write_dataframe_to_csv
+from source.utils import decode_yes_no, write_dataframe_to_csv
 from tradesheet.index import generate_tradesheet
 
 
@@ -43,13 +45,17 @@ logger = logging.getLogger(__name__)
 
 def process_pa_output(validated_data, *args):
 
-    pa_df = pd.read_csv(
-        f"{PA_ANALYSIS_CYCLE_FOLDER}/{validated_data['pa_file']}",
-        index_col="dt",
-        parse_dates=True,
+    pa_df = decode_yes_no(
+        pd.read_csv(
+            f"{PA_ANALYSIS_CYCLE_FOLDER}/{validated_data['pa_file']}",
+            index_col="dt",
+            parse_dates=True,
+        )
     )
     terms = validated_data["pa_file"].split("_")
     instrument = terms[0]
+    file_name = "_".join(terms[:-2])
+    debug_artifacts.set_context(file_name)
 
     index = "dt"
     fractal_path = os.getenv("SIGNAL_FRACTAL_DB_PATH")
@@ -158,8 +164,6 @@ def process_pa_output(validated_data, *args):
 
     merged_df = merge_all_df([merged_df, *dfs.values()])
 
-    file_name = "_".join(validated_data["pa_file"].split("_")[:-2])
-
     if (
         validated_data["calculate_fractal_analysis"]
         and validated_data["cycle_to_consider"]
@@ -247,12 +251,10 @@ def process_pa_output(validated_data, *args):
 
     for cycle in validated_data["cycle_to_consider"]:
 
-        merged_df["previous_cycle_id"] = merged_df[cycle_cols[cycle]].shift(1)
+        update_previous_cycle_ids(merged_df, [cycle_cols[cycle]])
 
-        write_dataframe_to_csv(
-            merged_df,
-            SG_CYCLE_OUTPUT_FOLDER,
-            f"merged_df_{file_name}_{cycle.value}.csv",
+        debug_artifacts.write_artifact(
+            merged_df, SG_CYCLE_OUTPUT_FOLDER, f"merged_df_{cycle.value}"
         )
 
         initialize(validated_data)
@@ -49,7 +49,6 @@ This Python module defines functions for processing trades based on a specific s
 
 from collections import deque
 from itertools import chain
-import multiprocessing
 import os
 import pandas as pd
 
@@ -61,9 +60,15 @@ from source.constants import (
     TradeType,
     fractal_column_dict,
     confirm_fractal_column_dict,
-    cpu_percent_to_use,
 )
-from source.data_reader import merge_all_df, read_data
+from source.data_reader import (
+    get_strategy_file_details,
+    merge_all_df,
+    read_data,
+)
+from source.parallel.ledger import TaskStatus
+from source.parallel.runner import Task, run_tasks, sweep_run_id
+from source.parallel.telemetry import Stage, stage
 from source.trade import Trade, initialize
 from source.utils import write_dataframe_to_csv
 from tradesheet.index import generate_tradesheet
@@ -487,20 +492,33 @@ def identify_exit_signals(row, exit_state, entry_state):
     return is_trail_bb_band_exit or is_fractal_exit, exit_type
 
 
-def multiple_process(validated_input, process: callable):
+def multiple_process(
+    validated_input,
+    process: callable,
+    resume=False,
+    on_progress=None,
+    input_files: callable = None,
+):
     """
         Processes trades based on a defined strategy and outputs results.
 
     This function reads market data for a specified instrument, portfolio, and strategy combination.
     It then iterates through the data and checks for entry and exit signals based on the configured trading strategy.
 
+    Every instrument x strategy pair is a task of the run ledger, so when the
+    same sweep is submitted again with `resume` the pairs that already
+    succeeded on the same input files are skipped.
+
     Args:
-        start_date (str): Start date for data retrieval (YYYY-MM-DD)
-        end_date (str): End date for data retrieval (YYYY-MM-DD)
-        entry_fractal_file_number (str): File number for entry fractal data
-        exit_fractal_file_number (str): File number for exit fractal data
-        bb_file_number (str): File number for Bollinger Band data
-        trail_bb_file_number (str): File number for trailing Bollinger Band data
+        validated_input (dict): Validated user inputs
+        process (callable): Per instrument/strategy pair processor
+        resume (bool): Skip pairs that already succeeded for this sweep,
+            off by default so a resubmitted sweep is recomputed
+        on_progress (callable): Receives the telemetry collector as worker
+            stage events and task completions arrive
+        input_files (callable): Files read by one pair, called like
+            `process`; used for the memory estimate of its task. Defaults to
+            the strategy files
 
     Returns:
         None
@@ -508,53 +526,59 @@ def multiple_process(validated_input, process: callable):
 
     strategy_pairs = validated_input.get("strategy_pairs", [])
     instruments = validated_input.get("instruments", [])
+    input_files = input_files or get_strategy_input_files
 
-    # Dynamic worker count
     # todo
     #  for pa db we don't have stategies and instruments
-    num_workers = min(
-        int(multiprocessing.cpu_count() * cpu_percent_to_use),
-        len(strategy_pairs) * len(instruments),
+    tasks = [
+        Task(
+            func=process,
+            args=(validated_input, strategy_pair, instrument),
+            params={
+                "process": process.__name__,
+                "instrument": instrument,
+                "strategy_pair": strategy_pair,
+                "inputs": validated_input,
+            },
+            task_type=process.__name__,
+            inputs=tuple(
+                input_files(validated_input, strategy_pair, instrument)
+            ),
+        )
+        for instrument in instruments
+        for strategy_pair in strategy_pairs
+    ]
+    run_id = sweep_run_id(process.__name__, validated_input)
+    outcomes = run_tasks(
+        tasks, run_id, resume=resume, on_progress=on_progress
     )
-    # pool = multiprocessing.Pool(processes=num_workers)
-    results = []
-    with multiprocessing.Pool(processes=num_workers) as pool:
-        for instrument in instruments:
-            for strategy_pair in strategy_pairs:
-                try:
-                    result = pool.apply_async(
-                        process,
-                        args=(
-                            validated_input,
-                            strategy_pair,
-                            instrument,
-                        ),
-                    )
-                    results.append(result)
-                    # Process results as they become available (if desired)
-                except Exception as e:
-                    print(f"Error encountered during multiprocessing: {e}")
-                    raise e
-
-        pool.close()
-        pool.join()
-    for result in results:
-        try:
-            result.get()  # Will raise exception if the process raised one
-        except Exception as e:
-            print(f"Error encountered during multiprocessing execution: {e}")
-            raise e
+
+    for outcome in outcomes:
+        if outcome.status == TaskStatus.ERROR:
+            print(
+                f"Error encountered during multiprocessing execution: {outcome.error_message}"
+            )
+            raise RuntimeError(outcome.error_message)
 
     return
 
 
+def get_strategy_input_files(validated_input, strategy_pair, instrument):
+    return get_strategy_file_details(
+        instrument,
+        validated_input.get("portfolio_ids"),
+        strategy_pair,
+        os.getenv("STRATEGY_DB_PATH"),
+    )
+
+
 def process_strategy(validated_input, strategy_pair, instrument):
     initialize(validated_input, strategy_pair)
     portfolio_ids_str = " - ".join(Trade.portfolio_ids)
     strategy_pair_str = "_".join(map(lambda a: str(a), strategy_pair))
     file_name = f"df_{instrument}_{strategy_pair_str}.csv"
 
-    try:
+    with stage(Stage.READ) as event:
         all_df = read_data(
             instrument,
             Trade.portfolio_ids,
@@ -572,18 +596,20 @@ def process_strategy(validated_input, strategy_pair, instrument):
             read_bb_fractal=Trade.check_bb_band,
             read_trail_bb_fractal=Trade.check_trail_bb_band,
         )
-    except FileNotFoundError as e:
-        raise e
+        event.rows = sum(len(df) for df in all_df)
 
     # Merge data
-    merged_df = merge_all_df(all_df)
+    with stage(Stage.MERGE) as event:
+        merged_df = merge_all_df(all_df)
+        event.rows = len(merged_df)
 
     if DEBUG:
-        write_dataframe_to_csv(
-            merged_df,
-            folder_name=MERGED_DF_FOLDER,
-            file_name=file_name,
-        )
+        with stage(Stage.WRITE, rows=len(merged_df)):
+            write_dataframe_to_csv(
+                merged_df,
+                folder_name=MERGED_DF_FOLDER,
+                file_name=file_name,
+            )
 
     # Dictionaries to track last fractals for both entry and exit
     entry_state = {
@@ -595,21 +621,90 @@ def process_strategy(validated_input, strategy_pair, instrument):
         MarketDirection.PREVIOUS: None,
         "signal_count": 1,
     }
-    output_df = process_trade(
-        instrument,
-        portfolio_ids_str,
-        strategy_pair_str,
-        merged_df,
-        entry_state,
-        exit_state,
-    )
+    with stage(Stage.TRADE_LOOP, rows=len(merged_df)):
+        output_df = process_trade(
+            instrument,
+            portfolio_ids_str,
+            strategy_pair_str,
+            merged_df,
+            entry_state,
+            exit_state,
+        )
     if DEBUG:
-        write_dataframe_to_csv(output_df, SG_OUTPUT_FOLDER, file_name)
+        with stage(Stage.WRITE, rows=len(output_df)):
+            write_dataframe_to_csv(output_df, SG_OUTPUT_FOLDER, file_name)
 
     if Trade.trigger_trade_management:
-        generate_tradesheet(
-            validated_input, output_df, strategy_pair_str, instrument
+        with stage(Stage.TRADE_MANAGEMENT, rows=len(output_df)):
+            generate_tradesheet(
+                validated_input, output_df, strategy_pair_str, instrument
+            )
+
+
+def close_trades(
+    active_trades, completed_trades, exit_datetime, exit_price, exit_type
+):
+    """
+    Apply an exit to the open trades, moving the closed ones to
+    `completed_trades`.
+    """
+    for trade in active_trades[:]:
+        trade.add_exit(exit_datetime, exit_price, exit_type)
+        if trade.is_trade_closed():
+            completed_trades.append(trade)
+            active_trades.remove(trade)
+
+
+def process_trade_row(
+    row,
+    entry_state,
+    exit_state,
+    active_trades,
+    completed_trades,
+    entry_func: callable = check_entry_conditions,
+    exit_func: callable = identify_exit_signals,
+):
+    """
+    Apply the exits and the entry of one row to the open trades.
+    """
+    is_entry, direction, entry_type = entry_func(row, entry_state)
+    is_exit, exit_type = exit_func(row, exit_state, entry_state)
+    if is_exit:
+        exit_datetime = row.name
+        # if exit_type == TradeExitType.FRACTAL:
+        #     exit_datetime = row['exit_e_dt']
+        close_trades(
+            active_trades,
+            completed_trades,
+            exit_datetime,
+            row["Close"],
+            exit_type,
+        )
+    if is_entry:
+        entry_datetime = row.name
+        # if entry_type == TradeExitType.FRACTAL:
+        #     entry_datetime = row['entry_e_dt']
+        trade = Trade(
+            entry_signal=direction,
+            entry_datetime=entry_datetime,
+            entry_type=entry_type,
+            entry_price=row["Close"],
+            signal_count=exit_state["signal_count"],
         )
+        active_trades.append(trade)
+
+
+def formulate_trade_outputs(
+    trades, instrument, portfolio_ids_str, strategy_pair_str
+):
+    trade_outputs = []
+    for trade in trades:
+        trade_outputs.extend(
+            trade.formulate_output(
+                instrument, strategy_pair_str, portfolio_ids_str
+            )
+        )
+    return trade_outputs
 
 
 def process_trade(
@@ -625,37 +720,22 @@ def process_trade(
 
     active_trades, completed_trades = [], []
     for index, row in merged_df.iterrows():
-        is_entry, direction, entry_type = entry_func(row, entry_state)
-        is_exit, exit_type = exit_func(row, exit_state, entry_state)
-        if is_exit:
-            exit_datetime = row.name
-            # if exit_type == TradeExitType.FRACTAL:
-            #     exit_datetime = row['exit_e_dt']
-            for trade in active_trades[:]:
-                trade.add_exit(exit_datetime, row["Close"], exit_type)
-                if trade.is_trade_closed():
-                    completed_trades.append(trade)
-                    active_trades.remove(trade)
-        if is_entry:
-            entry_datetime = index
-            # if entry_type == TradeExitType.FRACTAL:
-            #     entry_datetime = row['entry_e_dt']
-            trade = Trade(
-                entry_signal=direction,
-                entry_datetime=entry_datetime,
-                entry_type=entry_type,
-                entry_price=row["Close"],
-                signal_count=exit_state["signal_count"],
-            )
-            active_trades.append(trade)
-
-    trade_outputs = []
-    for trade in chain(completed_trades, active_trades):
-        trade_outputs.extend(
-            trade.formulate_output(
-                instrument, strategy_pair_str, portfolio_ids_str
-            )
+        process_trade_row(
+            row,
+            entry_state,
+            exit_state,
+            active_trades,
+            completed_trades,
+            entry_func=entry_func,
+            exit_func=exit_func,
         )
 
+    trade_outputs = formulate_trade_outputs(
+        chain(completed_trades, active_trades),
+        instrument,
+        portfolio_ids_str,
+        strategy_pair_str,
+    )
+
     output_df = pd.DataFrame(trade_outputs)
     return output_df
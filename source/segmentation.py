@@ -0,0 +1,365 @@
+"""
+Array kernels for splitting a frame into cycles.
+
+The cycle processors describe a cycle as a run of rows that opens on a start
+condition and closes on the next end condition within the same group. These
+kernels work on whole columns at once: rows are grouped with a stable sort,
+each start is matched to its next end with `searchsorted`, and the cycle
+numbers come out of cumulative sums, so the cost is linear in the rows
+instead of quadratic in the starts of a group.
+
+`Segments` reduces the cycles once they are numbered: the rows of every
+(group, cycle) pair are laid out contiguously and the per-cycle extremes come
+out of `ufunc.reduceat` and the means out of sums over all the cycles at
+once, instead of slicing the frame once per cycle.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def group_order(group_codes: np.ndarray):
+    """
+    Order rows by group while keeping the frame order inside each group.
+
+    Returns:
+        tuple: (order, group_first) where `order` gives the row positions
+        grouped together and `group_first` flags, in that order, the first
+        row of every group.
+    """
+    order = np.argsort(group_codes, kind="stable")
+    sorted_codes = group_codes[order]
+    group_first = np.ones(len(order), dtype=bool)
+    group_first[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    return order, group_first
+
+
+def forward_fill_in_group(values, mask, group_first, fill_value):
+    """
+    Carry `values` at the `mask` rows forward, restarting every group with
+    `fill_value`.
+    """
+    positions = np.where(mask | group_first, np.arange(len(values)), 0)
+    positions = np.maximum.accumulate(positions)
+    return np.where(mask[positions], values[positions], fill_value)
+
+
+def number_segments(
+    group_codes: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    counter_starter=1,
+) -> np.ndarray:
+    """
+    Number start-to-end segments within every group.
+
+    In each group, the first start opens a segment that runs up to and
+    including the next end after it; starts inside an open segment are
+    ignored and a start on the closing row opens the next segment. Segments
+    are numbered from `counter_starter + 1`, rows outside any segment are 0.
+
+    Args:
+        group_codes (np.ndarray): Integer group of every row.
+        start (np.ndarray): Rows meeting the start condition.
+        end (np.ndarray): Rows meeting the end condition.
+        counter_starter (int): Number before the first segment of a group.
+
+    Returns:
+        np.ndarray: Segment number of every row, in frame order.
+    """
+    order, group_first = group_order(group_codes)
+    start, end = start[order], end[order]
+    sorted_codes = group_codes[order]
+    positions = np.arange(len(order))
+
+    # a start opens a segment when it is the first of its group or an end
+    # was reached since the previous start, which closed the open segment
+    ends_seen = np.cumsum(end)
+    start_positions = positions[start]
+    opens = np.ones(len(start_positions), dtype=bool)
+    same_group = (
+        sorted_codes[start_positions[1:]] == sorted_codes[start_positions[:-1]]
+    )
+    opens[1:] = ~same_group | (
+        ends_seen[start_positions[1:]] > ends_seen[start_positions[:-1]]
+    )
+    open_positions = start_positions[opens]
+
+    # every opening start closes on the next end of its group
+    end_positions = positions[end]
+    next_end = np.searchsorted(end_positions, open_positions, side="right")
+    closes = np.full(len(open_positions), len(order))
+    has_end = next_end < len(end_positions)
+    close_positions = end_positions[next_end[has_end]]
+    in_group = (
+        sorted_codes[close_positions] == sorted_codes[open_positions[has_end]]
+    )
+    closes[np.flatnonzero(has_end)[in_group]] = close_positions[in_group]
+
+    opened = np.zeros(len(order), dtype=bool)
+    opened[open_positions] = True
+    group_opens = np.cumsum(opened)
+    group_opens -= forward_fill_in_group(
+        group_opens - opened, group_first, group_first, 0
+    )
+    close_at = np.zeros(len(order), dtype=np.int64)
+    close_at[open_positions] = closes
+
+    # every row belongs to the last segment opened in its group, if it has
+    # not closed yet
+    last_close = forward_fill_in_group(close_at, opened, group_first, -1)
+    last_number = forward_fill_in_group(
+        group_opens + counter_starter, opened, group_first, 0
+    )
+    numbers = np.where(positions <= last_close, last_number, 0)
+
+    result = np.empty(len(order), dtype=np.int64)
+    result[order] = numbers
+    return result
+
+
+def group_first_values(values: pd.Series, group_codes: np.ndarray):
+    """
+    Value of the first row (in frame order) of every row's group.
+    """
+    order, group_first = group_order(group_codes)
+    sorted_values = values.to_numpy()[order]
+    first_positions = np.maximum.accumulate(
+        np.where(group_first, np.arange(len(order)), 0)
+    )
+    result = np.empty(len(order), dtype=sorted_values.dtype)
+    result[order] = sorted_values[first_positions]
+    return result
+
+
+class Segments:
+    """
+    Rows of a frame split into segments, one per (group, cycle) pair.
+
+    The rows of every segment are laid out one segment after the other in
+    `rows`, segments ordered by group and, inside a group, by their first
+    row, which is the order the cycle processors walk them in. Reductions
+    run over that layout for all the segments at once. Offsets returned by
+    the arg reductions index `rows`, -1 when the segment has no eligible
+    row. Rows are compared by their place in the frame, which assumes the
+    frame index is sorted.
+
+    Attributes:
+        rows (np.ndarray): Frame positions of the segment rows.
+        starts (np.ndarray): Offset of the first row of every segment.
+        segment_of (np.ndarray): Segment of every entry of `rows`.
+        group_codes (np.ndarray): Group of every segment.
+        cycles (np.ndarray): Cycle of every segment.
+        first (np.ndarray): Frame position of the first row of every segment.
+        last (np.ndarray): Frame position of the last row of every segment.
+        next (np.ndarray): Frame position of the row appended to every
+            segment by `include_next`, -1 for none.
+    """
+
+    def __init__(self, group_codes, cycles, active=None):
+        group_codes = np.asarray(group_codes)
+        cycles = np.asarray(cycles)
+        if active is None:
+            active = np.ones(len(cycles), dtype=bool)
+        positions = np.flatnonzero(active)
+
+        # collect the rows of every (group, cycle) pair, then order the
+        # segments of a group by their first row
+        order = positions[
+            np.lexsort((cycles[positions], group_codes[positions]))
+        ]
+        new_segment = _changes(group_codes[order], cycles[order])
+        segment_first = order[new_segment][np.cumsum(new_segment) - 1]
+        rows = order[np.lexsort((order, segment_first, group_codes[order]))]
+
+        starts = np.flatnonzero(_changes(group_codes[rows], cycles[rows]))
+        self._set_rows(rows, starts)
+        self.first = rows[starts]
+        self.last = rows[starts + np.diff(starts, append=len(rows)) - 1]
+        self.next = np.full(len(starts), -1, dtype=np.int64)
+        self.group_codes = group_codes[self.first]
+        self.cycles = cycles[self.first]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _set_rows(self, rows, starts):
+        self.rows = rows
+        self.starts = starts
+        self.segment_of = np.repeat(
+            np.arange(len(starts)), np.diff(starts, append=len(rows))
+        )
+
+    def include_next(self, next_positions):
+        """
+        Segments extended with one more row each, like a cycle read together
+        with the first row of the next cycle.
+
+        Args:
+            next_positions (np.ndarray): Frame position of the row appended
+                to every segment, -1 to leave the segment as it is.
+
+        Returns:
+            Segments: Same segments, `first` and `last` still being the
+            segment's own rows.
+        """
+        next_positions = np.asarray(next_positions, dtype=np.int64)
+        has_next = next_positions >= 0
+        shift = np.cumsum(has_next) - has_next
+        lengths = np.diff(self.starts, append=len(self.rows))
+
+        starts = self.starts + shift
+        rows = np.empty(len(self.rows) + has_next.sum(), dtype=np.int64)
+        rows[np.arange(len(self.rows)) + shift[self.segment_of]] = self.rows
+        rows[(starts + lengths)[has_next]] = next_positions[has_next]
+
+        extended = object.__new__(Segments)
+        extended._set_rows(rows, starts)
+        extended.first = self.first
+        extended.last = self.last
+        extended.next = np.where(has_next, next_positions, -1)
+        extended.group_codes = self.group_codes
+        extended.cycles = self.cycles
+        return extended
+
+    @property
+    def closing(self):
+        """
+        Frame position of the last row of every segment, the appended row
+        when there is one.
+        """
+        return np.where(self.next >= 0, self.next, self.last)
+
+    def segment_rows(self, segment):
+        """
+        Frame positions of the rows of one segment, appended row included.
+        """
+        end = (
+            self.starts[segment + 1]
+            if segment + 1 < len(self)
+            else len(self.rows)
+        )
+        return self.rows[self.starts[segment] : end]
+
+    def positions(self, offsets):
+        """
+        Frame positions of offsets into `rows`, -1 stays -1.
+        """
+        offsets = np.asarray(offsets)
+        return np.where(offsets >= 0, self.rows[np.maximum(offsets, 0)], -1)
+
+    def _arg_reduce(self, ufunc, values, after, fill):
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        values = np.asarray(values, dtype=float)[self.rows]
+        offsets = np.arange(len(self.rows))
+        eligible = ~np.isnan(values)
+        if after is not None:
+            after = np.asarray(after)[self.segment_of]
+            eligible &= (after >= 0) & (offsets > after)
+
+        masked = np.where(eligible, values, fill)
+        best = ufunc.reduceat(masked, self.starts)
+        candidates = np.where(
+            eligible & (masked == best[self.segment_of]),
+            offsets,
+            len(self.rows),
+        )
+        found = np.minimum.reduceat(candidates, self.starts)
+        return np.where(found < len(self.rows), found, -1)
+
+    def argmin(self, values, after=None):
+        """
+        Offset of the first minimum of every segment, NaN skipped.
+
+        Args:
+            values (array-like): Column in frame order.
+            after (np.ndarray): Per segment, only the rows after this offset
+                are considered; -1 leaves the segment without a result.
+        """
+        return self._arg_reduce(np.minimum, values, after, np.inf)
+
+    def argmax(self, values, after=None):
+        """
+        Offset of the first maximum of every segment, NaN skipped.
+        """
+        return self._arg_reduce(np.maximum, values, after, -np.inf)
+
+    def mean(self, values, until=None):
+        """
+        Mean of every segment, NaN skipped, up to and including the `until`
+        offset when given. NaN for a segment without values.
+
+        The values are added the way `Series.mean` added them on a cycle
+        slice: one at a time in row order when the slice had a row appended
+        (an object column), with numpy's sum otherwise. Any other order, like
+        the one `reduceat` uses, moves half cent means to the other side once
+        they are rounded.
+        """
+        if not len(self):
+            return np.empty(0)
+        values = np.asarray(values, dtype=float)[self.rows]
+        counted = ~np.isnan(values)
+        ends = np.append(self.starts[1:], len(self.rows))
+        if until is not None:
+            ends = np.clip(np.asarray(until) + 1, self.starts, ends)
+        counted_before = np.concatenate(([0], np.cumsum(counted)))
+        count = counted_before[ends] - counted_before[self.starts]
+        values = np.where(counted, values, 0.0)
+        total = _sum_in_order(values, self.starts, ends)
+        for segment in np.flatnonzero(self.next < 0):
+            total[segment] = values[self.starts[segment] : ends[segment]].sum()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+
+def _sum_in_order(values, starts, ends):
+    """
+    Sum of `values[start:end]` for every segment, adding one value at a time
+    from the first. Every step adds the next value of all the segments that
+    still have one, so there are as many steps as rows in the longest
+    segment.
+    """
+    lengths = ends - starts
+    by_length = np.argsort(-lengths, kind="stable")
+    descending = -lengths[by_length]
+    total = np.zeros(len(starts))
+    for step in range(lengths.max(initial=0)):
+        active = by_length[: np.searchsorted(descending, -step)]
+        total[active] += values[starts[active] + step]
+    return total
+
+
+def _changes(*keys):
+    """
+    Flags the entries where any of the sorted keys differs from the
+    previous entry, the first entry included.
+    """
+    changes = np.zeros(len(keys[0]), dtype=bool)
+    changes[:1] = True
+    for key in keys:
+        changes[1:] |= key[1:] != key[:-1]
+    return changes
+
+
+def count_hits_in_group(hits: pd.Series, keys, skip_count=0) -> np.ndarray:
+    """
+    Running count of the hits of every group, in frame order.
+
+    Args:
+        hits (pd.Series): Boolean hit of every row.
+        keys: Group key column(s), as accepted by `groupby`. Rows with a
+            missing key count 0.
+        skip_count (int): Hits not counted at the start of a group, only
+            applied to groups with more hits than that.
+
+    Returns:
+        np.ndarray: Hits counted so far in the group of every row.
+    """
+    grouped = hits.astype(np.int64).groupby(keys, sort=False)
+    counts = grouped.cumsum()
+    if skip_count:
+        totals = grouped.transform("sum")
+        skipped = np.where(totals > skip_count, skip_count, 0)
+        counts = (counts - skipped).clip(lower=0)
+    return counts.fillna(0).to_numpy(dtype=np.int64)
@@ -45,7 +45,10 @@ from source.constants import (
     MarketDirection,
     TradeType,
 )
-from source.processors.cycle_trade_processor import process_cycle
+from source.processors.cycle_trade_processor import (
+    get_cycle_input_files,
+    process_cycle,
+)
 from source.processors.pa_analysis_trade_processor import process_pa_output
 from source.processors.signal_trade_processor import (
     multiple_process,
@@ -936,6 +939,14 @@ def main():
 
     all_fields_filled = all(required_fields)
 
+    resume = False
+    if expander_option != "PA DB":
+        resume = st.checkbox(
+            "Resume previous run",
+            value=False,
+            help="Skip strategy pairs that already completed for the same inputs",
+        )
+
     if all_fields_filled:
         if st.button("Submit"):
 
@@ -950,6 +961,11 @@ def main():
                 "PA DB": validate_pa_input,
             }
 
+            # files read per pair, for the memory estimate of its task
+            input_files = {
+                "Cycle": get_cycle_input_files,
+            }
+
             exec_func = processors[expander_option]
             validate_func = validators[expander_option]
 
@@ -970,7 +986,11 @@ def main():
 
                 # Start trade processing
                 execute(
-                    validated_input, exec_func, expander_option=expander_option
+                    validated_input,
+                    exec_func,
+                    expander_option=expander_option,
+                    resume=resume,
+                    input_files=input_files.get(expander_option),
                 )
     else:
         st.error("Please fill in all the required fields.")
@@ -1685,13 +1705,21 @@ def execute(
     exec_func: callable,
     module="Trade Management",
     expander_option="Signal",
+    resume=False,
+    input_files=None,
 ):
     start = time.time()
     if expander_option == "PA DB":
         exec_func(validated_input)
     else:
         try:
-            multiple_process(validated_input, exec_func)
+            multiple_process(
+                validated_input,
+                exec_func,
+                resume=resume,
+                on_progress=progress_display(),
+                input_files=input_files,
+            )
         except Exception as e:
             st.error(f"Error executing {module}: {e}")
             return
@@ -1702,6 +1730,32 @@ def execute(
     )
 
 
+def progress_display():
+    """
+    Build the live progress widgets of a sweep.
+
+    Returns:
+        callable: `on_progress` callback for the task runner, rendering the
+        task progress, throughput and the slowest stages reported by the
+        workers.
+    """
+    progress_bar = st.progress(0.0)
+    status = st.empty()
+    stages = st.empty()
+
+    def on_progress(collector):
+        progress_bar.progress(collector.progress)
+        status.text(
+            f"Tasks: {collector.finished_tasks}/{collector.total_tasks} "
+            f"(failed: {collector.failed_tasks}) | "
+            f"Rows read/s: {collector.rows_per_second():,.0f} | "
+            f"Elapsed: {collector.elapsed:.0f}s"
+        )
+        stages.dataframe(collector.slowest_stages())
+
+    return on_progress
+
+
 # Function to load input data from a JSON file
 def load_input_from_json(filename="user_inputs.json"):
     try:
@@ -0,0 +1,178 @@
+"""
+Date-indexed store of the volume and volatile tag outputs.
+
+Cycle runs and the PA analysis tag the strategy rows with the category of a
+volume output or the tags of a volatile output, once per strategy pair. A
+tag file is parsed once into a `TagStore`: its tag columns as categoricals
+on a sorted, unique date index. Parsed stores are kept in memory for the
+process and as a Parquet copy in TAG_STORE_FOLDER, so later workers skip the
+CSV date parsing too. The copy records the size and modification time of
+the file it was parsed from and is replaced when the file changes.
+
+Tagging a frame gathers the tags by date position, and the first row
+carrying a tag is looked up in a next-occurrence map built once per tag.
+"""
+
+from functools import lru_cache
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from source.constants import TAG_STORE_FOLDER
+
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEY = b"tag_store_source"
+
+
+class TagStore:
+    """
+    Tag columns of a volume or volatile output, by date.
+
+    Attributes:
+        tags (pd.DataFrame): Categorical tag columns on a sorted date index,
+            the first row kept for a repeated date.
+    """
+
+    def __init__(self, tags: pd.DataFrame):
+        tags = tags[~tags.index.duplicated()].sort_index()
+        self.tags = tags.astype("category")
+        self.next_occurrence = {}
+
+    def join(self, df: pd.DataFrame, columns=None):
+        """
+        Rows of `df` found in the store with the tag columns added, like an
+        inner merge on the dates.
+
+        Returns:
+            tuple: (frame, positions) with the store position of every row
+            kept.
+        """
+        columns = list(columns or self.tags.columns)
+        positions = self.tags.index.get_indexer(df.index)
+        found = positions >= 0
+        positions = positions[found]
+        tags = {
+            column: np.asarray(self.tags[column].array.take(positions))
+            for column in columns
+        }
+        return df[found].assign(**tags), positions
+
+    def get_next_occurrence(self, tag, columns):
+        """
+        Position of the next row, from every position on, where all the
+        `columns` hold `tag`; the store length when there is none.
+        """
+        key = (tag, tuple(columns))
+        if key not in self.next_occurrence:
+            hits = np.ones(len(self.tags), dtype=bool)
+            for column in columns:
+                hits &= (self.tags[column] == tag).to_numpy()
+            positions = np.where(hits, np.arange(len(hits)), len(hits))
+            self.next_occurrence[key] = np.minimum.accumulate(
+                positions[::-1]
+            )[::-1]
+        return self.next_occurrence[key]
+
+    def first_occurrence(self, positions, tag, columns=None):
+        """
+        Offset of the first of `positions` where all the `columns` hold
+        `tag`, None when there is none.
+
+        Args:
+            positions (np.ndarray): Store positions returned by `join`.
+        """
+        columns = list(columns or self.tags.columns)
+        next_occurrence = self.get_next_occurrence(tag, columns)
+        if np.any(np.diff(positions) <= 0):
+            # dates out of order, check every position
+            hits = np.flatnonzero(next_occurrence[positions] == positions)
+            return int(hits[0]) if len(hits) else None
+
+        # jump from tag row to tag row, skipping the ones not joined
+        offset = 0
+        while offset < len(positions):
+            found = next_occurrence[positions[offset]]
+            offset = int(np.searchsorted(positions, found))
+            if offset < len(positions) and positions[offset] == found:
+                return offset
+        return None
+
+
+def get_store_path(file_path, columns):
+    key = hashlib.sha1(
+        repr((os.path.abspath(file_path), columns)).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(TAG_STORE_FOLDER, f"{key}.parquet")
+
+
+def read_stored(store_path, source):
+    try:
+        table = pq.read_table(store_path)
+    except (OSError, pa.ArrowException):
+        return None
+    if (table.schema.metadata or {}).get(METADATA_KEY) != source:
+        return None
+    return TagStore(table.to_pandas())
+
+
+def write_stored(store, store_path, source):
+    table = pa.Table.from_pandas(store.tags, preserve_index=True)
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, METADATA_KEY: source}
+    )
+    os.makedirs(TAG_STORE_FOLDER, exist_ok=True)
+    # write aside and rename, other workers may be reading the copy
+    temp_path = f"{store_path}.tmp-{os.getpid()}"
+    pq.write_table(table, temp_path)
+    os.replace(temp_path, store_path)
+
+
+@lru_cache(maxsize=None)
+def load_tags(file_path, size, mtime_ns, columns) -> TagStore:
+    source = f"{size}:{mtime_ns}".encode("utf-8")
+    store_path = get_store_path(file_path, columns)
+    if TAG_STORE_FOLDER:
+        store = read_stored(store_path, source)
+        if store is not None:
+            return store
+
+    store = TagStore(
+        pd.read_csv(
+            file_path,
+            usecols=["dt", *columns],
+            index_col="dt",
+            parse_dates=True,
+        )
+    )
+    if TAG_STORE_FOLDER:
+        try:
+            write_stored(store, store_path, source)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Could not store the tags of {file_path}: {e}")
+    return store
+
+
+def get_tag_columns(file_path, match):
+    """
+    Columns of a tag output whose name contains `match`.
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    return [column for column in header if match in column]
+
+
+def get_tag_store(file_path, columns) -> TagStore:
+    """
+    Tag store of the `columns` of a volume or volatile output, parsed once
+    per file version.
+    """
+    stat = os.stat(file_path)
+    return load_tags(
+        file_path, stat.st_size, stat.st_mtime_ns, tuple(columns)
+    )
@@ -3,7 +3,8 @@ from datetime import timedelta
 import os
 import pandas as pd
 
-from source.constants import PA_ANALYSIS_FOLDER
+from source.constants import PA_ANALYSIS_FOLDER, YES_NO_COLUMN_PREFIXES
+from source.parallel import writer
 
 
 def format_dates(start_date, end_date):
@@ -68,10 +69,54 @@ def write_dict_to_csv(
             writer.writerow(row.values())
 
 
+def is_yes_no_column(column, values, flags):
+    if not isinstance(column, str) or not column.startswith(
+        YES_NO_COLUMN_PREFIXES
+    ):
+        return False
+    if not isinstance(values, pd.Series):
+        # duplicated column name
+        return False
+    if values.dtype == bool:
+        return True
+    # object columns holding flags and NaN, e.g. after an as-of merge; other
+    # columns sharing a prefix, like close_to_close, are left alone
+    return values.dtype == object and set(values.dropna().unique()) <= flags
+
+
+def encode_yes_no(dataframe):
+    """
+    Write the bool flag columns as YES/NO, missing values stay missing.
+    """
+    encoded = {
+        column: dataframe[column].map({True: "YES", False: "NO"})
+        for column in dataframe.columns.unique()
+        if is_yes_no_column(column, dataframe[column], {True, False})
+    }
+    return dataframe.assign(**encoded) if encoded else dataframe
+
+
+def decode_yes_no(dataframe):
+    """
+    Read back the YES/NO flag columns of a csv output as bools.
+    """
+    for column in dataframe.columns.unique():
+        if is_yes_no_column(column, dataframe[column], {"YES", "NO"}):
+            dataframe[column] = dataframe[column].map(
+                {"YES": True, "NO": False}
+            )
+    return dataframe
+
+
 def write_dataframe_to_csv(dataframe, folder_name, file_name):
     path = os.path.join(folder_name, file_name)
+    dataframe = encode_yes_no(dataframe)
+    # inside a sweep worker the parent's writer thread does the disk I/O
+    if writer.defer(dataframe, folder_name, file_name):
+        return path
     os.makedirs(folder_name, exist_ok=True)
     dataframe.to_csv(path, index=True)
+    return path
 
 
 def make_positive_series(series: pd.Series) -> pd.Series:
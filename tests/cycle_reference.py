@@ -0,0 +1,120 @@
+"""
+Cycle frames and the per cycle slicing the cycle processors used before
+they were segmented, shared by the tests comparing the two.
+"""
+
+import numpy as np
+import pandas as pd
+
+from source.constants import MarketDirection
+
+
+def reference_next_cycle_first_row(
+    group_data, cycle, cycle_col, groups, group_idx, cycle_data, cycle_start=1
+):
+    """
+    `get_next_cycle_first_row` as it was before the cycles were segmented.
+    """
+    last_index_position = group_data.index.get_loc(cycle_data.index[-1])
+    if last_index_position + 1 < len(group_data):
+        next_row = group_data.iloc[last_index_position + 1]
+        if next_row[cycle_col] == cycle + 1 or next_row[cycle_col] == 0:
+            return next_row
+
+    if group_idx + 1 < len(groups):
+        _, next_group_data = groups[group_idx + 1]
+        for first_cycle in (cycle_start, cycle_start + 1):
+            next_cycle_data = next_group_data[
+                (next_group_data[cycle_col] == first_cycle)
+                | (next_group_data[cycle_col] == 0)
+            ]
+            if not next_cycle_data.empty:
+                return next_cycle_data.iloc[0]
+    return None
+
+
+def reference_cycles(df, cycle_col="cycle_no", cycle_start=1, first_cycle=2):
+    """
+    Per cycle slices as analyze_cycles used to build them: the cycle rows of
+    the group, the first row of the next cycle concatenated to them. The
+    secondary cycle ids start at 0 and analyse every cycle from 1.
+
+    Yields:
+        tuple: (group_start_row, cycle_data, adjusted_cycle_data)
+    """
+    groups = list(df.groupby("group_id"))
+    for group_idx, (_, group_data) in enumerate(groups):
+        group_start_row = group_data.iloc[0]
+        cycles = group_data.loc[group_data[cycle_col] > 0, cycle_col]
+        for cycle in cycles.unique():
+            if cycle < first_cycle:
+                continue
+            cycle_data = group_data[group_data[cycle_col] == cycle]
+            next_row = reference_next_cycle_first_row(
+                group_data,
+                cycle,
+                cycle_col,
+                groups,
+                group_idx,
+                cycle_data,
+                cycle_start,
+            )
+            if next_row is not None:
+                adjusted_cycle_data = pd.concat(
+                    [cycle_data, next_row.to_frame().T]
+                )
+            else:
+                adjusted_cycle_data = cycle_data
+            yield group_start_row, cycle_data, adjusted_cycle_data
+
+
+def make_cycle_frame(seed, cycle_cols=("cycle_no",)):
+    """
+    Groups of cycles over a few cents of prices, so extremes repeat and
+    means land on half cents. Rows outside a group or a cycle come between
+    them.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for group_id in range(int(rng.integers(1, 6))):
+        rows = int(rng.integers(2, 40))
+        cycles = {}
+        for cycle_col in cycle_cols:
+            numbers = []
+            cycle = 1
+            while len(numbers) < rows:
+                numbers += [cycle] * int(rng.integers(1, 12))
+                cycle += 1
+                if rng.random() < 0.3:
+                    numbers += [0] * int(rng.integers(1, 3))
+            cycles[cycle_col] = numbers[:rows]
+        # prices read from csv, each the closest float to its cents
+        close = rng.integers(101300, 101330, rows)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "group_id": float(group_id),
+                    "market_direction": rng.choice(
+                        [MarketDirection.LONG, MarketDirection.SHORT]
+                    ),
+                    **cycles,
+                    "Close": close / 100,
+                    "High": (close + rng.integers(0, 3, rows)) / 100,
+                    "Low": (close - rng.integers(0, 3, rows)) / 100,
+                }
+            )
+        )
+        if rng.random() < 0.3:
+            frames.append(
+                pd.DataFrame(
+                    {"group_id": [np.nan], **{col: [0] for col in cycle_cols}}
+                )
+            )
+    df = pd.concat(frames, ignore_index=True)
+    for cycle_col in cycle_cols:
+        df[cycle_col] = df[cycle_col].astype(np.int64)
+    minutes = np.cumsum(rng.integers(1, 90, len(df)))
+    df["dt"] = pd.Timestamp("2024-01-01 09:15") + pd.to_timedelta(
+        minutes, unit="min"
+    )
+    return df
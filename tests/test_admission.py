@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from source.parallel.admission import (
+    AdmissionController,
+    get_rss_mb,
+    get_task_memory_mb,
+    start_task_memory,
+)
+
+
+def test_estimate_without_observations():
+    admission = AdmissionController(budget_mb=1000, default_task_mb=100)
+
+    assert admission.estimate("double", input_mb=40) == 100
+    assert admission.estimate("double", input_mb=250) == 250
+
+
+def test_estimate_scales_the_observed_task_memory():
+    admission = AdmissionController(budget_mb=1000, default_task_mb=100)
+    admission.admit(0, 100)
+    admission.release(0, "double", input_mb=50, task_mb=30)
+
+    assert admission.running == {}
+    # a task reading less input is not estimated below the observed one
+    assert admission.estimate("double", input_mb=25) == 30
+    assert admission.estimate("double", input_mb=100) == 60
+    # a task that added nothing to its worker is still an observation
+    admission.release(1, "other", input_mb=50, task_mb=0.0)
+    assert admission.estimate("other", input_mb=50) == 0
+
+
+def test_can_admit():
+    admission = AdmissionController(budget_mb=100)
+
+    # an empty pool admits a task over the budget
+    assert admission.can_admit(500)
+    admission.admit(0, 60)
+    assert admission.can_admit(40)
+    assert not admission.can_admit(41)
+    admission.release(0)
+    assert admission.can_admit(500)
+
+    admission.admit(1, 60)
+    admission.budget_mb = None
+    assert admission.can_admit(500)
+
+
+@pytest.mark.skipif(get_rss_mb() is None, reason="no /proc")
+def test_task_memory_excludes_the_starting_memory():
+    baseline_mb = start_task_memory()
+    values = np.ones(64 * 1024 * 1024 // 8)
+
+    task_mb = get_task_memory_mb(baseline_mb)
+
+    assert values.nbytes / (1024 * 1024) <= task_mb < 64 + 32
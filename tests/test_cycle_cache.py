@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from source import cycle_cache
+from source.constants import MarketDirection
+
+
+def make_frames():
+    # dates read from csv, without a frequency
+    index = pd.DatetimeIndex(
+        pd.date_range("2024-01-01 09:15", periods=4, freq="min").to_list(),
+        name="dt",
+    )
+    df = pd.DataFrame(
+        {
+            "Close": [100.0, np.nan, 101.5, 102.0],
+            "cycle_no_1": [1, 1, 2, 2],
+            "market_direction": [
+                MarketDirection.LONG,
+                np.nan,
+                MarketDirection.SHORT,
+                MarketDirection.LONG,
+            ],
+            "close_to_flag": [True, np.nan, False, True],
+            "signal_category": ["a", np.nan, np.nan, "b"],
+            "empty": [np.nan] * 4,
+        },
+        index=index,
+    )
+    df["empty"] = df["empty"].astype(object)
+    return {1: df, 5: df.iloc[::2].copy()}
+
+
+@pytest.mark.skipif(
+    not cycle_cache.is_enabled(), reason="the cycle cache is disabled"
+)
+def test_hit_equals_stored_frames(tmp_path):
+    frames = make_frames()
+    cycle_cache.store("key", frames, "name", folder=str(tmp_path))
+
+    cached, name = cycle_cache.load("key", folder=str(tmp_path))
+
+    assert name == "name"
+    assert list(cached) == list(frames)
+    for time_frame, df in frames.items():
+        pd.testing.assert_frame_equal(cached[time_frame], df)
+        # missing values compare like the fresh frame's NaN, not None
+        assert cached[time_frame]["close_to_flag"].isna().equals(
+            df["close_to_flag"].isna()
+        )
+        assert all(
+            value is not None
+            for value in cached[time_frame]["close_to_flag"].to_numpy()
+        )
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cycle_reference import make_cycle_frame, reference_cycles
+from pa_analysis.cycle_processor import get_cycle_groups, get_cycle_metrics
+from source.constants import FirstCycleColumns, MarketDirection
+from source.processors.cycle_analysis_processor import (
+    get_cycle_segments,
+    get_min_max_idx,
+    get_min_max_offsets,
+)
+from source.utils import format_duration, make_positive, make_round
+
+CLOSE_TO_CLOSE_FLAG = (
+    f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_"
+    f"{FirstCycleColumns.CLOSE_TO_CLOSE.value}"
+)
+
+
+def reference_cycle_analysis(
+    group_start_row, cycle_data, adjusted_cycle_data
+):
+    """
+    Metrics of one cycle as analyze_cycles computed them before it was
+    segmented, its per cycle helpers inlined.
+    """
+    market_direction = group_start_row["market_direction"]
+    group_start_close = group_start_row["Close"]
+    min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
+        adjusted_cycle_data, group_start_row, group_start_row["group_id"]
+    )
+    # a min or max on label 0 used to be taken for a missing one
+    if max_idx is not None:
+        cycle_max = adjusted_cycle_data.loc[max_idx, "High"]
+    if min_idx is not None:
+        cycle_min = adjusted_cycle_data.loc[min_idx, "Low"]
+    found = cycle_max is not None and cycle_min is not None
+
+    move = make_positive(
+        make_round(cycle_data.iloc[0]["Close"] - group_start_close)
+    )
+    if market_direction == MarketDirection.LONG:
+        avg_till_min = make_round(
+            adjusted_cycle_data.loc[:min_idx]["Low"].mean()
+        )
+        avg_till_max = pd.NA
+        close_to_close = make_round(
+            adjusted_cycle_data.iloc[-1]["Close"]
+            - adjusted_cycle_data.iloc[0]["Close"]
+        )
+    else:
+        avg_till_max = make_round(
+            adjusted_cycle_data.loc[:max_idx]["High"].mean()
+        )
+        avg_till_min = pd.NA
+        close_to_close = make_round(
+            adjusted_cycle_data.iloc[0]["Close"]
+            - adjusted_cycle_data.iloc[-1]["Close"]
+        )
+    points_frm_avg, max_to_min = pd.NA, 0
+    if found:
+        points_frm_avg = make_round(
+            cycle_max - avg_till_min
+            if market_direction == MarketDirection.LONG
+            else avg_till_max - cycle_min
+        )
+        max_to_min = make_round(cycle_max - cycle_min)
+
+    return {
+        FirstCycleColumns.DURATION_SIGNAL_START_TO_CYCLE_START.value: (
+            format_duration(
+                make_round(
+                    (
+                        cycle_data.iloc[0]["dt"] - group_start_row["dt"]
+                    ).total_seconds()
+                )
+            )
+        ),
+        FirstCycleColumns.CYCLE_DURATION.value: format_duration(
+            make_round(
+                (
+                    adjusted_cycle_data.iloc[-1]["dt"]
+                    - adjusted_cycle_data.iloc[0]["dt"]
+                ).total_seconds()
+            )
+        ),
+        FirstCycleColumns.MOVE.value: move,
+        FirstCycleColumns.MOVE_PERCENT.value: make_positive(
+            make_round(move / group_start_close * 100)
+        ),
+        FirstCycleColumns.CYCLE_MAX.value: cycle_max,
+        FirstCycleColumns.CYCLE_MIN.value: cycle_min,
+        FirstCycleColumns.MAX_TO_MIN.value: max_to_min,
+        FirstCycleColumns.AVERAGE_TILL_MIN.value: avg_till_min,
+        FirstCycleColumns.AVERAGE_TILL_MAX.value: avg_till_max,
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: (
+            points_frm_avg
+        ),
+        FirstCycleColumns.CLOSE_TO_CLOSE.value: close_to_close,
+        CLOSE_TO_CLOSE_FLAG: 1 if close_to_close > 0 else 0,
+        FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: make_round(
+            close_to_close / group_start_close * 100
+        ),
+        FirstCycleColumns.MAX_TO_MIN_TO_CLOSE_PERCENT.value: make_round(
+            max_to_min / group_start_close * 100
+        ),
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: make_round(
+            points_frm_avg / group_start_close * 100
+        ),
+    }
+
+
+def cycle_metrics(df, cycle_col):
+    groups = get_cycle_groups(df)
+    segments = get_cycle_segments(df, cycle_col, groups.codes)
+    min_offsets, max_offsets = get_min_max_offsets(
+        segments,
+        groups.is_long[segments.group_codes],
+        df["Low"].to_numpy(dtype=float),
+        df["High"].to_numpy(dtype=float),
+    )
+    return get_cycle_metrics(df, segments, groups, min_offsets, max_offsets)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_reference(seed):
+    df = make_cycle_frame(seed, cycle_cols=("cycle_no_1", "cycle_no_2"))
+
+    for cycle_col in ("cycle_no_1", "cycle_no_2"):
+        actual = cycle_metrics(df, cycle_col)
+        expected = pd.DataFrame(
+            [
+                reference_cycle_analysis(*cycle)
+                for cycle in reference_cycles(df, cycle_col)
+            ],
+            columns=actual.columns,
+        )
+        # the flags are written as floats, missing values as NaN
+        expected = (
+            expected.astype(object)
+            .where(expected.notna(), np.nan)
+            .astype(actual.dtypes.to_dict())
+        )
+
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
@@ -0,0 +1,56 @@
+from source.parallel.runner import Task, run_tasks
+
+
+def double(value):
+    return value * 2
+
+
+def run(tasks, tmp_path, **kwargs):
+    return run_tasks(
+        tasks,
+        "run",
+        ledger_path=str(tmp_path / "ledger.sqlite"),
+        telemetry_folder=str(tmp_path / "telemetry"),
+        executor="in_process",
+        **kwargs,
+    )
+
+
+def make_tasks(input_path):
+    return [
+        Task(
+            func=double,
+            args=(value,),
+            params={"value": value},
+            task_type="double",
+            inputs=({"file_path": str(input_path)},),
+        )
+        for value in (1, 2)
+    ]
+
+
+def test_resubmitted_sweep_is_recomputed(tmp_path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("a\n1\n")
+    tasks = make_tasks(input_path)
+    run(tasks, tmp_path)
+
+    outcomes = run(tasks, tmp_path)
+
+    assert [outcome.skipped for outcome in outcomes] == [False, False]
+    assert [outcome.result for outcome in outcomes] == [2, 4]
+
+
+def test_resume_skips_until_an_input_changes(tmp_path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("a\n1\n")
+    tasks = make_tasks(input_path)
+    run(tasks, tmp_path)
+
+    assert all(
+        outcome.skipped for outcome in run(tasks, tmp_path, resume=True)
+    )
+
+    input_path.write_text("a\n1\n2\n")
+    outcomes = run(tasks, tmp_path, resume=True)
+    assert [outcome.skipped for outcome in outcomes] == [False, False]
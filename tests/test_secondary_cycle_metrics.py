@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cycle_reference import make_cycle_frame, reference_cycles
+from pa_analysis import cycle_processor
+from source.constants import (
+    FirstCycleColumns,
+    MarketDirection,
+    SecondCycleIDColumns,
+)
+from source.processors.cycle_analysis_processor import get_min_max_idx
+from source.utils import format_duration, make_positive, make_round
+
+ANALYTICS_NEEDED = [
+    FirstCycleColumns.CYCLE_DURATION.value,
+    FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value,
+    FirstCycleColumns.CYCLE_MAX.value,
+    FirstCycleColumns.CYCLE_MIN.value,
+    FirstCycleColumns.POINTS_FROM_MAX.value,
+    FirstCycleColumns.CLOSE_TO_CLOSE.value,
+    FirstCycleColumns.AVERAGE_TILL_MAX.value,
+    FirstCycleColumns.AVERAGE_TILL_MIN.value,
+    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value,
+    FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value,
+    FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value,
+    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value,
+]
+POSITIVE_NEGATIVE_KEYS = [
+    FirstCycleColumns.POINTS_FROM_MAX.value,
+    FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value,
+    FirstCycleColumns.CLOSE_TO_CLOSE.value,
+]
+
+
+def reference_secondary_analysis(
+    group_start_row, cycle_data, adjusted_cycle_data, is_last_cycle
+):
+    """
+    Secondary metrics of one cycle as update_secondary_cycle_analytics
+    computed them before it was flattened, its per metric helpers inlined.
+    """
+    market_direction = group_start_row["market_direction"]
+    group_start_close = group_start_row["Close"]
+    min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
+        adjusted_cycle_data,
+        group_start_row,
+        group_start_row["group_id"],
+        is_last_cycle=is_last_cycle,
+    )
+    # a min or max on label 0 used to be taken for a missing one
+    if max_idx is not None:
+        cycle_max = adjusted_cycle_data.loc[max_idx, "High"]
+    if min_idx is not None:
+        cycle_min = adjusted_cycle_data.loc[min_idx, "Low"]
+    found = cycle_max is not None and cycle_min is not None
+    sign = -1 if is_last_cycle else 1
+
+    if market_direction == MarketDirection.LONG:
+        avg_till_min = make_round(
+            adjusted_cycle_data.loc[:min_idx]["Low"].mean()
+        )
+        avg_till_max = pd.NA
+        close_to_close = make_round(
+            adjusted_cycle_data.iloc[-1]["Close"]
+            - adjusted_cycle_data.iloc[0]["Close"]
+        )
+    else:
+        avg_till_max = make_round(
+            adjusted_cycle_data.loc[:max_idx]["High"].mean()
+        )
+        avg_till_min = pd.NA
+        close_to_close = make_round(
+            adjusted_cycle_data.iloc[0]["Close"]
+            - adjusted_cycle_data.iloc[-1]["Close"]
+        )
+    points_from_max, points_frm_avg = 0, pd.NA
+    if found:
+        points_from_max = make_round(cycle_max - cycle_min) * sign
+        points_frm_avg = (
+            make_round(
+                cycle_max - avg_till_min
+                if market_direction == MarketDirection.LONG
+                else avg_till_max - cycle_min
+            )
+            * sign
+        )
+    max_to_min_duration = pd.NA
+    if min_idx is not None and max_idx is not None:
+        max_to_min_duration = format_duration(
+            make_positive(
+                make_round(
+                    (
+                        adjusted_cycle_data.loc[max_idx, "dt"]
+                        - adjusted_cycle_data.loc[min_idx, "dt"]
+                    ).total_seconds()
+                )
+            )
+        )
+
+    analysis = {
+        FirstCycleColumns.CYCLE_DURATION.value: format_duration(
+            make_round(
+                (
+                    adjusted_cycle_data.iloc[-1]["dt"]
+                    - adjusted_cycle_data.iloc[0]["dt"]
+                ).total_seconds()
+            )
+        ),
+        FirstCycleColumns.DURATION_BETWEEN_MAX_MIN.value: max_to_min_duration,
+        FirstCycleColumns.CYCLE_MAX.value: cycle_max,
+        FirstCycleColumns.CYCLE_MIN.value: cycle_min,
+        FirstCycleColumns.POINTS_FROM_MAX.value: points_from_max,
+        FirstCycleColumns.CLOSE_TO_CLOSE.value: close_to_close,
+        FirstCycleColumns.AVERAGE_TILL_MIN.value: avg_till_min,
+        FirstCycleColumns.AVERAGE_TILL_MAX.value: avg_till_max,
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN.value: (
+            points_frm_avg
+        ),
+        FirstCycleColumns.POINTS_FROM_MAX_TO_CLOSE_PERCENT.value: make_round(
+            points_from_max / group_start_close * 100
+        ),
+        FirstCycleColumns.CLOSE_TO_CLOSE_TO_CLOSE_PERCENT.value: make_round(
+            close_to_close / group_start_close * 100
+        ),
+        FirstCycleColumns.POINTS_FRM_AVG_TILL_MAX_TO_MIN_TO_CLOSE_PERCENT.value: make_round(
+            points_frm_avg / group_start_close * 100
+        ),
+    }
+    return analysis
+
+
+def reference_secondary_analytics(df, cycle_col, prefix, is_mtm):
+    cycles = list(
+        reference_cycles(df, cycle_col, cycle_start=0, first_cycle=1)
+    )
+    analytics = []
+    for position, cycle in enumerate(cycles):
+        # the last cycle of every group of an MTM cycle id
+        is_last_cycle = is_mtm and (
+            position + 1 == len(cycles)
+            or cycles[position + 1][0]["group_id"] != cycle[0]["group_id"]
+        )
+        analysis = {
+            f"{prefix}_{key}": value
+            for key, value in reference_secondary_analysis(
+                *cycle, is_last_cycle
+            ).items()
+        }
+        for key in POSITIVE_NEGATIVE_KEYS:
+            value = analysis[f"{prefix}_{key}"]
+            analysis[
+                f"{FirstCycleColumns.POSITIVE_NEGATIVE.value}_{prefix}_{key}"
+            ] = (pd.NA if pd.isna(value) else 1 if value > 0 else 0)
+        analytics.append(analysis)
+    return analytics
+
+
+def normalize(frame):
+    # missing values as NaN, whether they were NA, None or NaN
+    return frame.astype(object).where(frame.notna(), np.nan)
+
+
+@pytest.mark.parametrize("seed", range(50))
+@pytest.mark.parametrize(
+    "prefix, cycle_count_col",
+    [
+        ("MTM", SecondCycleIDColumns.MTM_CYCLE_ID.value),
+        ("CTC", SecondCycleIDColumns.CTC_CYCLE_ID.value),
+    ],
+)
+def test_matches_reference(seed, prefix, cycle_count_col, monkeypatch):
+    monkeypatch.setattr(
+        cycle_processor, "write_dataframe_to_csv", lambda *args: None
+    )
+    cycle_col = f"{cycle_count_col}_1"
+    df = make_cycle_frame(seed, cycle_cols=(cycle_col,))
+    expected = pd.DataFrame(
+        reference_secondary_analytics(
+            df, cycle_col, prefix, prefix == "MTM"
+        )
+    )
+
+    actual = pd.DataFrame(
+        cycle_processor.update_secondary_cycle_analytics(
+            df,
+            [],
+            "1",
+            prefix=prefix,
+            cycle_count_col=cycle_count_col,
+            analytics_needed=ANALYTICS_NEEDED,
+            positive_negative_keys=POSITIVE_NEGATIVE_KEYS,
+        ),
+        columns=expected.columns,
+    )
+    # the flags are written as floats, compared equal to the 1 / 0 they were
+    pd.testing.assert_frame_equal(
+        normalize(actual), normalize(expected), check_exact=True
+    )
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cycle_reference import make_cycle_frame, reference_cycles
+from source.constants import MarketDirection
+from source.processors.cycle_analysis_processor import (
+    get_cycle_segments,
+    get_min_max_idx,
+    get_min_max_offsets,
+)
+
+
+def reference_metrics(df):
+    rows = []
+    for group_start_row, cycle_data, adjusted_cycle_data in reference_cycles(
+        df
+    ):
+        group_id = group_start_row["group_id"]
+        min_idx, max_idx, _, _ = get_min_max_idx(
+            adjusted_cycle_data, group_start_row, group_id
+        )
+        _, _, close_before_max, close_before_min = get_min_max_idx(
+            adjusted_cycle_data, group_start_row, group_id, is_last_cycle=True
+        )
+        rows.append(
+            {
+                "first": cycle_data.index[0],
+                "closing": adjusted_cycle_data.index[-1],
+                "min": -1 if min_idx is None else min_idx,
+                "max": -1 if max_idx is None else max_idx,
+                "avg_till_min": (
+                    np.nan
+                    if min_idx is None
+                    else adjusted_cycle_data.loc[:min_idx]["Low"].mean()
+                ),
+                "avg_till_max": (
+                    np.nan
+                    if max_idx is None
+                    else adjusted_cycle_data.loc[:max_idx]["High"].mean()
+                ),
+                "close_before_extreme": (
+                    close_before_min
+                    if group_start_row["market_direction"]
+                    == MarketDirection.LONG
+                    else close_before_max
+                ),
+            }
+        )
+    return pd.DataFrame(rows, columns=list(METRIC_DTYPES)).astype(
+        METRIC_DTYPES
+    )
+
+
+METRIC_DTYPES = {
+    "first": np.int64,
+    "closing": np.int64,
+    "min": np.int64,
+    "max": np.int64,
+    "avg_till_min": float,
+    "avg_till_max": float,
+    "close_before_extreme": float,
+}
+
+
+def segment_metrics(df):
+    group_codes, _ = pd.factorize(df["group_id"], sort=True)
+    segments = get_cycle_segments(df, "cycle_no", group_codes)
+    is_long = (
+        df["market_direction"].to_numpy()[segments.first]
+        == MarketDirection.LONG
+    )
+    low, high, close = (
+        df[col].to_numpy(dtype=float) for col in ("Low", "High", "Close")
+    )
+    min_offsets, max_offsets = get_min_max_offsets(
+        segments, is_long, low, high
+    )
+    last_min = segments.argmin(low)
+    last_max = segments.argmax(high)
+    all_rows = len(segments.rows)
+    return pd.DataFrame(
+        {
+            "first": segments.first,
+            "closing": segments.closing,
+            "min": segments.positions(min_offsets),
+            "max": segments.positions(max_offsets),
+            "avg_till_min": np.where(
+                min_offsets >= 0,
+                segments.mean(
+                    low,
+                    until=np.where(min_offsets >= 0, min_offsets, all_rows),
+                ),
+                np.nan,
+            ),
+            "avg_till_max": np.where(
+                max_offsets >= 0,
+                segments.mean(
+                    high,
+                    until=np.where(max_offsets >= 0, max_offsets, all_rows),
+                ),
+                np.nan,
+            ),
+            "close_before_extreme": np.where(
+                is_long,
+                segments.mean(close, until=last_min - 1),
+                segments.mean(close, until=last_max - 1),
+            ),
+        }
+    ).astype(METRIC_DTYPES)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_cycle_slices(seed):
+    df = make_cycle_frame(seed)
+
+    pd.testing.assert_frame_equal(
+        segment_metrics(df), reference_metrics(df), check_exact=True
+    )
+
+
+def test_half_cent_mean():
+    df = pd.DataFrame(
+        {
+            "group_id": 0.0,
+            "market_direction": MarketDirection.SHORT,
+            "cycle_no": [1, 2, 2, 2, 2, 2, 2, 0],
+            "Close": 1013.0,
+            "High": [
+                1013.0,
+                1013.03,
+                1013.90,
+                1014.95,
+                1015.96,
+                1017.14,
+                1017.27,
+                1013.0,
+            ],
+            "Low": 1012.0,
+        }
+    )
+
+    metrics = segment_metrics(df)
+
+    assert metrics["avg_till_max"].tolist() == [1015.375]
+    assert round(metrics["avg_till_max"][0], 2) == 1015.38
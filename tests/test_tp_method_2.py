@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from source.constants import MarketDirection, TargetProfitColumns
+from source.processors.cycle_analysis_processor import (
+    get_min_max_idx,
+    tp_method_2,
+)
+
+TP_COLUMNS = [
+    TargetProfitColumns.TP_CUMMAX.value,
+    TargetProfitColumns.TP_CUMMIN.value,
+    TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value,
+    TargetProfitColumns.TP_END.value,
+]
+
+
+def reference_tp_method_2(df, tp_percent, cycle_col_name, close_col_name):
+    """
+    `tp_method_2` as it was before it was vectorized, one group at a time.
+    """
+    df[TargetProfitColumns.TP_CUMMAX.value] = 0.0
+    df[TargetProfitColumns.TP_CUMMIN.value] = 0.0
+    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value] = 0.0
+    df[TargetProfitColumns.TP_END.value] = "NO"
+
+    groups = df.groupby("group_id")
+    for group_id, group_data in groups:
+        group_start_row = group_data.iloc[0]
+        # for market direction long find cummax
+        min_idx, max_idx, cycle_min, cycle_max = get_min_max_idx(
+            group_data, group_start_row, group_id
+        )
+
+        if group_start_row["market_direction"] == MarketDirection.LONG:
+
+            df.loc[
+                (df["group_id"] == group_id) & (df.index > min_idx),
+                TargetProfitColumns.TP_CUMMAX.value,
+            ] = df.loc[
+                (df["group_id"] == group_id) & (df.index > min_idx), "Low"
+            ].cummax()
+
+            df.loc[
+                (df["group_id"] == group_id) & (df.index > min_idx),
+                TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value,
+            ] = (
+                df[TargetProfitColumns.TP_CUMMAX.value]
+                / group_data.loc[min_idx]["Low"]
+                - 1
+            ) * 100
+
+            # tp_end(yes/no) (depends on market direction)
+            df.loc[
+                (df["group_id"] == group_id)
+                & (df.index > min_idx)
+                & (
+                    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value]
+                    > tp_percent
+                ),
+                TargetProfitColumns.TP_END.value,
+            ] = "YES"
+
+        elif group_start_row["market_direction"] == MarketDirection.SHORT:
+            # find cummax from max_idx
+            df.loc[
+                (df["group_id"] == group_id) & (df.index > max_idx),
+                TargetProfitColumns.TP_CUMMIN.value,
+            ] = df.loc[df.index > max_idx, "High"].cummin()
+
+            df.loc[
+                (df["group_id"] == group_id) & (df.index > max_idx),
+                TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value,
+            ] = (
+                df[TargetProfitColumns.TP_CUMMIN.value]
+                / group_data.loc[max_idx]["High"]
+                - 1
+            ) * 100
+
+            # tp_end(yes/no) (depends on market direction)
+            df.loc[
+                (df["group_id"] == group_id)
+                & (df.index > max_idx)
+                & (
+                    df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value]
+                    > tp_percent
+                ),
+                TargetProfitColumns.TP_END.value,
+            ] = "YES"
+
+
+def make_frame(seed):
+    """
+    Rows of contiguous LONG and SHORT groups. Every other group has its
+    anchor (min Low when long, max High when short) on its last row, so no
+    row follows the anchor.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for group_id in range(int(rng.integers(1, 8))):
+        rows = int(rng.integers(1, 15))
+        direction = rng.choice([MarketDirection.LONG, MarketDirection.SHORT])
+        close = rng.integers(80, 120, rows).astype(float)
+        low = close - rng.integers(0, 5, rows)
+        high = close + rng.integers(0, 5, rows)
+        if group_id % 2:
+            low[-1], high[-1] = low.min() - 1, high.max() + 1
+        frames.append(
+            pd.DataFrame(
+                {
+                    "group_id": group_id,
+                    "market_direction": direction,
+                    "Close": close,
+                    "High": high,
+                    "Low": low,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def compare_with_reference(df, tp_percent, capsys):
+    expected, actual = df.copy(), df.copy()
+    reference_tp_method_2(expected, tp_percent, None, None)
+    expected_messages = capsys.readouterr().out
+    tp_method_2(actual, tp_percent, None, None)
+    # the TP End flags are stored as bools, written as YES/NO
+    expected[TargetProfitColumns.TP_END.value] = expected[
+        TargetProfitColumns.TP_END.value
+    ].map({"YES": True, "NO": False})
+
+    assert capsys.readouterr().out == expected_messages
+    pd.testing.assert_frame_equal(actual[TP_COLUMNS], expected[TP_COLUMNS])
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_reference(seed, capsys):
+    compare_with_reference(make_frame(seed), tp_percent=2.0, capsys=capsys)
+
+
+def test_no_row_after_anchor(capsys):
+    df = pd.DataFrame(
+        {
+            "group_id": [1, 1, 1, 2, 2, 2],
+            "market_direction": [MarketDirection.LONG] * 3
+            + [MarketDirection.SHORT] * 3,
+            "Close": [100.0, 101, 99, 100, 99, 101],
+            "High": [101.0, 102, 100, 101, 100, 103],
+            "Low": [99.0, 100, 97, 99, 98, 100],
+        }
+    )
+    compare_with_reference(df, tp_percent=1.0, capsys=capsys)
+
+    tp_method_2(df, 1.0, None, None)
+    assert not df[TargetProfitColumns.TP_END.value].any()
+    assert (df[TargetProfitColumns.TP_CLOSE_DIFF_PERCENT.value] == 0).all()
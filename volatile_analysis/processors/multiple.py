@@ -1,25 +1,20 @@
-from collections import deque
 import logging
-import multiprocessing
 import pandas as pd
-from source.constants import VOLATILE_OUTPUT_STATUS_FOLDER, cpu_percent_to_use
-from source.utils import write_dataframe_to_csv
-from volatile_analysis.processors.single import process_volatile
+from source.constants import VOLATILE_OUTPUT_STATUS_FOLDER
+from source.parallel.runner import Task, run_tasks, sweep_run_id, write_status
+from volatile_analysis.processors.single import (
+    get_files_data,
+    process_volatile,
+)
 from volatile_analysis.validations.single import validate_inputs
 
 logger = logging.getLogger(__name__)
 
 
-def process_multiple(validated_input, input_df: pd.DataFrame):
+def process_multiple(
+    validated_input, input_df: pd.DataFrame, resume=False, on_progress=None
+):
     # Process multiple files
-    total_length = (
-        len(input_df)
-        * len(validated_input["instruments"])
-        * len(validated_input["lv_hv_tag_combinations"])
-    )
-
-    status = []
-    error_mssg = []
     datas = []
 
     for _, row in input_df.iterrows():
@@ -51,51 +46,40 @@ def process_multiple(validated_input, input_df: pd.DataFrame):
                 validated_data["lv_tag"] = lv
                 validated_data["hv_tag"] = hv
                 validated_data = validate_inputs(validated_data)
-                datas.append(validated_data)
+                # copy so the next combination does not mutate this task
+                datas.append(validated_data.copy())
 
-    execute_data_processing(
-        total_length,
-        status,
-        error_mssg,
-        datas,
+    run_id = sweep_run_id(
+        "volatile", {"inputs": validated_input, "tasks": datas}
+    )
+    tasks = execute_data_processing(
+        run_id, datas, resume=resume, on_progress=on_progress
     )
-
-    status_df = pd.DataFrame(datas)
-    status_df["status"] = status
-    status_df["error_message"] = error_mssg
 
     now_str = pd.Timestamp.now().strftime("%Y-%m-%d %H-%M-%S")
-    write_dataframe_to_csv(
-        status_df,
+    write_status(
+        run_id,
+        tasks,
         VOLATILE_OUTPUT_STATUS_FOLDER,
         f"{now_str}_volatile_output.csv",
     )
 
 
-def execute_data_processing(total_length, status, error_mssg, datas):
-    num_workers = min(
-        int(multiprocessing.cpu_count() * cpu_percent_to_use),
-        total_length,
+def execute_data_processing(run_id, datas, resume=False, on_progress=None):
+    tasks = [
+        Task(
+            func=process_volatile,
+            args=(data,),
+            params=data,
+            task_type="volatile",
+            inputs=tuple(get_files_data(data).values()),
+        )
+        for data in datas
+    ]
+    run_tasks(
+        tasks,
+        run_id,
+        resume=resume,
+        on_progress=on_progress,
     )
-    results = []
-    batch_size = 20
-    with multiprocessing.Pool(num_workers) as pool:
-        for i in range(0, total_length, batch_size):
-            batch = datas[i : i + batch_size]  # Create a batch of 10 items
-            results = []
-
-            # Submit tasks for the current batch
-            for data in batch:
-                result = pool.apply_async(process_volatile, args=(data,))
-                results.append(result)
-
-            # Wait for all tasks in the current batch to complete
-            for result in results:
-                try:
-                    result.get()  # This will raise an exception if the process failed
-                    status.append("SUCCESS")
-                    error_mssg.append("")
-                except Exception as e:
-                    logger.error(f"Error processing volatile data: {e}")
-                    status.append("ERROR")
-                    error_mssg.append(str(e))
+    return tasks
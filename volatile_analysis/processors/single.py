@@ -5,6 +5,7 @@ import pandas as pd
 
 from source.constants import VOLATILE_OUTPUT_FOLDER
 from source.data_reader import read_files
+from source.parallel.telemetry import Stage, stage
 from source.utils import (
     make_negative,
     make_positive,
@@ -117,23 +118,29 @@ def get_avg_volatility_cols(parameter_id, periods, time_frame):
 
 def process_volatile(validated_data):
 
-    dfs = get_base_df(validated_data)
-    df, include_next_first_row = update_volatile_cycle_id(validated_data, dfs)
-    df = analyse_volatile(
-        df,
-        validate_data=validated_data,
-        group_by_col=AnalysisConstant.CYCLE_ID.value,
-        include_next_first_row=include_next_first_row,
-        tagcol=f"{validated_data['time_frames'][0]}_{validated_data['periods'][validated_data['time_frames'][0]][0]}_{AnalysisConstant.VOLATILE_TAG.value}",
-        analyze=validated_data["analyze"],
-    )
-    df = updated_inputs(df, validated_data)
+    with stage(Stage.READ) as event:
+        dfs = get_base_df(validated_data)
+        event.rows = sum(len(df) for df in dfs.values())
+
+    with stage(Stage.CYCLE_BUILD, rows=event.rows):
+        df, include_next_first_row = update_volatile_cycle_id(
+            validated_data, dfs
+        )
+        df = analyse_volatile(
+            df,
+            validate_data=validated_data,
+            group_by_col=AnalysisConstant.CYCLE_ID.value,
+            include_next_first_row=include_next_first_row,
+            tagcol=f"{validated_data['time_frames'][0]}_{validated_data['periods'][validated_data['time_frames'][0]][0]}_{AnalysisConstant.VOLATILE_TAG.value}",
+            analyze=validated_data["analyze"],
+        )
+        df = updated_inputs(df, validated_data)
     prefix = get_prefix(validated_data, df)
     name = f"{prefix}-lv-{validated_data['lv_tag']}-hv-{validated_data['hv_tag']}.csv".replace(
         ":", "-"
     )
-    write_dataframe_to_csv(df, VOLATILE_OUTPUT_FOLDER, name)
-    return
+    with stage(Stage.WRITE, rows=len(df)):
+        return write_dataframe_to_csv(df, VOLATILE_OUTPUT_FOLDER, name)
 
 
 def updated_inputs(df, validated_data):
@@ -1,5 +1,4 @@
 import logging
-import multiprocessing
 import os
 
 import pandas as pd
@@ -7,8 +6,9 @@ import pandas as pd
 from source.constants import (
     VOLUME_OUTPUT_FOLDER,
     VOLUME_OUTPUT_STATUS_FOLDER,
-    cpu_percent_to_use,
 )
+from source.parallel.runner import Task, run_tasks, sweep_run_id, write_status
+from source.parallel.telemetry import Stage, stage
 from source.utils import make_round, write_dataframe_to_csv
 from volatile_analysis.analysis import updated_cycle_id_by_start_end
 from volatile_analysis.processors.single import analyse_volatile
@@ -37,9 +37,7 @@ FILTERED_V = "filtered_v"
 CATEGORY = "category"
 
 
-def read_file(file_path: str, validated_data) -> dict:
-    start_date = validated_data["start_date"]
-    end_date = validated_data["end_date"]
+def get_file_details(file_path: str, validated_data) -> dict:
     parameter_id = validated_data["parameter_id"]
     period = validated_data["period"]
     time_frame = validated_data["time_frame"]
@@ -59,13 +57,24 @@ def read_file(file_path: str, validated_data) -> dict:
         f"calculate_sum_zscores_{parameter_id}_{period}",
         f"calculate_avg_zscore_sums_{parameter_id}_{period}",
     ]
-    df = pd.read_csv(
-        os.path.join(
+    return {
+        "file_path": os.path.join(
             file_path,
             f"{instrument}_TF_{time_frame}.csv",
         ),
-        usecols=[*columns_to_read, *dependent_cols],
-        dtype={col: float for col in dependent_cols},
+        "cols": [*columns_to_read, *dependent_cols],
+        "dtype": {col: float for col in dependent_cols},
+    }
+
+
+def read_file(file_path: str, validated_data) -> dict:
+    start_date = validated_data["start_date"]
+    end_date = validated_data["end_date"]
+    details = get_file_details(file_path, validated_data)
+    df = pd.read_csv(
+        details["file_path"],
+        usecols=details["cols"],
+        dtype=details["dtype"],
     )
     df["dt"] = pd.to_datetime(df["dt"])
     df = df[(df["dt"] >= start_date) & (df["dt"] <= end_date)]
@@ -73,13 +82,29 @@ def read_file(file_path: str, validated_data) -> dict:
 
 
 def process(validated_data: dict):
+    # Load data
+    with stage(Stage.READ) as event:
+        df = read_file(
+            VOLUME_DB_PATH,
+            validated_data,
+        )
+        event.rows = len(df)
+
+    with stage(Stage.CYCLE_BUILD, rows=len(df)):
+        df = analyse_volume(df, validated_data)
+
+    with stage(Stage.WRITE, rows=len(df)):
+        return write_dataframe_to_csv(
+            df,
+            VOLUME_OUTPUT_FOLDER,
+            f"{validated_data['instrument']}_ZS_{validated_data[AVG_ZSCORE_SUM_THRESHOLD]}_CD_{validated_data[CYCLE_DURATION]}_{df.index[0]}_{df.index[-1]}.csv".replace(
+                ":", "-"
+            ),
+        )
 
+
+def analyse_volume(df, validated_data: dict):
     CALCULATE_AVG_ZSCORE_SUMS = f"calculate_avg_zscore_sums_{validated_data['parameter_id']}_{validated_data['period']}"
-    # Load data
-    df = read_file(
-        VOLUME_DB_PATH,
-        validated_data,
-    )
 
     # volume_quatre_df = pd.read_csv(
     #     filepath_or_buffer=VOLUME_QUATRE_DB_PATH, index_col="INSTRUMENT"
@@ -192,13 +217,7 @@ def process(validated_data: dict):
         calculate_change_col="calculate_change_1",
     )
 
-    write_dataframe_to_csv(
-        df,
-        VOLUME_OUTPUT_FOLDER,
-        f"{validated_data['instrument']}_ZS_{validated_data[AVG_ZSCORE_SUM_THRESHOLD]}_CD_{validated_data[CYCLE_DURATION]}_{df.index[0]}_{df.index[-1]}.csv".replace(
-            ":", "-"
-        ),
-    )
+    return df
 
 
 def update_sub_cycle_id(df, validated_data):
@@ -308,13 +327,10 @@ def determine_quarter(row, instrument_quatre):
         return instrument_quatre[f"SEP-{year}"]
 
 
-def process_multiple(validated_input, input_df: pd.DataFrame):
-    total_length = (
-        len(input_df)
-        * len(validated_input["instruments"])
-        * len(validated_input["avg_zscore_sum_thresholds"])
-    )
-    data_to_process, status, error_message = [], [], []
+def process_multiple(
+    validated_input, input_df: pd.DataFrame, resume=False, on_progress=None
+):
+    data_to_process = []
     for _, row in input_df.iterrows():
         validated_data = {}
         validated_data["start_date"] = validated_input["start_date"]
@@ -348,49 +364,39 @@ def process_multiple(validated_input, input_df: pd.DataFrame):
                 validated_data = validate(validated_data)
                 data_to_process.append(validated_data.copy())
 
-    execute_data_processing(
-        total_length,
-        status,
-        error_message,
-        data_to_process,
+    run_id = sweep_run_id(
+        "volume", {"inputs": validated_input, "tasks": data_to_process}
+    )
+    tasks = execute_data_processing(
+        run_id, data_to_process, resume=resume, on_progress=on_progress
     )
-
-    status_df = pd.DataFrame(data_to_process)
-    status_df["status"] = status
-    status_df["error_message"] = error_message
 
     now_str = pd.Timestamp.now().strftime("%Y-%m-%d %H-%M-%S")
-    write_dataframe_to_csv(
-        status_df,
+    write_status(
+        run_id,
+        tasks,
         VOLUME_OUTPUT_STATUS_FOLDER,
         f"{now_str}_volatile_output.csv",
     )
 
 
-def execute_data_processing(total_length, status, error_message, data_list):
-    num_workers = min(
-        int(multiprocessing.cpu_count() * cpu_percent_to_use),
-        total_length,
+def execute_data_processing(
+    run_id, data_list, resume=False, on_progress=None
+):
+    tasks = [
+        Task(
+            func=process,
+            args=(data,),
+            params=data,
+            task_type="volume",
+            inputs=(get_file_details(VOLUME_DB_PATH, data),),
+        )
+        for data in data_list
+    ]
+    run_tasks(
+        tasks,
+        run_id,
+        resume=resume,
+        on_progress=on_progress,
     )
-    results = []
-    batch_size = 20
-    with multiprocessing.Pool(num_workers) as pool:
-        for i in range(0, total_length, batch_size):
-            batch = data_list[i : i + batch_size]  # Create a batch of 10 items
-            results = []
-
-            # Submit tasks for the current batch
-            for data in batch:
-                result = pool.apply_async(process, args=(data,))
-                results.append(result)
-
-            # Wait for all tasks in the current batch to complete
-            for result in results:
-                try:
-                    result.get()  # This will raise an exception if the process failed
-                    status.append("SUCCESS")
-                    error_message.append("")
-                except Exception as e:
-                    logger.error(f"Error processing volatile data: {str(e)}")
-                    status.append("ERROR")
-                    error_message.append(str(e))
+    return tasks
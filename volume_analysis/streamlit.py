@@ -6,6 +6,7 @@ import streamlit as st
 from source.constants import VOLUME_OUTPUT_FOLDER
 from source.streamlit import (
     load_input_from_json,
+    progress_display,
     set_start_end_datetime,
     write_user_inputs,
 )
@@ -188,6 +189,11 @@ def main():
                 streamlit_inputs.get("start_date", False),
                 streamlit_inputs.get("end_date", False),
             ]
+            resume = st.checkbox(
+                "Resume previous run",
+                value=False,
+                help="Skip combinations that already completed for the same inputs",
+            )
             if all(required_fileds):
                 if st.button("Submit"):
                     try:
@@ -199,6 +205,8 @@ def main():
                         process_multiple(
                             validated_input=validated_input,
                             input_df=validated_file,
+                            resume=resume,
+                            on_progress=progress_display(),
                         )
                         st.success(
                             f"Data processed successfully, time taken: {time.time()-start}"